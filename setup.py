@@ -110,6 +110,14 @@ Using ``sig.differential_snr_dB`` we can avaliate the filtration using some figu
 
     },
     packages=setuptools.find_packages(),
+    extras_require={
+        'numba': ['numba'],
+    },
+    entry_points={
+        'console_scripts': [
+            'statsWaveletFilt-denoise=statsWaveletFilt.cli:main',
+        ],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -1,2 +1,4 @@
 name = "statsWaveletFiltr"
-__all__ = ['filtration', 'cusum', 'threshold', 'signals', 'misc']
\ No newline at end of file
+__all__ = ['filtration', 'cusum', 'threshold', 'signals', 'misc',
+           'experiments', 'dataset', 'plan', 'benchmark', 'profiling',
+           'service', 'cli', 'tuning']
\ No newline at end of file
@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+
+'''
+**Wavelet Based in CUSUM control chart for filtering signals Project (module**
+``statsWaveletFilt.benchmark`` **):** Benchmarks of the filtering methods,
+of the CUSUM functions, of the signal generators and of the figures of merit
+over signal sizes and decomposition levels, with the results saved in JSON or
+CSV and a summary of how the times scale with the size.
+
+Run it with ``python -m statsWaveletFilt.benchmark`` (see ``--help``).
+'''
+
+_FILTRATION_METHODS = ['visu', 'sure', 'bayes', 'spc']
+
+_CUSUM_METHODS = ['cusumTrad', 'cusumDecay', 'cusumAdap']
+
+_GENERATORS = ['doppler', 'heavsine', 'block', 'bump']
+
+BENCHMARKS = (['filtration.' + method for method in _FILTRATION_METHODS] +
+              ['cusumFiltration.' + method for method in _CUSUM_METHODS] +
+              ['analysisCusum', 'thresholdCusum'] +
+              ['signals.' + function for function in _GENERATORS] +
+              ['differential_snr_dB', 'figuresOfMerit'])
+
+
+def runBenchmark(sizes=[2**e for e in range(10, 23)], levels=range(3, 11),
+                 benchmarks=BENCHMARKS, wavelet='db8', repeat=5,
+                 minTime=.2, seed=0, verbose=False):
+    '''
+    Times the functions of the package for each size of signal and, for the
+    filtrations, each level of decomposition. The filtrations are timed on
+    coefficients already decomposed (``pywt.wavedec`` isn't in the time) of
+    a Doppler signal with gaussian noise, with the default parameters of
+    each method (``[5] * level`` and ``[1/2] * level`` for 'cusumAdap').
+    The other functions don't depend on the level and are timed once per
+    size. The generators are timed with cache=False.
+
+    Each benchmark calls the function some times in a loop (as many as fill
+    minTime/repeat seconds, at least one) and repeats it repeat times. The
+    levels bigger than ``pywt.dwt_max_level`` of a size are skipped.
+
+    Parameters
+    ----------
+    sizes: list of int
+        Optional, the powers of two from 2**10 to 2**22 by default.
+    levels: list of int
+        Optional, the levels from 3 to 10 by default.
+    benchmarks: list of string
+        Optional, all of ``BENCHMARKS`` by default.
+    wavelet: string
+        Optional, is 'db8' by default.
+    repeat: int
+        Optional, is 5 by default.
+    minTime: float
+        Optional, is .2 by default. The time (seconds) that all repetitions
+        of a benchmark take at least.
+    seed: int
+        Optional, is 0 by default. The seed of the noise.
+    verbose: bool
+        Optional, is False by default. If True each result is printed.
+
+    Returns
+    -------
+    list of dict:
+        One per benchmark, size and level with the keys 'benchmark', 'size',
+        'level' (None for the functions without decomposition), 'number'
+        (calls in each repetition), 'repeat', 'best' and 'median' (seconds
+        per call) and 'perSample' (best divided by size).
+    '''
+
+    from statsWaveletFilt.cusum import analysisCusum, thresholdCusum
+    from statsWaveletFilt.filtration import filtration, cusumFiltration
+    from statsWaveletFilt import signals
+    import numpy as np
+    import pywt
+
+    for name in benchmarks:
+        if name not in BENCHMARKS:
+            raise Exception("Benchmark '%s' not found" % name)
+
+    generators = {'doppler': signals.dopplerFunction,
+                  'heavsine': signals.heavsineFunction,
+                  'block': signals.blockFunction,
+                  'bump': signals.bumpFunction}
+
+    results = []
+
+    def record(name, size, level, call):
+        number, times = _timeCall(call, repeat, minTime)
+        result = {'benchmark': name, 'size': size, 'level': level,
+                  'number': number, 'repeat': repeat,
+                  'best': float(np.min(times)),
+                  'median': float(np.median(times)),
+                  'perSample': float(np.min(times))/size}
+        results.append(result)
+        if verbose:
+            print('%-28s size=%-8d level=%-4s %.3e s' %
+                  (name, size, level, result['best']))
+
+    rng = np.random.default_rng(seed)
+
+    for size in sizes:
+        x, idealSignal = signals.dopplerFunction(size)
+        noisySignal = idealSignal + rng.normal(0, .05, size)
+        finalSignal = idealSignal + rng.normal(0, .01, size)
+
+        for name in benchmarks:
+            if name.startswith('signals.'):
+                function = generators[name.split('.')[1]]
+                record(name, size, None,
+                       lambda: function(size, cache=False))
+
+        if 'analysisCusum' in benchmarks:
+            record('analysisCusum', size, None,
+                   lambda: analysisCusum(noisySignal))
+
+        if 'thresholdCusum' in benchmarks:
+            SjB, Sjs = analysisCusum(noisySignal)
+            record('thresholdCusum', size, None,
+                   lambda: thresholdCusum(noisySignal, SjB, Sjs))
+
+        if 'differential_snr_dB' in benchmarks:
+            record('differential_snr_dB', size, None,
+                   lambda: signals.differential_snr_dB(
+                       noisySignal, finalSignal, method='variances',
+                       idealSignal=idealSignal))
+
+        if 'figuresOfMerit' in benchmarks:
+            record('figuresOfMerit', size, None,
+                   lambda: signals.figuresOfMerit(noisySignal, finalSignal,
+                                                  idealSignal))
+
+        maxLevel = pywt.dwt_max_level(size, pywt.Wavelet(wavelet).dec_len)
+
+        for level in levels:
+            if level > maxLevel:
+                continue
+
+            coefficients = pywt.wavedec(noisySignal, wavelet, level=level)
+
+            for name in benchmarks:
+                kind, _, method = name.partition('.')
+
+                if kind == 'filtration':
+                    call = (lambda method=method:
+                            filtration(coefficients, method, verbose=False))
+                elif kind == 'cusumFiltration':
+                    params = {'h': [5] * level, 'k': [1/2] * level} \
+                        if method == 'cusumAdap' else {}
+                    call = (lambda method=method, params=params:
+                            cusumFiltration(coefficients, method=method,
+                                            verbose=False, **params))
+                else:
+                    continue
+
+                record(name, size, level, call)
+
+    return results
+
+
+def _timeCall(call, repeat=5, minTime=.2):
+    '''
+    Internal function, the number of calls of each repetition and the times
+    (seconds per call) of the repetitions.
+    '''
+
+    import time
+
+    start = time.perf_counter()
+    call()
+    first = time.perf_counter() - start
+
+    number = max(1, int(minTime / repeat / max(first, 1e-9)))
+
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        for n in range(number):
+            call()
+        times.append((time.perf_counter() - start) / number)
+
+    return number, times
+
+
+def scalingSummary(results):
+    '''
+    Summarizes how the time of each benchmark (and level) grows with the
+    size: the exponent of a least squares fit of log(best) on log(size)
+    (1 is linear) and the times in the smallest and biggest sizes.
+
+    Parameters
+    ----------
+    results: list of dict
+        The results of ``runBenchmark``.
+
+    Returns
+    -------
+    list of dict:
+        One per benchmark and level with the keys 'benchmark', 'level',
+        'sizes' (number of sizes), 'exponent' (None with one size),
+        'minSize', 'minTime', 'maxSize' and 'maxTime'.
+    '''
+
+    import numpy as np
+
+    groups = {}
+    for result in results:
+        key = (result['benchmark'], result['level'])
+        groups.setdefault(key, []).append((result['size'], result['best']))
+
+    summary = []
+    for (name, level), points in groups.items():
+        points.sort()
+        sizes, times = np.array(points).T
+
+        exponent = None
+        if sizes.size > 1:
+            exponent = float(np.polyfit(np.log(sizes), np.log(times), 1)[0])
+
+        summary.append({'benchmark': name, 'level': level,
+                        'sizes': sizes.size, 'exponent': exponent,
+                        'minSize': int(sizes[0]), 'minTime': times[0],
+                        'maxSize': int(sizes[-1]), 'maxTime': times[-1]})
+
+    return summary
+
+
+def saveBenchmark(results, filename, format=None):
+    '''
+    Saves the results of ``runBenchmark`` (or of ``scalingSummary``) in a
+    JSON or CSV file.
+
+    Parameters
+    ----------
+    results: list of dict
+        The results.
+    filename: string
+        The name of the file.
+    format: string
+        Optional, is None by default (from the extension of filename, JSON
+        if it isn't '.csv'). Can be 'json' or 'csv'.
+    '''
+
+    import csv
+    import json
+
+    if format is None:
+        format = 'csv' if filename.lower().endswith('.csv') else 'json'
+
+    if format == 'json':
+        with open(filename, 'w') as file:
+            json.dump(results, file, indent=1)
+    elif format == 'csv':
+        with open(filename, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+    else:
+        raise Exception("Format '%s' not found" % format)
+
+
+def _main(argv=None):
+    '''
+    Internal function, the command line of the module.
+    '''
+
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='python -m statsWaveletFilt.benchmark',
+        description='Benchmarks of the filtering methods of statsWaveletFilt.')
+    parser.add_argument('--min-exp', type=int, default=10,
+                        help='smallest size, as a power of two (10)')
+    parser.add_argument('--max-exp', type=int, default=22,
+                        help='biggest size, as a power of two (22)')
+    parser.add_argument('--levels', type=int, nargs='+',
+                        default=list(range(3, 11)),
+                        help='levels of decomposition (3 ... 10)')
+    parser.add_argument('--benchmarks', nargs='+', default=BENCHMARKS,
+                        help='benchmarks to run (all)')
+    parser.add_argument('--wavelet', default='db8')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=.2)
+    parser.add_argument('--output', default='benchmark.json',
+                        help='results file, .json or .csv (benchmark.json)')
+    parser.add_argument('--summary', default=None,
+                        help='scaling summary file, .json or .csv')
+    args = parser.parse_args(argv)
+
+    results = runBenchmark([2**e for e in range(args.min_exp,
+                                                args.max_exp + 1)],
+                           args.levels, args.benchmarks, args.wavelet,
+                           args.repeat, args.min_time, verbose=True)
+    saveBenchmark(results, args.output)
+
+    summary = scalingSummary(results)
+    if args.summary is not None:
+        saveBenchmark(summary, args.summary)
+
+    print('\n%-28s %-6s %-9s %s' % ('benchmark', 'level', 'exponent',
+                                    'time in the biggest size (s)'))
+    for line in summary:
+        exponent = '-' if line['exponent'] is None else \
+            '%.2f' % line['exponent']
+        print('%-28s %-6s %-9s %.3e (%d)' % (line['benchmark'],
+                                              line['level'], exponent,
+                                              line['maxTime'],
+                                              line['maxSize']))
+
+
+if __name__ == '__main__':
+    _main()
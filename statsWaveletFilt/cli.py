@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+
+'''
+**Wavelet Based in CUSUM control chart for filtering signals Project (module**
+``statsWaveletFilt.cli`` **):** Command line to denoise files of signals
+(``.npy``, ``.npz``, raw binary or the folders of
+``miscellaneous.generateData``) with a pool of worker processes.
+
+Installed as ``statsWaveletFilt-denoise`` (or run with
+``python -m statsWaveletFilt.cli``)::
+
+    statsWaveletFilt-denoise recordings/ -o denoised/ --method sure \\
+        --wavelet db8 --level 5 --workers 8
+'''
+
+_METHODS = ['visu', 'sure', 'bayes', 'spc', 'cusumTrad', 'cusumDecay',
+            'cusumAdap']
+
+_RAW_EXTENSIONS = ('.bin', '.raw', '.dat')
+
+
+def denoiseFiles(inputs, output, wavelet='db8', level=5, method='visu',
+                 workers=None, blockSize=2**20, rawDtype='float64',
+                 rawLength=None, verbose=False, **params):
+    '''
+    Denoises files of signals, writing the results with the same names (and
+    folders) in output. The signals are in the last axis of the arrays: a
+    1-D array is a signal, an N-D array has many signals of the same size.
+
+    The ``.npy`` and raw files are read and written through memory maps, a
+    batch of signals (about blockSize samples) at a time, so files bigger
+    than the memory can be denoised. A signal longer than blockSize is
+    denoised by ``filtration.streamFiltration`` (windows of blockSize samples
+    with the lambdas of each window). The arrays of ``.npz`` files are
+    loaded whole. In a folder with the 'stacked' layout of
+    ``miscellaneous.generateData`` only the noisy signals are denoised, the
+    ideal signals and the manifest are copied.
+
+    The batches are spread over a ``concurrent.futures.ProcessPoolExecutor``
+    and each signal is denoised with its own lambdas (or CUSUM mean and
+    standard deviation), like ``filtration.filtration`` of the signal alone.
+
+    Parameters
+    ----------
+    inputs: list of string
+        Files and folders (searched recursively for ``.npy``, ``.npz``,
+        ``.bin``, ``.raw`` and ``.dat`` files).
+    output: string
+        The output folder.
+    wavelet: string
+        Optional, is 'db8' by default.
+    level: int
+        Optional, is 5 by default.
+    method: string
+        Optional, is 'visu' by default. The methods of
+        ``filtration.filtration`` and of ``filtration.cusumFiltration``.
+    workers: int
+        Optional, is None by default (the number of processors). With 1 the
+        files are denoised in this process.
+    blockSize: int
+        Optional, is 2**20 by default. Samples read at a time.
+    rawDtype: string
+        Optional, is 'float64' by default. The type of the raw files.
+    rawLength: int
+        Optional, is None by default (a raw file is one signal). The size of
+        the signals of the raw files.
+    verbose: bool
+        Optional, is False by default. If True the files are printed.
+    params:
+        Optional. The parameters of the method (p, mode, dim_t, search, h,
+        k).
+
+    Returns
+    -------
+    list of string:
+        The output files.
+    '''
+
+    from concurrent.futures import ProcessPoolExecutor
+    import os
+    import shutil
+
+    if method not in _METHODS:
+        raise Exception("Method '%s' not found" % method)
+
+    files, copies = _collect(inputs)
+
+    tasks = []
+    outputs = []
+    for path, relative in files:
+        outPath = os.path.join(output, relative)
+        os.makedirs(os.path.dirname(outPath) or '.', exist_ok=True)
+        outputs.append(outPath)
+        if verbose:
+            print(path, '->', outPath)
+
+        tasks.extend(_prepare(path, outPath, blockSize, rawDtype, rawLength,
+                              (wavelet, level, method, blockSize, params)))
+
+    for path, relative in copies:
+        outPath = os.path.join(output, relative)
+        os.makedirs(os.path.dirname(outPath) or '.', exist_ok=True)
+        shutil.copyfile(path, outPath)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers == 1 or len(tasks) < 2:
+        for task in tasks:
+            _runTask(task)
+    else:
+        chunksize = max(1, len(tasks) // (4 * workers))
+        with ProcessPoolExecutor(workers) as executor:
+            for done in executor.map(_runTask, tasks, chunksize=chunksize):
+                pass
+
+    return outputs
+
+
+def _collect(inputs):
+    '''
+    Internal function, the files to denoise and the files to copy, as tuples
+    (path, path relative to the output folder).
+    '''
+
+    import json
+    import os
+
+    files = []
+    copies = []
+
+    for item in inputs:
+        if not os.path.isdir(item):
+            files.append((item, os.path.basename(item)))
+            continue
+
+        base = os.path.basename(os.path.normpath(item))
+        for root, folders, names in os.walk(item):
+            folders.sort()
+            relativeRoot = os.path.join(base, os.path.relpath(root, item))
+
+            denoised = None
+            if 'manifest.json' in names:
+                with open(os.path.join(root, 'manifest.json')) as file:
+                    manifest = json.load(file)
+                if manifest.get('layout') == 'stacked':
+                    denoised = {manifest['data']}
+
+            for name in sorted(names):
+                path = os.path.join(root, name)
+                relative = os.path.normpath(os.path.join(relativeRoot, name))
+                isSignal = name.endswith(('.npy', '.npz') + _RAW_EXTENSIONS)
+
+                if name == 'manifest.json' or \
+                        isSignal and denoised is not None and \
+                        name not in denoised:
+                    copies.append((path, relative))
+                elif isSignal:
+                    files.append((path, relative))
+
+    return files, copies
+
+
+def _prepare(path, outPath, blockSize, rawDtype, rawLength, denoising):
+    '''
+    Internal function, creates the output file of path and returns the
+    tasks (batches of signals) that denoise it.
+    '''
+
+    import numpy as np
+
+    if path.endswith('.npz'):
+        return [('npz', path, outPath, None, None, denoising)]
+
+    source = _open(path, rawDtype, rawLength)
+    dtype = np.result_type(source.dtype, 0.)
+
+    if path.endswith('.npy'):
+        np.lib.format.open_memmap(outPath, mode='w+', dtype=dtype,
+                                  shape=source.shape).flush()
+    else:
+        np.memmap(outPath, dtype=dtype, mode='w+',
+                  shape=source.shape).flush()
+
+    if source.size == 0:
+        return []
+
+    length = source.shape[-1]
+    n_signals = source.size // length
+
+    if length > blockSize:
+        return [('stream', path, outPath, i, None, denoising,
+                 rawDtype, rawLength) for i in range(n_signals)]
+
+    rows = max(1, blockSize // length)
+    return [('rows', path, outPath, start, min(start + rows, n_signals),
+             denoising, rawDtype, rawLength)
+            for start in range(0, n_signals, rows)]
+
+
+def _open(path, rawDtype='float64', rawLength=None, mode='r'):
+    '''
+    Internal function, the memory map of a ``.npy`` or raw file.
+    '''
+
+    import numpy as np
+
+    if path.endswith('.npy'):
+        return np.load(path, mmap_mode=mode)
+
+    data = np.memmap(path, dtype=rawDtype, mode=mode)
+    if rawLength is not None:
+        data = data.reshape(-1, rawLength)
+    return data
+
+
+def _rows(array):
+    '''Internal function, array as a 2-D array (signals x samples).'''
+    return array.reshape(-1, array.shape[-1])
+
+
+def _runTask(task):
+    '''
+    Internal function, denoises a batch of signals of a file (see
+    ``_prepare``).
+    '''
+
+    from statsWaveletFilt.filtration import denoiseBatch, streamFiltration
+    import numpy as np
+
+    kind, path, outPath, start, stop, denoising = task[:6]
+    wavelet, level, method, blockSize, params = denoising
+
+    if kind == 'npz':
+        arrays = {}
+        with np.load(path, allow_pickle=False) as source:
+            for name in source.files:
+                signals = source[name]
+                arrays[name] = denoiseBatch(
+                    _rows(signals), method, wavelet, level, False,
+                    **params).reshape(signals.shape)
+        np.savez(outPath, **arrays)
+        return
+
+    rawDtype, rawLength = task[6:]
+    source = _rows(_open(path, rawDtype, rawLength))
+
+    out = _open(outPath, np.result_type(source.dtype, 0.), rawLength, 'r+')
+    target = _rows(out)
+
+    if kind == 'rows':
+        target[start:stop] = denoiseBatch(source[start:stop], method,
+                                          wavelet, level, False, **params)
+    else:
+        signal = source[start]
+        blocks = (signal[i:i + blockSize]
+                  for i in range(0, signal.size, blockSize))
+
+        position = 0
+        for block in streamFiltration(blocks, wavelet, level, method,
+                                      blockSize, verbose=False, **params):
+            target[start, position:position + block.size] = block
+            position += block.size
+
+    out.flush()
+
+
+def main(argv=None):
+    '''
+    The command line: ``statsWaveletFilt-denoise inputs... -o output``
+    (see ``--help``).
+    '''
+
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='statsWaveletFilt-denoise',
+        description='Denoises files of signals (.npy, .npz, raw binary or '
+                    'generateData folders) with statsWaveletFilt.')
+    parser.add_argument('inputs', nargs='+', help='files or folders')
+    parser.add_argument('-o', '--output', required=True,
+                        help='output folder')
+    parser.add_argument('--method', default='visu', choices=_METHODS)
+    parser.add_argument('--wavelet', default='db8')
+    parser.add_argument('--level', type=int, default=5)
+    parser.add_argument('--mode', default=None,
+                        help="threshold mode ('hard')")
+    parser.add_argument('--p', type=float, default=None,
+                        help="parameter of 'spc' (3)")
+    parser.add_argument('--dim-t', type=int, default=None,
+                        help="grid of 'sure' (1024)")
+    parser.add_argument('--search', default=None, choices=['grid', 'exact'],
+                        help="search of 'sure' ('grid')")
+    parser.add_argument('--h', type=float, nargs='+', default=None,
+                        help="'h' of CUSUM (5), one per level for "
+                             "'cusumAdap'")
+    parser.add_argument('--k', type=float, nargs='+', default=None,
+                        help="'k' of CUSUM (1/2), one per level for "
+                             "'cusumAdap'")
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes (the number of processors)')
+    parser.add_argument('--block-size', type=int, default=2**20,
+                        help='samples read at a time (2**20)')
+    parser.add_argument('--raw-dtype', default='float64',
+                        help='type of the raw files (float64)')
+    parser.add_argument('--raw-length', type=int, default=None,
+                        help='size of the signals of the raw files (all '
+                             'the file)')
+    parser.add_argument('-q', '--quiet', action='store_true')
+    args = parser.parse_args(argv)
+
+    params = {name: value for name, value in
+              [('mode', args.mode), ('p', args.p), ('dim_t', args.dim_t),
+               ('search', args.search), ('h', args.h), ('k', args.k)]
+              if value is not None}
+    for name in ('h', 'k'):
+        if name in params and args.method != 'cusumAdap':
+            params[name] = params[name][0]
+
+    denoiseFiles(args.inputs, args.output, args.wavelet, args.level,
+                 args.method, args.workers, args.block_size, args.raw_dtype,
+                 args.raw_length, not args.quiet, **params)
+
+
+if __name__ == '__main__':
+    main()
@@ -11,7 +11,7 @@ wavelet coefficients.
 
 
 def analysisCusum(data, k=1/2, mean=None, std=None, SjBi_start=0,
-                  Sjsi_start=0):
+                  Sjsi_start=0, engine='auto', axis=None):
     '''
     Calculates the Control Limits of CUSUM like in [1]. This is a Control Chart
     defined in [2] and this type of tool serves to make a control of data who
@@ -44,6 +44,26 @@ def analysisCusum(data, k=1/2, mean=None, std=None, SjBi_start=0,
         Optional, is 0 by default. Is the start value for acumulation of
         inferior control limit.
 
+    engine: string
+        Optional, 'auto' by default. Selects how the recursion is computed:
+        'compiled' uses a ``numba`` kernel, 'numpy' uses an exact vectorized
+        scan (see ``_cusumAccumulateNumpy``) and 'python' the original
+        element by element loop. 'auto' uses 'compiled' when ``numba`` is
+        installed and 'numpy' otherwise. All engines return the same values.
+
+    axis: int
+        Optional, is None by default (data is one process). The time axis of
+        an N-D data with many processes (channels), like the coefficients of
+        ``pywt.wavedec(..., axis=-1)`` of a (channels x samples) array. Each
+        channel has its own mean and std (computed along axis, or given as
+        arrays with one value per channel) and start values.
+
+    .. note::
+        float32 data gives float32 limits. The recursion accumulates the
+        rounding along data: the limits differ from the ones of the same
+        data in float64 by about 1e-5 of the standard deviation for 10**5
+        elements.
+
     Returns
     -------
     tuple:
@@ -67,6 +87,20 @@ def analysisCusum(data, k=1/2, mean=None, std=None, SjBi_start=0,
 
     import numpy as np
 
+    data = np.asarray(data)
+
+    if axis is not None:
+        data = np.moveaxis(data, axis, -1)
+
+        # One value per channel, broadcasted along the time axis
+        std = data.std(axis=-1) if std is None else np.asarray(std)
+        mean = data.mean(axis=-1) if mean is None else np.asarray(mean)
+        std, mean = std[..., None], mean[..., None]
+
+        SjB, Sjs = analysisCusum(data, k, mean, std, SjBi_start, Sjsi_start,
+                                 engine)
+        return np.moveaxis(SjB, -1, axis), np.moveaxis(Sjs, -1, axis)
+
     if std is None:
         std = data.std()
     if mean is None:
@@ -74,23 +108,217 @@ def analysisCusum(data, k=1/2, mean=None, std=None, SjBi_start=0,
 
     K = k * std
 
-    SjB, Sjs = [SjBi_start], [Sjsi_start]
+    if engine == 'python':
+        if data.shape[-1] == 0:
+            empty = np.empty(data.shape, dtype=np.result_type(data, 0.))
+            return empty, empty.copy()
+
+        SjB, Sjs = [SjBi_start], [Sjsi_start]
+
+        # The time is the last axis (for one process, the only one)
+        meanRow = mean[..., 0] if np.ndim(mean) else mean
+        KRow = K[..., 0] if np.ndim(K) else K
+
+        for i, xi in enumerate(np.moveaxis(data, -1, 0)):
+
+            SjBi_temp = np.maximum(0, xi - (meanRow + KRow) + SjB[i])
+            Sjsi_temp = np.maximum(0, (meanRow - KRow) - xi + Sjs[i])
 
-    for i, xi in enumerate(data):
+            SjB.append(SjBi_temp)
+            Sjs.append(Sjsi_temp)
 
-        SjBi_temp = np.maximum(0, xi - (mean + K) + SjB[i])
-        Sjsi_temp = np.maximum(0, (mean - K) - xi + Sjs[i])
+        SjB = np.stack(SjB[1:], axis=-1)
+        Sjs = np.stack(Sjs[1:], axis=-1)
 
-        SjB.append(SjBi_temp)
-        Sjs.append(Sjsi_temp)
+        return SjB, Sjs
 
-    SjB = np.array(SjB[1:])
-    Sjs = np.array(Sjs[1:])
+    # Increments of the superior and inferior recursions, with the same
+    # operation order used in the loop above
+    yB = data - (mean + K)
+    yS = (mean - K) - data
+
+    SjB = _cusumAccumulate(yB, SjBi_start, engine)
+    Sjs = _cusumAccumulate(yS, Sjsi_start, engine)
 
     return SjB, Sjs
 
 
-def thresholdCusum(data, SjB, Sjs, std=None, h=5):
+def _cusumAccumulate(increments, start=0, engine='auto'):
+    '''
+    Internal function, computes the one-sided CUSUM recursion
+    ``S[i] = max(0, increments[i] + S[i - 1])`` with ``S[-1] = start`` along
+    the last axis of increments.
+
+    Parameters
+    ----------
+    increments: array-like
+        The increments of the recursion, like ``xi - (mean + K)``. Each row
+        (last axis) is an independent recursion.
+    start: int, float or array-like
+        Optional, is 0 by default. The value of the accumulation before the
+        first increment, one for all rows or one for each row.
+    engine: string
+        Optional, 'auto' by default. See ``analysisCusum``.
+
+    Returns
+    -------
+    numpy.array:
+        The accumulated values, with the same shape of increments.
+    '''
+
+    import numpy as np
+
+    increments = np.asarray(increments)
+    if not np.isscalar(start):
+        start = np.asarray(start)
+    dtype = np.result_type(increments, start, 0.)
+
+    shape = increments.shape
+    y = np.ascontiguousarray(
+        increments.reshape(int(np.prod(shape[:-1])), shape[-1]), dtype=dtype)
+    s0 = np.ascontiguousarray(
+        np.broadcast_to(np.asarray(start, dtype=dtype),
+                        shape[:-1]).reshape(-1))
+
+    if engine == 'auto':
+        engine = 'compiled' if _compiledCusumKernel() is not None else \
+            'numpy'
+
+    if engine == 'compiled':
+        kernel = _compiledCusumKernel()
+        if kernel is None:
+            raise ImportError("The 'compiled' engine needs numba installed")
+        S = np.empty_like(y)
+        kernel(y, s0, S)
+    elif engine == 'numpy':
+        S = _cusumAccumulateNumpy(y, s0)
+    else:
+        raise Exception("Engine '%s' not found" % engine)
+
+    return S.reshape(shape)
+
+
+_COMPILED_KERNEL = []
+
+
+def _compiledCusumKernel():
+    '''
+    Internal function, builds (once) and returns the ``numba`` kernel of the
+    CUSUM recursion, or None if ``numba`` isn't installed.
+    '''
+
+    if not _COMPILED_KERNEL:
+        try:
+            import numba
+        except ImportError:
+            _COMPILED_KERNEL.append(None)
+        else:
+            @numba.njit(cache=True)
+            def kernel(y, s0, S):
+                for r in range(y.shape[0]):
+                    prev = s0[r]
+                    for i in range(y.shape[1]):
+                        value = y[r, i] + prev
+                        # Same result of np.maximum(0, value), also for
+                        # -0. and nan
+                        if 0. > value:
+                            S[r, i] = 0.
+                        else:
+                            S[r, i] = value
+                        prev = S[r, i]
+
+            _COMPILED_KERNEL.append(kernel)
+
+    return _COMPILED_KERNEL[0]
+
+
+def _cusumAccumulateNumpy(y, s0):
+    '''
+    Internal function, exact vectorized version of the CUSUM recursion.
+
+    Inside a run of positive values the recursion is a plain cumulative sum,
+    restarted every time the accumulation is truncated to zero. The zeros
+    are first located with the closed form ``S = C - min(-start, cummin(C))``
+    (``C`` the cumulative sum of the increments), then every run is summed
+    again in the same order of the loop, all runs together one position at a
+    time (long runs with ``np.add.accumulate``). The result is checked
+    against the recursion and the zeros relocated until they agree, so the
+    values are the same, bit a bit, of the original loop.
+
+    Parameters
+    ----------
+    y: 2-D numpy.array
+        Increments, each row is an independent recursion.
+    s0: 1-D numpy.array
+        The start value of each row.
+
+    Returns
+    -------
+    numpy.array:
+        The accumulated values, with the same shape of y.
+    '''
+
+    import numpy as np
+
+    n = y.shape[1]
+    if y.size == 0:
+        return np.empty_like(y)
+
+    C = np.cumsum(y, axis=1)
+    S = (C - np.minimum(np.minimum.accumulate(C, axis=1),
+                        -s0[:, None])).reshape(-1)
+
+    y_flat = y.reshape(-1)
+    rowStarts = np.zeros(y.size, dtype=bool)
+    rowStarts[::n] = True
+
+    while True:
+        zeros = S == 0
+
+        # A run starts in the first element of each row and after each zero
+        starts = rowStarts.copy()
+        starts[1:] |= zeros[:-1]
+        runStarts = np.flatnonzero(starts)
+        runLengths = np.diff(np.append(runStarts, y.size))
+
+        # Previous value of each run: the row start value or the zero
+        isRowStart = rowStarts[runStarts]
+        prev = S[runStarts - 1]
+        prev[isRowStart] = s0
+
+        P = np.empty_like(y_flat)
+        P[runStarts] = y_flat[runStarts] + prev
+
+        # Long runs are summed one by one, the others all together one
+        # position at a time, sorted from the longest to the shortest
+        limit = min(max(64, int(np.sqrt(y.size))), 2**15 - 1)
+        long = runLengths > limit
+
+        for a, length in zip(runStarts[long], runLengths[long]):
+            P[a:a + length] = np.add.accumulate(
+                np.concatenate(([P[a]], y_flat[a + 1:a + length])))
+
+        shortLengths = np.where(long, 0, runLengths)
+        order = np.argsort((limit - shortLengths).astype(np.int16),
+                           kind='stable')
+        shortStarts = runStarts[order]
+        n_active = np.searchsorted(-shortLengths[order], -np.arange(limit),
+                                   side='left')
+
+        for t in range(1, limit):
+            if n_active[t] == 0:
+                break
+            idx = shortStarts[:n_active[t]] + t
+            P[idx] = P[idx - 1] + y_flat[idx]
+
+        S_new = np.maximum(0, P)
+
+        if np.array_equal(S_new == 0, zeros):
+            return S_new.reshape(y.shape)
+        S = S_new
+
+
+def thresholdCusum(data, SjB, Sjs, std=None, h=5, out=None, axis=None):
     '''
     Makes the truncation of data accordyling with control limits SjB and Sjs
     and the interval of decision [H = h * data.std()]. The threshold method
@@ -118,6 +346,12 @@ def thresholdCusum(data, SjB, Sjs, std=None, h=5):
     h: int or float
         Optional, 5 by default. This variable multiply with standard deviation
         of data to obtain the interval of decision (H).
+    out: numpy.array
+        Optional, is None by default (a new array). Where the result is
+        written, can be data itself (then data is truncated in place).
+    axis: int
+        Optional, is None by default. The time axis of an N-D data with many
+        channels (see ``analysisCusum``), then std is one value per channel.
 
     Returns
     -------
@@ -143,16 +377,182 @@ def thresholdCusum(data, SjB, Sjs, std=None, h=5):
 
     import numpy as np
 
-    if std is None:
-        std = data.std()
+    data = np.asarray(data)
 
-    data2 = []
+    if axis is not None:
+        std = data.std(axis=axis) if std is None else np.asarray(std)
+        std = np.expand_dims(std, axis)
+    elif std is None:
+        std = data.std()
 
     H = h * std
 
-    for i, Dji in enumerate(data):
-        if (SjB[i] > H) or (Sjs[i] > H):
-            data2.append(Dji)
-        else:  # (SjBi =< H) and (Sjsi =< H)
-            data2.append(0)
-    return np.array(data2)
+    # Truncated where (SjBi =< H) and (Sjsi =< H)
+    kept = (np.asarray(SjB) > H) | (np.asarray(Sjs) > H)
+
+    if out is None:
+        return np.where(kept, data, 0)
+
+    if out is not data:
+        np.copyto(out, data)
+    np.copyto(out, 0, where=~kept)
+
+    return out
+
+
+class StreamingCusum(object):
+    '''
+    CUSUM filter [1] for data that arrives in chunks, like the wavelet
+    coefficients of one level of a live signal. The control limits (SjB and
+    Sjs) and the running mean and variance (Welford's method, merged chunk by
+    chunk like in [2]) are kept between the calls, so each chunk is
+    thresholded with O(chunk) work and constant memory, without reading the
+    previous chunks again.
+
+    The chunks are analysed with ``analysisCusum`` starting from the last
+    control limits and thresholded like in ``thresholdCusum``. The mean and
+    standard deviation are the ones of all data received until the current
+    chunk (inclusive), unless fixed values are given.
+
+    Parameters
+    ----------
+    k: int or float
+        Optional, 1/2 (or .5) by default. See ``analysisCusum``.
+    h: int or float
+        Optional, 5 by default. See ``thresholdCusum``.
+    mean: int or float
+        Optional, is None by default (the running mean). A fixed mean.
+    std: int or float
+        Optional, is None by default (the running standard deviation). A
+        fixed standard deviation.
+    engine: string
+        Optional, 'auto' by default. See ``analysisCusum``.
+
+    Examples
+    --------
+    >>> stream = StreamingCusum(k=1/2, h=5)
+    >>> for chunk in chunks:
+    ...     filtered = stream.process(chunk)
+
+    See also
+    --------
+    analysisCusum: The CUSUM analysis of all data at once.
+    thresholdCusum: The truncation of all data at once.
+
+    References
+    ----------
+    .. [1] MONTGOMERY, D. C. Introduction to Statistical Quality Control. Sixth
+           edition. United States: John Wiley & Sons, Inc., 2009. 733 p.
+
+    .. [2] CHAN, T. F.; GOLUB, G. H.; LEVEQUE, R. J. Updating formulae and a
+           pairwise algorithm for computing sample variances. Technical Report
+           STAN-CS-79-773, Stanford University, 1979.
+    '''
+
+    def __init__(self, k=1/2, h=5, mean=None, std=None, engine='auto'):
+        self.k = k
+        self.h = h
+        self.fixedMean = mean
+        self.fixedStd = std
+        self.engine = engine
+
+        self.reset()
+
+    def reset(self):
+        '''
+        Forgets all data received: the control limits go back to 0 and the
+        running mean and variance are restarted.
+        '''
+
+        self.count = 0
+        self.runningMean = 0.
+        self.M2 = 0.
+        self.SjB = 0
+        self.Sjs = 0
+
+    @property
+    def mean(self):
+        '''
+        The mean used to analyse the chunks: the fixed one or the running
+        mean.
+        '''
+
+        if self.fixedMean is not None:
+            return self.fixedMean
+        return self.runningMean
+
+    @property
+    def std(self):
+        '''
+        The standard deviation used to analyse the chunks: the fixed one or
+        the running (population) standard deviation.
+        '''
+
+        import numpy as np
+
+        if self.fixedStd is not None:
+            return self.fixedStd
+        if self.count == 0:
+            return 0.
+        return np.sqrt(self.M2 / self.count)
+
+    def update(self, chunk):
+        '''
+        Merges a chunk in the running mean and variance.
+
+        Parameters
+        ----------
+        chunk: 1-D array-like
+            The new data.
+        '''
+
+        import numpy as np
+
+        chunk = np.asarray(chunk)
+        n_chunk = chunk.size
+        if n_chunk == 0:
+            return
+
+        mean_chunk = chunk.mean()
+        M2_chunk = np.sum(np.power(chunk - mean_chunk, 2))
+
+        count = self.count + n_chunk
+        delta = mean_chunk - self.runningMean
+
+        self.runningMean = self.runningMean + delta * n_chunk / count
+        self.M2 = self.M2 + M2_chunk + \
+            delta**2 * self.count * n_chunk / count
+        self.count = count
+
+    def process(self, chunk):
+        '''
+        Analyses and thresholds a chunk, continuing the control limits of the
+        previous chunks.
+
+        Parameters
+        ----------
+        chunk: 1-D array-like
+            The new data.
+
+        Returns
+        -------
+        numpy.array:
+            The chunk truncated or not, depending of the control limits and
+            the interval of decision.
+        '''
+
+        import numpy as np
+
+        chunk = np.asarray(chunk)
+
+        self.update(chunk)
+        mean, std = self.mean, self.std
+
+        SjB, Sjs = analysisCusum(chunk, self.k, mean, std, self.SjB,
+                                 self.Sjs, engine=self.engine)
+        if chunk.size:
+            self.SjB, self.Sjs = SjB[-1], Sjs[-1]
+
+        H = self.h * std
+
+        return np.where((SjB > H) | (Sjs > H), chunk, 0)
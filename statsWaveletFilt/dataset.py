@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+
+'''
+**Wavelet Based in CUSUM control chart for filtering signals Project (module**
+``statsWaveletFilt.dataset`` **):** Lazy reader of the datasets generated by
+``miscellaneous.generateData``.
+'''
+
+
+class SignalDataset(object):
+    '''
+    Reads the noisy signals saved by ``miscellaneous.generateData``, in the
+    'stacked' layout (``data.npy`` and ``manifest.json``) or in the 'files'
+    layout (one ``.npy`` per signal). The files are opened with
+    ``mmap_mode='r'``, so only the signals accessed are read from disk.
+
+    The signals are ordered by function, variance of noise and sample, and
+    can be accessed by a flat index (``dataset[i]``, ``dataset[i:j]``) or by
+    function and variance (``dataset['doppler', 0.001]`` returns the matrix
+    of all samples, ``dataset['doppler', 0.001, 10:20]`` some of them).
+
+    Parameters
+    ----------
+    folder: string
+        The folder used in ``miscellaneous.generateData``.
+
+    Examples
+    --------
+    >>> dataset = SignalDataset('tmp')
+    >>> for function, varNoise, signals in dataset.batches(256):
+    ...     coeff, lambdas = filtration.filtrationBatch(signals, 'visu',
+    ...                                                 wavelet='db8')
+
+    See also
+    --------
+    miscellaneous.generateData: Generates the datasets.
+    filtration.filtrationBatch: Filters the batches of signals.
+    '''
+
+    def __init__(self, folder):
+        import json
+        import numpy as np
+        import os
+
+        self.folder = folder
+        manifestFile = os.path.join(folder, 'manifest.json')
+
+        if os.path.exists(manifestFile):
+            with open(manifestFile) as file:
+                manifest = json.load(file)
+
+            self.layout = 'stacked'
+            self.functions = manifest['functions']
+            self.varNoises = manifest['varNoises']
+            self.manifest = manifest
+            self._data = np.load(os.path.join(folder, manifest['data']),
+                                 mmap_mode='r')
+            self._ideal = np.load(os.path.join(folder, manifest['ideal']),
+                                  mmap_mode='r')
+            self.n_samples = self._data.shape[2]
+            self.dim_signals = self._data.shape[3]
+        else:
+            self.layout = 'files'
+            self.manifest = None
+            self._ideal = None
+            self.functions = sorted(
+                name for name in os.listdir(folder)
+                if os.path.isdir(os.path.join(folder, name)))
+
+            # Files named 'varNoise_counter.npy'
+            counters = {}
+            for name in self.functions:
+                for filename in os.listdir(os.path.join(folder, name)):
+                    if filename.endswith('.npy'):
+                        varNoise, counter = filename[:-4].rsplit('_', 1)
+                        counters.setdefault(varNoise, set()).add(
+                            (name, int(counter)))
+
+            self._varNoiseNames = sorted(counters, key=float)
+            self.varNoises = [float(varNoise)
+                              for varNoise in self._varNoiseNames]
+            self.n_samples = min(
+                len([c for n, c in counters[varNoise] if n == name])
+                for varNoise in counters for name in self.functions) \
+                if counters else 0
+            self.dim_signals = self._load(0, 0, 0).size if counters else 0
+
+    def __len__(self):
+        return len(self.functions) * len(self.varNoises) * self.n_samples
+
+    def __getitem__(self, key):
+        import numpy as np
+
+        if isinstance(key, tuple):
+            i_f = self._functionIndex(key[0])
+            i_n = self._varNoiseIndex(key[1])
+            samples = key[2] if len(key) > 2 else slice(None)
+
+            if isinstance(samples, slice):
+                return self._rows(i_f, i_n, samples)
+
+            if samples < 0:
+                samples += self.n_samples
+            if not 0 <= samples < self.n_samples:
+                raise IndexError('Sample out of the dataset')
+            return self._rows(i_f, i_n, slice(samples, samples + 1))[0]
+
+        if isinstance(key, slice):
+            indexes = range(*key.indices(len(self)))
+            if len(indexes) == 0:
+                return np.empty((0, self.dim_signals))
+
+            # The indexes of each (function, variance) are sliced at once
+            parts = []
+            position = 0
+            while position < len(indexes):
+                cell, sample = divmod(indexes[position], self.n_samples)
+                bound = (cell + 1) * self.n_samples if indexes.step > 0 \
+                    else cell * self.n_samples - 1
+                count = min(len(range(indexes[position], bound,
+                                      indexes.step)),
+                            len(indexes) - position)
+
+                stop = sample + count * indexes.step
+                i_f, i_n = divmod(cell, len(self.varNoises))
+                parts.append(self._rows(i_f, i_n, slice(
+                    sample, stop if stop >= 0 else None, indexes.step)))
+                position += count
+
+            return np.concatenate(parts)
+
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError('Index out of the dataset')
+
+        cell, sample = divmod(key, self.n_samples)
+        i_f, i_n = divmod(cell, len(self.varNoises))
+        return self._rows(i_f, i_n, slice(sample, sample + 1))[0]
+
+    def ideal(self, function):
+        '''
+        Gives the ideal signal (without noise) of a function.
+
+        Parameters
+        ----------
+        function: string
+            The name of the function, like 'doppler'.
+
+        Returns
+        -------
+        numpy.array:
+            The ideal signal.
+        '''
+
+        if self._ideal is not None:
+            return self._ideal[self._functionIndex(function)]
+
+        from statsWaveletFilt.signals import bumpFunction, blockFunction
+        from statsWaveletFilt.signals import dopplerFunction, \
+            heavsineFunction
+
+        functions_dic = {'doppler': dopplerFunction,
+                         'block': blockFunction,
+                         'bump': bumpFunction,
+                         'heavsine': heavsineFunction}
+
+        return functions_dic[function](self.dim_signals)[1]
+
+    def batches(self, batchSize=256, function=None, varNoise=None):
+        '''
+        Yields the signals in 2-D batches (signals x samples), without
+        loading the whole dataset. A batch has signals of only one function
+        and variance, so the last batch of each of them can be smaller.
+
+        Parameters
+        ----------
+        batchSize: int
+            Optional, is 256 by default. Number of signals of each batch.
+        function: string or list of string
+            Optional, is None by default (all functions).
+        varNoise: float or list of float
+            Optional, is None by default (all variances).
+
+        Returns
+        -------
+        generator:
+            Tuples with (function, varNoise, batch).
+        '''
+
+        functions = self.functions if function is None else \
+            ([function] if isinstance(function, str) else function)
+        varNoises = self.varNoises if varNoise is None else \
+            ([varNoise] if isinstance(varNoise, float) else varNoise)
+
+        for name in functions:
+            i_f = self._functionIndex(name)
+            for value in varNoises:
+                i_n = self._varNoiseIndex(value)
+                for start in range(0, self.n_samples, batchSize):
+                    stop = min(start + batchSize, self.n_samples)
+                    yield (name, self.varNoises[i_n],
+                           self._rows(i_f, i_n, slice(start, stop)))
+
+    def _functionIndex(self, function):
+        if function not in self.functions:
+            raise KeyError("Function '%s' isn't in the dataset" % function)
+        return self.functions.index(function)
+
+    def _varNoiseIndex(self, varNoise):
+        import numpy as np
+
+        close = np.flatnonzero(np.isclose(self.varNoises, varNoise))
+        if close.size == 0:
+            raise KeyError("Variance %s isn't in the dataset" % varNoise)
+        return int(close[0])
+
+    def _load(self, i_f, i_n, sample):
+        import numpy as np
+        import os
+
+        filename = '%s_%d.npy' % (self._varNoiseNames[i_n], sample)
+        return np.load(os.path.join(self.folder, self.functions[i_f],
+                                    filename), mmap_mode='r')
+
+    def _rows(self, i_f, i_n, samples):
+        '''
+        Internal function, the signals of the slice samples of a function
+        and variance as a 2-D array (a view of the memory map in the
+        'stacked' layout).
+        '''
+
+        import numpy as np
+
+        if self.layout == 'stacked':
+            return self._data[i_f, i_n, samples]
+
+        indexes = range(*samples.indices(self.n_samples))
+        if len(indexes) == 0:
+            return np.empty((0, self.dim_signals))
+        return np.stack([self._load(i_f, i_n, sample)
+                         for sample in indexes])
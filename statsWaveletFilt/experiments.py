@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+
+'''
+**Wavelet Based in CUSUM control chart for filtering signals Project (module**
+``statsWaveletFilt.experiments`` **):** Functions to run the Monte Carlo
+comparisons of the filtering methods (like the ones of the Undergraduate
+Thesis) in many processes.
+'''
+
+from functools import lru_cache
+
+_FUNCTIONS = ['doppler', 'block', 'bump', 'heavsine']
+
+_CUSUM_METHODS = ['cusumTrad', 'cusumDecay', 'cusumAdap']
+
+
+def runExperiment(functions=['doppler', 'block', 'bump', 'heavsine'],
+                  varNoises=[0.001, 0.002, 0.003, 0.004, 0.005, 0.006, 0.007,
+                             0.008, 0.009, 0.010],
+                  methods=['visu', 'sure', 'bayes', 'spc', 'cusumTrad',
+                           'cusumDecay'],
+                  n_replicates=100, dim_signals=1024, wavelet='db8',
+                  level=5, snrMethod='variances', seed=0, n_workers=None,
+                  methodParams=None, extension='symmetric', evaluation='auto'):
+    '''
+    Runs the Monte Carlo experiment: for each signal, variance of noise,
+    method and replicate a noisy signal is filtered and the
+    ``signals.differential_snr_dB`` is evaluated. The tasks are spread over a
+    ``concurrent.futures.ProcessPoolExecutor``.
+
+    The noise of each task comes from a generator seeded with
+    ``numpy.random.SeedSequence([seed, function, varNoise, replicate])``
+    (the indexes of the function and of the variance), so the results are
+    reproducible for any number of workers and all methods filter the same
+    noisy signals.
+
+    Parameters
+    ----------
+    functions: list of string
+        Optional, all signals of ``signals`` by default. Can be 'doppler',
+        'block', 'bump' and 'heavsine'.
+    varNoises: list of float
+        Optional. The variances of the gaussian noise.
+    methods: list of string
+        Optional. The methods of ``filtration.filtration`` ('visu', 'sure',
+        'bayes', 'spc') and of ``filtration.cusumFiltration`` ('cusumTrad',
+        'cusumDecay', 'cusumAdap').
+    n_replicates: int
+        Optional, is 100 by default. Number of noisy signals for each
+        signal and variance.
+    dim_signals: int
+        Optional, is 1024 by default.
+    wavelet: string or pywt.Wavelet
+        Optional, is 'db8' by default.
+    level: int
+        Optional, is 5 by default.
+    snrMethod: string
+        Optional, is 'variances' by default. The method of
+        ``signals.differential_snr_dB``.
+    seed: int
+        Optional, is 0 by default. The seed of the whole experiment.
+    n_workers: int
+        Optional, is None by default (the number of processors). With 1 the
+        tasks run in this process.
+    methodParams: dict
+        Optional, is None by default. Parameters of each method, like
+        ``{'spc': {'p': 2}, 'cusumAdap': {'h': [...], 'k': [...]}}``.
+    extension: string
+        Optional, is 'symmetric' by default. The signal extension mode of
+        ``pywt.wavedec`` and ``pywt.waverec``.
+    evaluation: string
+        Optional, is 'auto' by default. With 'signal' the filtered
+        coefficients are recomposed and ``signals.differential_snr_dB`` is
+        evaluated. With 'coefficients' the same value is evaluated from the
+        coefficients by ``signals.differential_snr_dB_coefficients``, without
+        ``pywt.waverec``, what needs an orthogonal wavelet, the
+        'periodization' extension and dim_signals multiple of 2**level.
+        'auto' uses 'coefficients' when they apply and 'signal' otherwise.
+
+    Returns
+    -------
+    tuple:
+        [0] a list of dict, one per task, with the keys 'function',
+        'varNoise', 'method', 'replicate' and 'differential_snr_dB', and [1]
+        a dict with the key (function, varNoise, method) and the value a
+        dict with 'mean', 'var' (sample variance) and 'n' of the
+        differential SNR of the replicates.
+
+    See also
+    --------
+    miscellaneous.generateData: Generates the noisy signals in files.
+    '''
+
+    from concurrent.futures import ProcessPoolExecutor
+    import os
+
+    if methodParams is None:
+        methodParams = {}
+
+    if evaluation == 'auto':
+        evaluation = 'coefficients' if _parsevalApplies(
+            wavelet, extension, dim_signals, level) else 'signal'
+    elif evaluation == 'coefficients':
+        if not _parsevalApplies(wavelet, extension, dim_signals, level):
+            raise Exception("The 'coefficients' evaluation needs an "
+                            "orthogonal wavelet, the 'periodization' "
+                            "extension and dim_signals multiple of "
+                            "2**level")
+    elif evaluation != 'signal':
+        raise Exception("Evaluation '%s' not found" % evaluation)
+
+    tasks = [(function, varNoise, method, replicate,
+              (seed, _FUNCTIONS.index(function), i_noise, replicate),
+              dim_signals, wavelet, level, snrMethod,
+              methodParams.get(method, {}), extension, evaluation)
+             for function in functions
+             for i_noise, varNoise in enumerate(varNoises)
+             for method in methods
+             for replicate in range(n_replicates)]
+
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+
+    if n_workers == 1:
+        values = [_runTask(task) for task in tasks]
+    else:
+        # Some tasks per message, but enough chunks to balance the workers
+        chunksize = max(1, len(tasks) // (4 * n_workers))
+        with ProcessPoolExecutor(n_workers) as executor:
+            values = list(executor.map(_runTask, tasks,
+                                       chunksize=chunksize))
+
+    results = [{'function': task[0], 'varNoise': task[1], 'method': task[2],
+                'replicate': task[3], 'differential_snr_dB': value}
+               for task, value in zip(tasks, values)]
+
+    return results, summarizeExperiment(results)
+
+
+def summarizeExperiment(results):
+    '''
+    Aggregates the results of ``runExperiment`` by signal, variance of noise
+    and method.
+
+    Parameters
+    ----------
+    results: list of dict
+        The results of each task, like [0] of ``runExperiment``.
+
+    Returns
+    -------
+    dict:
+        The key (function, varNoise, method) and the value a dict with
+        'mean', 'var' (sample variance) and 'n' of the differential SNR.
+    '''
+
+    import numpy as np
+
+    cells = {}
+    for result in results:
+        key = (result['function'], result['varNoise'], result['method'])
+        cells.setdefault(key, []).append(result['differential_snr_dB'])
+
+    summary = {}
+    for key, values in cells.items():
+        values = np.array(values)
+        summary[key] = {'mean': values.mean(),
+                        'var': values.var(ddof=1) if values.size > 1 else 0.,
+                        'n': values.size}
+
+    return summary
+
+
+def _runTask(task):
+    '''
+    Internal function, runs one task of ``runExperiment`` and returns its
+    differential SNR (dB). The advices of the filtrations aren't printed.
+    '''
+
+    from statsWaveletFilt.filtration import filtration, cusumFiltration
+    from statsWaveletFilt.signals import differential_snr_dB, \
+        differential_snr_dB_coefficients, cachedSignal
+    import numpy as np
+    import pywt
+
+    (function, varNoise, method, replicate, entropy, dim_signals, wavelet,
+     level, snrMethod, params, extension, evaluation) = task
+
+    # The shared read-only signal, only read here
+    x, idealSignal = cachedSignal(function, dim_signals)
+
+    rng = np.random.default_rng(np.random.SeedSequence(entropy))
+    noisySignal = idealSignal + rng.normal(0, np.sqrt(varNoise), dim_signals)
+
+    coefficients = pywt.wavedec(noisySignal, wavelet, mode=extension,
+                                level=level)
+
+    if method in _CUSUM_METHODS:
+        filteredCoeff = cusumFiltration(coefficients, method=method,
+                                        verbose=False, **params)[0]
+    else:
+        filteredCoeff = filtration(coefficients, method=method,
+                                   verbose=False, **params)[0]
+
+    if evaluation == 'coefficients':
+        return differential_snr_dB_coefficients(
+            coefficients, filteredCoeff, method=snrMethod,
+            idealCoeff=_idealCoefficients(function, dim_signals, wavelet,
+                                          level, extension))
+
+    filteredSignal = pywt.waverec(filteredCoeff, wavelet,
+                                  mode=extension)[:dim_signals]
+
+    return differential_snr_dB(noisySignal, filteredSignal, method=snrMethod,
+                               idealSignal=idealSignal)
+
+
+def _parsevalApplies(wavelet, extension, dim_signals, level):
+    '''
+    Internal function, if the decomposition is orthonormal (an orthogonal
+    wavelet, the 'periodization' extension and dim_signals multiple of
+    2**level), so the coefficients keep the sums of squares of the signals.
+    wavelet can be a string or a ``pywt.Wavelet``.
+    '''
+
+    import pywt
+
+    if not isinstance(wavelet, pywt.Wavelet):
+        wavelet = pywt.Wavelet(wavelet)
+
+    return (wavelet.orthogonal and
+            extension == 'periodization' and dim_signals % 2**level == 0)
+
+
+@lru_cache(maxsize=32)
+def _idealCoefficients(function, dim_signals, wavelet, level, extension):
+    '''
+    Internal function, the coefficients of the ideal signal (the same in
+    all tasks of a signal), computed once per process, read-only.
+    '''
+
+    from statsWaveletFilt.signals import bumpFunction, blockFunction, \
+        dopplerFunction, heavsineFunction
+    import pywt
+
+    functions_dic = {'doppler': dopplerFunction,
+                     'block': blockFunction,
+                     'bump': bumpFunction,
+                     'heavsine': heavsineFunction}
+
+    x, idealSignal = functions_dic[function](dim_signals)
+
+    coefficients = pywt.wavedec(idealSignal, wavelet, mode=extension,
+                                level=level)
+    for coeff in coefficients:
+        coeff.flags.writeable = False
+
+    return coefficients
@@ -13,16 +13,25 @@ wavelet*, in portuguese for the Universidade Federal de Santa Maria (2°/2018).
 '''
 
 
-def filtration(coefficients, method='visu', p=3, mode='hard', dim_t=1024):
+def filtration(coefficients, method='visu', p=3, mode='hard', dim_t=1024,
+               search='grid', inplace=False, out=None, stats=None,
+               tracer=None, axis=None, verbose=True):
     '''
     Filters the wavelet coefficients returned by the pywt.wavedec function.
     All methods are implemented and showed in [1].
 
+    The coefficients of images, of the ``pywt.wavedec2`` and
+    ``pywt.wavedecn`` functions, are filtered with one lambda per detail
+    subband (the noise is estimated in the finest diagonal subband, like in
+    [2] for 'bayes').
+
     Parameters
     ----------
     coefficients: list of 1-D array-like
         The wavelet coefficients and the scale coefficients of the last
-        level. The scale coefficients isn't modify by the filtration.
+        level. The scale coefficients isn't modify by the filtration. Or the
+        coefficients of ``pywt.wavedec2`` (tuples of subbands) or
+        ``pywt.wavedecn`` (dicts of subbands).
 
     method: string
         Optional, is 'visu' by default.
@@ -33,13 +42,70 @@ def filtration(coefficients, method='visu', p=3, mode='hard', dim_t=1024):
     mode: string
         Optional, is 'hard' by default.
 
+    search: string
+        Optional, is 'grid' by default. How the 'sure' method looks for the
+        lambda: 'grid' (dim_t points) or 'exact'. See
+        ``threshold.lambdasSureShrink``.
+
+    inplace: bool
+        Optional, is False by default. If True the wavelet coefficients are
+        thresholded in their own arrays (they must be numpy.array of float).
+
+    out: list of numpy.array
+        Optional, is None by default. Arrays with the sizes of the
+        coefficients where the result is written; out[0] receives a copy of
+        the scale coefficients.
+
+    stats: threshold.DecompositionStats
+        Optional, is None by default. Statistics of the wavelet coefficients
+        (coefficients[1:]) shared between calls, for filtering the same
+        coefficients with many methods.
+
+    tracer: profiling.Tracer
+        Optional, is None by default (the tracer activated by "with", if
+        any). Records the stages 'lambdas' and 'threshold' (per level).
+
+    axis: int
+        Optional, is None by default. The time axis of coefficients of N-D
+        arrays (like ``pywt.wavedec(signals, wavelet, axis=-1)`` of a
+        channels x samples array): each channel is filtered with its own
+        lambdas, computed for all channels together like in
+        ``filtrationBatch``. stats isn't used.
+
+    verbose: bool
+        Optional, is True by default. If False the advices about the
+        default parameters aren't printed.
+
+    .. note::
+        By default coefficients isn't modified: the lambdas are computed on
+        views of the coefficients (no copies) and the result is in new
+        arrays. Only with inplace=True the wavelet coefficients are
+        overwritten, and only the arrays of out are written when it is
+        given. The scale coefficients are never modified.
+
+    .. note::
+        The float type of the coefficients is kept: float32 coefficients
+        give float32 lambdas and filtered coefficients (like the functions
+        of ``threshold`` and ``cusum``), with half of the memory. Compared
+        with the same coefficients in float64, the lambdas differ by about
+        1e-6 (relative) and the recomposed signal by about 1e-6 of its
+        amplitude, except BayesShrink, where the difference of variances of
+        a level can amplify the rounding to about 1e-4 (relative) when the
+        signal variance is small against the noise. Only coefficients that
+        close to their lambda are filtered differently.
+
     Returns
     -------
     tuple:
         A tuple with [0] A list if numpy.array. The wavelet coefficients
         truncated by the choiced method, with scale coefficients. Ready for
         pywt.waverec function. (a little 'tip') and [1] a list of float. The
-        lambda value used for each wavelet coefficient level.
+        lambda value used for each wavelet coefficient level. With inplace or
+        out, [0] has the arrays of coefficients or of out. For
+        ``pywt.wavedec2`` and ``pywt.wavedecn`` both are nested like the
+        coefficients (ready for ``pywt.waverec2`` and ``pywt.waverecn``).
+        With axis, [1] is a numpy.array with the shape of the channels plus
+        one dimension for the levels.
 
     See also
     --------
@@ -51,45 +117,265 @@ def filtration(coefficients, method='visu', p=3, mode='hard', dim_t=1024):
     .. [1] KOZAKEVICIUS, A. D. J.; BAYER, F. M. Filtragem de sinais via
            limiarização de coeficientes wavelet. Ciência e Natura, v. 36,
            p. 37–51, 2014. In portuguese.
+
+    .. [2] CHANG, S. G.; YU, B.; VETTERLI, M. Adaptive wavelet thresholding
+           for image denoising and compression. IEEE Transactions on Image
+           Processing, v. 9, p. 1532–1546, 2000.
     '''
 
-    from statsWaveletFilt.threshold import lambdasVisuShrink, \
-        lambdasSureShrink, lambdasBayesShrink, lambdasSPC_Threshold
+    from statsWaveletFilt.profiling import _tracer, _stage
+    from statsWaveletFilt.threshold import _threshold, _thresholdInto, \
+        _subbands
     import numpy as np
-    import pywt
+
+    tracer = _tracer(tracer)
 
     scaleCoeff = coefficients[0]
-    wavCoeff = coefficients[1:]
+    wavCoeff, nest = _subbands(coefficients[1:])
 
-    if p == 3 and method == 'spc':
+    if verbose and p == 3 and method == 'spc':
         print(('ADVICE: The p value for spc method used is ' +
                'equal to default, 3!'))
 
-    if dim_t == 1024 and method == 'sure':
+    if verbose and dim_t == 1024 and method == 'sure' and search == 'grid':
         print(('ADVICE: The t-dimension value for sure method used is equal ' +
                'to default, 1024!'))
 
+    with _stage(tracer, 'lambdas', None,
+                tracer and sum(np.size(d) for d in wavCoeff)):
+        if axis is None:
+            lambdaValues = _lambdas(wavCoeff, method, p, dim_t, search,
+                                    stats)
+            levelLambdas = lambdaValues
+        else:
+            # One row per channel, the time in the columns
+            rows = [np.moveaxis(np.asarray(d), axis, -1) for d in wavCoeff]
+            channels = rows[0].shape[:-1]
+            lambdaValues = _lambdasBatch(
+                [d.reshape(-1, d.shape[-1]) for d in rows], method, p,
+                dim_t, search).reshape(channels + (len(wavCoeff),))
+            levelLambdas = [np.expand_dims(lambdaValues[..., j], axis)
+                            for j in range(len(wavCoeff))]
+
+    scaleCoeff, wavCoeff2 = _outputs(scaleCoeff, wavCoeff, inplace, out)
+
+    for j in range(len(wavCoeff2)):
+        with _stage(tracer, 'threshold', j + 1,
+                    tracer and np.size(wavCoeff[j])):
+            if wavCoeff2[j] is None:
+                wavCoeff2[j] = _threshold(wavCoeff[j], levelLambdas[j], mode)
+            else:
+                _thresholdInto(np.asarray(wavCoeff[j]), levelLambdas[j],
+                               mode, out=wavCoeff2[j])
+
+    coefficients2 = [scaleCoeff]
+    coefficients2.extend(nest(wavCoeff2))
+
+    if axis is not None:
+        return coefficients2, lambdaValues
+    return coefficients2, nest(lambdaValues)
+
+
+def _outputs(scaleCoeff, wavCoeff, inplace=False, out=None):
+    '''
+    Internal function, chooses where ``filtration`` and ``cusumFiltration``
+    write the result: a list with the array of each level (None for a new
+    array), and the scale coefficients to return. wavCoeff and out can have
+    subbands (see ``threshold._subbands``).
+    '''
+
+    from statsWaveletFilt.threshold import _subbands
+    import numpy as np
+
+    if inplace:
+        if not all(isinstance(wavCoeff_i, np.ndarray)
+                   for wavCoeff_i in wavCoeff):
+            raise Exception("Coefficients must be numpy.array to be " +
+                            "filtered in place")
+        return scaleCoeff, list(wavCoeff)
+
+    if out is not None:
+        outCoeff = _subbands(out[1:])[0]
+        if len(outCoeff) != len(wavCoeff):
+            raise Exception("Parameter 'out' must have one array for each " +
+                            "level and for the scale coefficients")
+        if out[0] is not scaleCoeff:
+            np.copyto(out[0], scaleCoeff)
+        return out[0], outCoeff
+
+    return scaleCoeff, [None] * len(wavCoeff)
+
+
+def _lambdas(wavCoeff, method, p=3, dim_t=1024, search='grid', stats=None):
+    '''
+    Internal function, computes the lambda values of the wavelet
+    coefficients by the choiced method of ``filtration``.
+    '''
+
+    from statsWaveletFilt.threshold import lambdasVisuShrink, \
+        lambdasSureShrink, lambdasBayesShrink, lambdasSPC_Threshold
+
     if method == 'visu':
-        lambdaValues = lambdasVisuShrink(wavCoeff)
+        lambdaValues = lambdasVisuShrink(wavCoeff, stats=stats)
     elif method == 'sure':
-        lambdaValues = lambdasSureShrink(wavCoeff, dim_t)
+        lambdaValues = lambdasSureShrink(wavCoeff, dim_t, search, stats=stats)
     elif method == 'bayes':
-        lambdaValues = lambdasBayesShrink(wavCoeff)
+        lambdaValues = lambdasBayesShrink(wavCoeff, stats=stats)
     elif method == 'spc':
-        lambdaValues = lambdasSPC_Threshold(wavCoeff, p=p)
+        lambdaValues = lambdasSPC_Threshold(wavCoeff, p=p, stats=stats)
+    else:
+        raise Exception("Method '%s' not found" % method)
 
-    wavCoeff2 = [np.array(list(wavCoeff_i)) for wavCoeff_i in wavCoeff]
+    return lambdaValues
 
-    for j in range(len(wavCoeff2)):
-        wavCoeff2[j] = pywt.threshold(wavCoeff2[j], lambdaValues[j], mode)
 
+def _lambdasBatch(wavCoeff, method, p=3, dim_t=1024, search='grid'):
+    '''
+    Internal function, computes the lambda values (signals x levels) of the
+    wavelet coefficients of many signals by the choiced method of
+    ``filtrationBatch``.
+    '''
+
+    from statsWaveletFilt.threshold import lambdasVisuShrinkBatch, \
+        lambdasSureShrinkBatch, lambdasBayesShrinkBatch, \
+        lambdasSPC_ThresholdBatch
+
+    if method == 'visu':
+        lambdaValues = lambdasVisuShrinkBatch(wavCoeff)
+    elif method == 'sure':
+        lambdaValues = lambdasSureShrinkBatch(wavCoeff, dim_t, search)
+    elif method == 'bayes':
+        lambdaValues = lambdasBayesShrinkBatch(wavCoeff)
+    elif method == 'spc':
+        lambdaValues = lambdasSPC_ThresholdBatch(wavCoeff, p=p)
+    else:
+        raise Exception("Method '%s' not found" % method)
+
+    return lambdaValues
+
+
+def filtrationBatch(data, method='visu', p=3, mode='hard', dim_t=1024,
+                    search='grid', wavelet=None, level=None, axes=None,
+                    verbose=True):
+    '''
+    Filters the wavelet coefficients of many signals of the same size at
+    once. The lambda values are computed for all signals together (one
+    vectorized computation per level) and each level of all signals is
+    thresholded in a single call. The methods are the same of
+    ``filtration``.
+
+    Images of the same shape are filtered in the same way, with one lambda
+    per detail subband of each image (like ``filtration`` with the
+    coefficients of ``pywt.wavedec2``).
+
+    Parameters
+    ----------
+    data: 2-D array-like or list of 2-D array-like
+        The signals (signals x samples), decomposed here with
+        ``pywt.wavedec(data, wavelet, level=level, axis=-1)``, or the
+        coefficients already decomposed: a list with the scale coefficients
+        and the wavelet coefficients of each level, one signal per row. With
+        axes, the images (images x rows x columns, for example), or their
+        coefficients of ``pywt.wavedec2``/``pywt.wavedecn``, one image per
+        index of the first axis.
+
+    method: string
+        Optional, is 'visu' by default. Can be 'visu', 'sure', 'bayes' or
+        'spc'.
+
+    p: int or float
+        Optional, is 3 by default. Parameter of the 'spc' method.
+
+    mode: string
+        Optional, is 'hard' by default.
+
+    dim_t: int
+        Optional, is 1024 by default. Parameter of the 'sure' method.
+
+    search: string
+        Optional, is 'grid' by default. Parameter of the 'sure' method.
+
+    wavelet: string or pywt.Wavelet
+        Optional, is None by default. Needed only when data has the signals.
+
+    level: int
+        Optional, is None by default (the maximum level). Used only when data
+        has the signals.
+
+    axes: tuple of int
+        Optional, is None by default (signals). The axes of the images
+        (without the first one) decomposed by ``pywt.wavedec2`` (two axes)
+        or ``pywt.wavedecn``. Used only when data has the images.
+
+    verbose: bool
+        Optional, is True by default. If False the advices about the
+        default parameters aren't printed.
+
+    Returns
+    -------
+    tuple:
+        A tuple with [0] A list of 2-D numpy.array. The wavelet coefficients
+        truncated by the choiced method, with scale coefficients. Ready for
+        ``pywt.waverec(coefficients, wavelet, axis=-1)`` and [1] a 2-D
+        numpy.array (signals x levels). The lambda value used for each level
+        of each signal. For images the coefficients are nested like the ones
+        of ``pywt.wavedec2``/``pywt.wavedecn`` (ready for
+        ``pywt.waverec2(coefficients, wavelet, axes=axes)``) and the lambdas
+        are a matrix (images x subbands), with the subbands in the order of
+        ``threshold._subbands``.
+
+    See also
+    --------
+    filtration: The same filtration for one signal.
+    '''
+
+    from statsWaveletFilt.threshold import _subbands, _threshold
+    import numpy as np
+    import pywt
+
+    if isinstance(data, (list, tuple)):
+        coefficients = list(data)
+    else:
+        if wavelet is None:
+            raise Exception("Parameter 'wavelet' is needed to decompose " +
+                            "the signals")
+        if axes is None:
+            coefficients = pywt.wavedec(np.atleast_2d(data), wavelet,
+                                        level=level, axis=-1)
+        elif len(axes) == 2:
+            coefficients = pywt.wavedec2(data, wavelet, level=level,
+                                         axes=axes)
+        else:
+            coefficients = pywt.wavedecn(data, wavelet, level=level,
+                                         axes=axes)
+
+    scaleCoeff = np.atleast_2d(coefficients[0])
+    wavCoeff, nest = _subbands(coefficients[1:])
+    wavCoeff = [np.atleast_2d(wavCoeff_j) for wavCoeff_j in wavCoeff]
+
+    if verbose and p == 3 and method == 'spc':
+        print(('ADVICE: The p value for spc method used is ' +
+               'equal to default, 3!'))
+
+    if verbose and dim_t == 1024 and method == 'sure' and search == 'grid':
+        print(('ADVICE: The t-dimension value for sure method used is equal ' +
+               'to default, 1024!'))
+
+    lambdaValues = _lambdasBatch(wavCoeff, method, p, dim_t, search)
+
+    # The lambda of each signal (or image) broadcasted in its coefficients
     coefficients2 = [scaleCoeff]
-    coefficients2.extend(wavCoeff2)
+    coefficients2.extend(nest(
+        _threshold(wavCoeff_j, lambdaValues[:, j].reshape(
+            (-1,) + (1,) * (wavCoeff_j.ndim - 1)), mode)
+        for j, wavCoeff_j in enumerate(wavCoeff)))
 
     return coefficients2, lambdaValues
 
 
-def cusumFiltration(coefficients, h=5, k=1/2, method='cusumTrad'):
+def cusumFiltration(coefficients, h=5, k=1/2, method='cusumTrad',
+                    inplace=False, out=None, stats=None, tracer=None,
+                    axis=None, verbose=True):
     '''
     Filters the wavelet coefficients returned by the pywt.wavedec function
     using the Cumulative Sum Control Chart (CUSUM) [1].
@@ -123,6 +409,39 @@ def cusumFiltration(coefficients, h=5, k=1/2, method='cusumTrad'):
         but the user can be choice who values of "h" and "k" will be for each
         wavelet level.
 
+    inplace: bool
+        Optional, is False by default. If True the wavelet coefficients are
+        truncated in their own arrays (they must be numpy.array).
+
+    out: list of numpy.array
+        Optional, is None by default. Arrays with the sizes of the
+        coefficients where the result is written; out[0] receives a copy of
+        the scale coefficients.
+
+    stats: threshold.DecompositionStats
+        Optional, is None by default. Statistics of the wavelet coefficients
+        (coefficients[1:]), its mean and standard deviation are used by
+        CUSUM.
+
+    tracer: profiling.Tracer
+        Optional, is None by default (the tracer activated by "with", if
+        any). Records the stages 'cusumAnalysis' and 'cusumThreshold' (per
+        level).
+
+    axis: int
+        Optional, is None by default. The time axis of coefficients of N-D
+        arrays (see ``filtration``): the mean and standard deviation of
+        CUSUM are computed for each channel. stats isn't used.
+
+    verbose: bool
+        Optional, is True by default. If False the advices about the
+        default parameters aren't printed.
+
+    .. note::
+        As in ``filtration``, coefficients is modified only with
+        inplace=True, and only the arrays of out are written when it is
+        given.
+
     Returns
     -------
     tuple:
@@ -153,27 +472,494 @@ def cusumFiltration(coefficients, h=5, k=1/2, method='cusumTrad'):
     '''
 
     from statsWaveletFilt.cusum import analysisCusum, thresholdCusum
+    from statsWaveletFilt.profiling import _tracer, _stage
     import numpy as np
 
+    tracer = _tracer(tracer)
+
     scaleCoeff = coefficients[0]
     wavCoeff = coefficients[1:]
 
-    wavCoeff2 = [np.array(list(wavCoeff_i)) for wavCoeff_i in wavCoeff]
+    # CUSUM follows the coefficients in time, what the subbands of
+    # pywt.wavedec2 and pywt.wavedecn don't have
+    if any(isinstance(level, (tuple, dict)) for level in wavCoeff):
+        raise TypeError("cusumFiltration needs the coefficients of " +
+                        "pywt.wavedec, not of pywt.wavedec2 or " +
+                        "pywt.wavedecn")
+
+    k2, h2 = _cusumParameters(len(wavCoeff), h, k, method, verbose)
+
+    scaleCoeff, wavCoeff2 = _outputs(scaleCoeff, wavCoeff, inplace, out)
+
+    for j in range(len(wavCoeff)):
+        Dj = np.asarray(wavCoeff[j])
+
+        with _stage(tracer, 'cusumAnalysis', j + 1, tracer and Dj.size):
+            if axis is not None:
+                std = Dj.std(axis=axis)
+                SjB, Sjs = analysisCusum(Dj, k2[j], mean=Dj.mean(axis=axis),
+                                         std=std, axis=axis)
+            elif stats is None:
+                SjB, Sjs = analysisCusum(Dj, k2[j])
+                std = None
+            else:
+                std = stats.std(j)
+                SjB, Sjs = analysisCusum(Dj, k2[j], mean=stats.mean(j),
+                                         std=std)
+
+        with _stage(tracer, 'cusumThreshold', j + 1, tracer and Dj.size):
+            wavCoeff2[j] = thresholdCusum(Dj, SjB, Sjs, std=std, h=h2[j],
+                                          out=wavCoeff2[j], axis=axis)
+
+    coefficients2 = [scaleCoeff]
+    coefficients2.extend(wavCoeff2)
+
+    return coefficients2, k2, h2
+
+
+def filtrationAll(coefficients, methods=('visu', 'sure', 'bayes', 'spc',
+                                         'cusumTrad', 'cusumDecay'),
+                  mode='hard', methodParams=None, wavelet=None,
+                  extension='symmetric', tracer=None, verbose=True):
+    '''
+    Filters the same wavelet coefficients with many methods of
+    ``filtration`` and ``cusumFiltration`` in one call, for comparing the
+    methods. The work of each level is shared between the methods: the
+    statistics of the coefficients (``threshold.DecompositionStats``), the
+    thresholding of all methods of ``filtration`` (one call per level with
+    the lambdas of all of them) and the CUSUM limits of the methods with the
+    same "k". The results are the same of the calls of ``filtration`` and
+    ``cusumFiltration`` with each method.
+
+    With wavelet the filtered coefficients of all methods are stacked (one
+    method per row) and recomposed by a single
+    ``pywt.waverec(..., axis=-1)``.
+
+    Parameters
+    ----------
+    coefficients: list of 1-D array-like
+        The wavelet coefficients and the scale coefficients of the last
+        level, like in ``filtration``.
+
+    methods: list or tuple of string
+        Optional. The methods of ``filtration`` ('visu', 'sure', 'bayes',
+        'spc') and of ``cusumFiltration`` ('cusumTrad', 'cusumDecay',
+        'cusumAdap').
+
+    mode: string
+        Optional, is 'hard' by default. The mode of the methods of
+        ``filtration``.
+
+    methodParams: dict
+        Optional, is None by default. Parameters of each method, like
+        ``{'spc': {'p': 2}, 'cusumAdap': {'h': [...], 'k': [...]}}``. The
+        parameters are the ones of ``filtration`` (p, dim_t, search) and of
+        ``cusumFiltration`` (h, k), with the same default values.
+
+    wavelet: string or pywt.Wavelet
+        Optional, is None by default. If given, the filtered signals are
+        also recomposed.
+
+    extension: string
+        Optional, is 'symmetric' by default. The signal extension mode of
+        ``pywt.waverec``.
+
+    tracer: profiling.Tracer
+        Optional, is None by default (the tracer activated by "with", if
+        any). Records the stages 'lambdas' (per method), 'threshold',
+        'cusumAnalysis' and 'cusumThreshold' (per level, for all methods)
+        and 'reconstruction'.
+
+    verbose: bool
+        Optional, is True by default. If False the advices about the
+        default parameters aren't printed.
+
+    Returns
+    -------
+    dict or tuple:
+        A dict with the method as key and as value the tuple returned by
+        ``filtration`` (coefficients and lambdas) or by ``cusumFiltration``
+        (coefficients, "k" and "h") for the method. With wavelet, a tuple
+        with [0] this dict and [1] a dict with the method as key and the
+        filtered signal as value.
+
+    Examples
+    --------
+    >>> results, signals = filtrationAll(pywt.wavedec(noisySignal, 'db8'),
+    ...                                  wavelet='db8')
+    >>> filtrateCoeff, limiars = results['visu']
+
+    See also
+    --------
+    filtration: Filtration by one threshold method.
+    cusumFiltration: Filtration by one CUSUM method.
+    '''
+
+    from statsWaveletFilt.cusum import analysisCusum, thresholdCusum
+    from statsWaveletFilt.profiling import _tracer, _stage
+    from statsWaveletFilt.threshold import DecompositionStats, _threshold
+    import numpy as np
+    import pywt
+
+    tracer = _tracer(tracer)
+
+    if methodParams is None:
+        methodParams = {}
+
+    for method in methods:
+        if method not in ('visu', 'sure', 'bayes', 'spc', 'cusumTrad',
+                          'cusumDecay', 'cusumAdap'):
+            raise Exception("Method '%s' not found" % method)
+
+    scaleCoeff = np.asarray(coefficients[0])
+    wavCoeff = [np.asarray(wavCoeff_i) for wavCoeff_i in coefficients[1:]]
+
+    stats = DecompositionStats(wavCoeff)
+
+    thresholdMethods = [method for method in methods
+                        if not method.startswith('cusum')]
+    cusumMethods = [method for method in methods if method.startswith('cusum')]
+
+    lambdaValues = {}
+    for method in thresholdMethods:
+        params = dict({'p': 3, 'dim_t': 1024, 'search': 'grid'},
+                      **methodParams.get(method, {}))
+
+        if verbose and params['p'] == 3 and method == 'spc':
+            print(('ADVICE: The p value for spc method used is ' +
+                   'equal to default, 3!'))
+
+        if verbose and params['dim_t'] == 1024 and method == 'sure' and \
+                params['search'] == 'grid':
+            print(('ADVICE: The t-dimension value for sure method used is ' +
+                   'equal to default, 1024!'))
+
+        with _stage(tracer, 'lambdas', None,
+                    tracer and sum(d.size for d in wavCoeff)):
+            lambdaValues[method] = _lambdas(wavCoeff, method, stats=stats,
+                                            **params)
+
+    cusumValues = {}
+    for method in cusumMethods:
+        params = dict({'h': 5, 'k': 1/2}, **methodParams.get(method, {}))
+        cusumValues[method] = _cusumParameters(len(wavCoeff), params['h'],
+                                               params['k'], method, verbose)
+
+    # The filtered coefficients of all methods, one row per method
+    stacked = [np.repeat(scaleCoeff[None, :], len(methods), axis=0)]
+
+    for j, Dj in enumerate(wavCoeff):
+        level = np.empty((len(methods), Dj.size),
+                         dtype=np.result_type(Dj, 0.))
+
+        if thresholdMethods:
+            rows = [methods.index(method) for method in thresholdMethods]
+            with _stage(tracer, 'threshold', j + 1,
+                        tracer and Dj.size * len(rows)):
+                level[rows] = _threshold(
+                    Dj, np.array([[lambdaValues[method][j]]
+                                  for method in thresholdMethods],
+                                 dtype=level.dtype), mode)
+
+        # CUSUM limits of each "k" of the level
+        limits = {}
+        for method in cusumMethods:
+            k_j, h_j = cusumValues[method][0][j], cusumValues[method][1][j]
+            if k_j not in limits:
+                with _stage(tracer, 'cusumAnalysis', j + 1,
+                            tracer and Dj.size):
+                    limits[k_j] = analysisCusum(Dj, k_j, mean=stats.mean(j),
+                                                std=stats.std(j))
+            with _stage(tracer, 'cusumThreshold', j + 1, tracer and Dj.size):
+                thresholdCusum(Dj, *limits[k_j], std=stats.std(j), h=h_j,
+                               out=level[methods.index(method)])
+
+        stacked.append(level)
+
+    results = {}
+    for i, method in enumerate(methods):
+        coefficients2 = [coeff[i] for coeff in stacked]
+        if method in lambdaValues:
+            results[method] = (coefficients2, lambdaValues[method])
+        else:
+            results[method] = (coefficients2,) + tuple(cusumValues[method])
+
+    if wavelet is None:
+        return results
+
+    with _stage(tracer, 'reconstruction', None,
+                tracer and sum(coeff.size for coeff in stacked)):
+        recovered = pywt.waverec(stacked, wavelet, mode=extension, axis=-1)
+    signals = {method: recovered[i] for i, method in enumerate(methods)}
+
+    return results, signals
+
+
+def denoiseBatch(signals, method='visu', wavelet='db8', level=5,
+                 verbose=True, **params):
+    '''
+    Denoises many signals of the same size at once: decomposition
+    (``pywt.wavedec(..., axis=-1)``), filtration of all of them together
+    (``filtrationBatch`` or ``cusumFiltration`` with axis) and
+    recomposition. Each signal is filtered with its own lambdas (or CUSUM
+    mean and standard deviation), like ``filtration`` of the signal alone.
+
+    Parameters
+    ----------
+    signals: 2-D array-like or list of 1-D array-like
+        The signals, one per row.
+    method: string
+        Optional, is 'visu' by default. The methods of ``filtration`` and of
+        ``cusumFiltration``.
+    wavelet: string or pywt.Wavelet
+        Optional, is 'db8' by default.
+    level: int
+        Optional, is 5 by default.
+    verbose: bool
+        Optional, is True by default. If False the advices about the
+        default parameters aren't printed.
+    params:
+        Optional. The parameters of the method (p, mode, dim_t, search, h,
+        k).
+
+    Returns
+    -------
+    numpy.array:
+        The denoised signals (signals x samples).
+
+    See also
+    --------
+    filtrationBatch: Filtration of the coefficients of many signals.
+    '''
+
+    import numpy as np
+    import pywt
+
+    signals = np.stack(signals)
+
+    coefficients = pywt.wavedec(signals, wavelet, level=level, axis=-1)
+
+    if method.startswith('cusum'):
+        filtered = cusumFiltration(coefficients, method=method, axis=-1,
+                                   verbose=verbose, **params)[0]
+    else:
+        filtered = filtrationBatch(coefficients, method, verbose=verbose,
+                                   **params)[0]
+
+    return pywt.waverec(filtered, wavelet, axis=-1)[:, :signals.shape[-1]]
+
+
+def streamFiltration(blocks, wavelet='db8', level=5, method='visu',
+                     blockSize=16384, lambdas=None, p=3, mode='hard',
+                     dim_t=1024, search='grid', h=5, k=1/2, mean=None,
+                     std=None, extension='symmetric', verbose=True):
+    '''
+    Filters a signal of any size that arrives in blocks (a generator, a file
+    read in parts, ...), with bounded memory. The signal is decomposed,
+    filtered and recomposed in windows of blockSize samples plus an overlap
+    in each side that covers the support of the wavelet filters in the
+    choiced level (overlap-save), and the centers of the windows are
+    yielded.
+
+    With fixed lambdas (or, in CUSUM methods, fixed mean and std of each
+    level) the stitched signal is the same of the filtration of the whole
+    signal, ``pywt.waverec(filtration(pywt.wavedec(signal))[0])``, up to
+    floating point rounding. Otherwise the lambdas are estimated in each
+    window and the CUSUM methods use the running mean and standard deviation
+    of each level (see ``cusum.StreamingCusum``), so the result adapts to
+    the local noise of the signal.
+
+    Parameters
+    ----------
+    blocks: iterable of 1-D array-like
+        The blocks of samples of the signal, of any size.
+
+    wavelet: string or pywt.Wavelet
+        Optional, is 'db8' by default.
+
+    level: int
+        Optional, is 5 by default. The level of the decomposition.
+
+    method: string
+        Optional, is 'visu' by default. The methods of ``filtration`` ('visu',
+        'sure', 'bayes' and 'spc') and of ``cusumFiltration`` ('cusumTrad',
+        'cusumDecay' and 'cusumAdap').
+
+    blockSize: int
+        Optional, is 16384 by default. Size of the yielded blocks (rounded up
+        to a multiple of 2**level). The last one can be smaller.
+
+    lambdas: list of float
+        Optional, is None by default. Fixed lambda values of each level, in
+        the order of ``pywt.wavedec``. If None the lambdas are estimated by
+        the method in each window.
+
+    p, mode, dim_t, search:
+        Optional. The same of ``filtration``.
+
+    h, k:
+        Optional. The same of ``cusumFiltration``.
+
+    mean, std: list of float
+        Optional, is None by default. Fixed mean and standard deviation of
+        each level, for the CUSUM methods.
+
+    extension: string
+        Optional, is 'symmetric' by default. The signal extension mode of
+        ``pywt.wavedec``.
+
+    verbose: bool
+        Optional, is True by default. If False the advices about the
+        default parameters aren't printed.
+
+    Returns
+    -------
+    generator:
+        The filtered blocks, as numpy.array.
+
+    See also
+    --------
+    filtration: Filtration of the whole signal.
+    cusumFiltration: Filtration of the whole signal using CUSUM.
+    '''
+
+    from statsWaveletFilt.cusum import StreamingCusum
+    from statsWaveletFilt.threshold import _threshold
+    import numpy as np
+    import pywt
+
+    wavelet = pywt.Wavelet(wavelet) if isinstance(wavelet, str) else wavelet
+    L = wavelet.dec_len
+    step = 2**level
+
+    blockSize = -(-blockSize // step) * step
+    overlap = step * (2*L + 2)
+
+    isCusum = method in ('cusumTrad', 'cusumDecay', 'cusumAdap')
+    if isCusum:
+        k2, h2 = _cusumParameters(level, h, k, method, verbose)
+        streams = [StreamingCusum(k2[j], h2[j],
+                                  None if mean is None else mean[j],
+                                  None if std is None else std[j])
+                   for j in range(level)]
+        # Per level: next coefficient to analyse and the thresholded
+        # coefficients still needed (from the global index "first")
+        fed = [0] * level
+        first = [0] * level
+        done = [np.zeros(0) for j in range(level)]
+
+    def filterWindow(window, start, center, last):
+        '''
+        Filters the samples window (the signal from sample "start") and
+        returns the samples of the center [center[0], center[1]).
+        '''
+
+        coefficients = pywt.wavedec(window, wavelet, mode=extension,
+                                    level=level)
+
+        if not isCusum:
+            if lambdas is None:
+                lambdaValues = _lambdas(coefficients[1:], method, p, dim_t,
+                                        search)
+            else:
+                lambdaValues = lambdas
+            for j in range(1, level + 1):
+                coefficients[j] = _threshold(coefficients[j],
+                                             lambdaValues[j - 1], mode)
+        else:
+            for j in range(level):
+                coeff = coefficients[j + 1]
+                scale = 2**(level - j)
+                offset = start // scale
+
+                # Global indexes of the coefficients that influence the
+                # center samples, all unaffected by the window borders
+                low = max(center[0] // scale - 1, offset)
+                high = offset + coeff.size if last else \
+                    min(-(-center[1] // scale) + L + 2, offset + coeff.size)
+
+                if fed[j] < high:
+                    new = streams[j].process(coeff[fed[j] - offset:
+                                                   high - offset])
+                    done[j] = np.concatenate((done[j], new))
+                    fed[j] = high
+
+                done[j] = done[j][low - first[j]:]
+                first[j] = low
+
+                coefficients[j + 1] = np.zeros_like(coeff)
+                coefficients[j + 1][low - offset:high - offset] = \
+                    done[j][:high - low]
+
+        signal = pywt.waverec(coefficients, wavelet, mode=extension)
+        return signal[center[0] - start:center[1] - start]
+
+    # Samples received and not yet released: pending[0] starts in the sample
+    # "bufferStart" of the signal
+    pending = []
+    n_pending = 0
+    bufferStart = 0
+    center = 0
+
+    for block in blocks:
+        block = np.asarray(block).ravel()
+        pending.append(block)
+        n_pending += block.size
+
+        if bufferStart + n_pending < center + blockSize + overlap:
+            continue
+
+        # Joined once per incoming block, the windows are views of it
+        buffer = np.concatenate(pending)
+        while bufferStart + n_pending >= center + blockSize + overlap:
+            start = max(center - overlap, 0)
+            window = buffer[start - bufferStart:
+                            center + blockSize + overlap - bufferStart]
+
+            yield filterWindow(window, start,
+                               (center, center + blockSize), False)
+
+            center += blockSize
+            newStart = max(center - overlap, 0)
+            buffer = buffer[newStart - bufferStart:]
+            n_pending -= newStart - bufferStart
+            bufferStart = newStart
+        pending = [buffer]
+
+    if n_pending and bufferStart + n_pending > center:
+        buffer = np.concatenate(pending)
+        end = bufferStart + n_pending
+        signal = filterWindow(buffer, bufferStart, (center, end), True)
+
+        for i in range(0, signal.size, blockSize):
+            yield signal[i:i + blockSize]
+
+
+def _cusumParameters(n_levels, h=5, k=1/2, method='cusumTrad',
+                     verbose=True):
+    '''
+    Internal function, gives the "k" and "h" values of each wavelet level
+    for the choiced method of ``cusumFiltration`` (with verbose, prints the
+    advice of 'cusumDecay').
+    '''
+
+    import numpy as np
 
     if method == 'cusumTrad':
-        h2 = [h] * len(wavCoeff2)
-        k2 = [k] * len(wavCoeff2)
+        h2 = [h] * n_levels
+        k2 = [k] * n_levels
 
     elif method == 'cusumDecay':
 
-        print(('ADVICE: This method was addaptated to 5 levels of wavelet ' +
-               'coefficients [2]! For more levels the method will be ' +
-               'readapted, no garanties of performance'))
+        if verbose:
+            print(('ADVICE: This method was addaptated to 5 levels of ' +
+                   'wavelet coefficients [2]! For more levels the method ' +
+                   'will be readapted, no garanties of performance'))
 
-        k2 = [k] * len(wavCoeff2)
+        k2 = [k] * n_levels
 
-        j_lvl = np.arange(0, len(wavCoeff), 1)
-        h2 = -7*np.log10(.201 * (len(wavCoeff) - j_lvl))
+        j_lvl = np.arange(0, n_levels, 1)
+        h2 = -7*np.log10(.201 * (n_levels - j_lvl))
 
     elif method == 'cusumAdap':
 
@@ -187,22 +973,17 @@ def cusumFiltration(coefficients, h=5, k=1/2, method='cusumTrad'):
 
         # 2) Check if the size the array-like parameters is the same to the
         #    wavelet coefficients
-        if len(k) != len(wavCoeff2):
+        if len(k) != n_levels:
             raise Exception(("Size of 'k' doesn't match with the size of " +
                              "wavelet coefficients"))
 
-        if len(h) != len(wavCoeff2):
-            raise Exception(("Size of 'k' doesn't match with the size of " +
+        if len(h) != n_levels:
+            raise Exception(("Size of 'h' doesn't match with the size of " +
                              "wavelet coefficients"))
         k2 = k
         h2 = h
 
-    for j, Dj in enumerate(wavCoeff2):
-        SjB, Sjs = analysisCusum(Dj, k2[j])
+    else:
+        raise Exception("Method '%s' not found" % method)
 
-        wavCoeff2[j] = thresholdCusum(Dj, SjB, Sjs, h=h2[j])
-
-    coefficients2 = [scaleCoeff]
-    coefficients2.extend(wavCoeff2)
-
-    return coefficients2, k2, h2
+    return k2, h2
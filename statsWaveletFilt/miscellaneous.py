@@ -142,11 +142,30 @@ def generateData(functions=['doppler', 'block', 'bump', 'heavsine'],
                  varNoises=[0.001, 0.002, 0.003, 0.004, 0.005, 0.006, 0.007,
                             0.008, 0.009, 0.010],
                  dim_signals=1024,
-                 n_samples_per_sig_per_noise=10000, folder='tmp'):
+                 n_samples_per_sig_per_noise=10000, folder='tmp',
+                 layout='files', seed=0, dtype='float64'):
     '''
     If you like to generate your dataset before run your test you can use
     this function to generate the data. With the 1) type of signal and
     2) quantity of noise (in variance). Saves in ``.npy``
+
+    With layout 'files' (default) each noisy signal is saved in its own file
+    ``folder/function/varNoise_counter.npy``, with the noise seeded by the
+    counter. With layout 'stacked' all signals are saved in one memory-mapped
+    array ``folder/data.npy`` (functions x varNoises x samples x dim), the
+    ideal signals in ``folder/ideal.npy`` and the description of the dataset
+    (functions, variances, seeds, ...) in ``folder/manifest.json``. The noise
+    of each (function, varNoise) comes from its own generator, spawned from
+    ``numpy.random.SeedSequence(seed)``, and is drawn in large blocks.
+
+    Parameters
+    ----------
+    layout: string
+        Optional, is 'files' by default. Can be 'files' or 'stacked'.
+    seed: int
+        Optional, is 0 by default. Used only in the 'stacked' layout.
+    dtype: string
+        Optional, is 'float64' by default. Used only in the 'stacked' layout.
     '''
 
     from statsWaveletFilt.signals import bumpFunction, blockFunction
@@ -170,6 +189,11 @@ def generateData(functions=['doppler', 'block', 'bump', 'heavsine'],
     functions_dic_used = {function: functions_dic[function]
                           for function in functions}
 
+    if layout == 'stacked':
+        _generateStackedData(functions_dic_used, varNoises, dim_signals, n_it,
+                             folder, seed, dtype)
+        return
+
     for name, function in functions_dic_used.items():
         x, y = function(dim_signals)
         print('|----', name)
@@ -193,3 +217,65 @@ def generateData(functions=['doppler', 'block', 'bump', 'heavsine'],
                 
                 np.save(filename, sinalNoisy)
                 counter += 1
+
+
+def _generateStackedData(functions_dic, varNoises, dim_signals, n_samples,
+                         folder, seed=0, dtype='float64'):
+    '''
+    Internal function, writes the 'stacked' layout of ``generateData``.
+    '''
+
+    import json
+    import numpy as np
+    import os
+
+    shape = (len(functions_dic), len(varNoises), n_samples, dim_signals)
+
+    data = np.lib.format.open_memmap(os.path.join(folder, 'data.npy'),
+                                     mode='w+', dtype=dtype, shape=shape)
+    ideal = np.lib.format.open_memmap(os.path.join(folder, 'ideal.npy'),
+                                      mode='w+', dtype=dtype,
+                                      shape=(shape[0], dim_signals))
+
+    seedSequences = np.random.SeedSequence(seed).spawn(shape[0] * shape[1])
+
+    # Rows of noise drawn at once (about 32 MB in float64)
+    blockRows = max(1, 2**22 // dim_signals)
+
+    seeds = []
+    for i, (name, function) in enumerate(functions_dic.items()):
+        x, y = function(dim_signals)
+        ideal[i] = y
+        print('|----', name)
+
+        for j, varNoise in enumerate(varNoises):
+            print('|----|----', varNoise)
+            seedSequence = seedSequences[i * shape[1] + j]
+            rng = np.random.default_rng(seedSequence)
+
+            for first in range(0, n_samples, blockRows):
+                rows = min(blockRows, n_samples - first)
+                noise = rng.normal(0, np.sqrt(varNoise),
+                                   (rows, dim_signals))
+                data[i, j, first:first + rows] = y + noise
+
+            seeds.append({'function': name, 'varNoise': varNoise,
+                          'entropy': seedSequence.entropy,
+                          'spawn_key': list(seedSequence.spawn_key)})
+
+    data.flush()
+    ideal.flush()
+
+    manifest = {'layout': 'stacked',
+                'data': 'data.npy',
+                'ideal': 'ideal.npy',
+                'functions': list(functions_dic),
+                'varNoises': list(varNoises),
+                'n_samples': n_samples,
+                'dim_signals': dim_signals,
+                'dtype': np.dtype(dtype).name,
+                'seed': seed,
+                'seeds': seeds}
+
+    with open(os.path.join(folder, 'manifest.json'), 'w') as file:
+        json.dump(manifest, file, indent=2)
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+'''
+**Wavelet Based in CUSUM control chart for filtering signals Project (module**
+``statsWaveletFilt.plan`` **):** Reusable plans to denoise many signals of the
+same size with the same wavelet, level and method (a real-time loop, for
+example).
+'''
+
+
+class DenoisePlan(object):
+    '''
+    A plan to denoise signals of a fixed size: decomposition
+    (``pywt.wavedec``), filtration (``filtration.filtration`` or
+    ``filtration.cusumFiltration``) and recomposition (``pywt.waverec``).
+
+    Everything that depends only on the size, wavelet, level and method is
+    computed once when the plan is built: the sizes and the position of each
+    level in the flat array of coefficients (``sizes`` and ``slices``), the
+    "k" and "h" values of the CUSUM methods and the workspaces of the
+    thresholding. ``execute`` writes the filtered coefficients in the
+    preallocated ``coefficients`` (views of one flat array), the lambdas in
+    ``lambdas`` and the signal in the out array, so repeated calls allocate
+    only what ``pywt`` and the lambda estimation allocate internally.
+
+    Parameters
+    ----------
+    length: int
+        The size of the signals.
+    wavelet: string or pywt.Wavelet
+        Optional, is 'db8' by default.
+    level: int
+        Optional, is 5 by default.
+    method: string
+        Optional, is 'visu' by default. The methods of
+        ``filtration.filtration`` ('visu', 'sure', 'bayes' and 'spc') and of
+        ``filtration.cusumFiltration`` ('cusumTrad', 'cusumDecay' and
+        'cusumAdap').
+    p, mode, dim_t, search:
+        Optional. The same of ``filtration.filtration``.
+    h, k:
+        Optional. The same of ``filtration.cusumFiltration``.
+    extension: string
+        Optional, is 'symmetric' by default. The signal extension mode of
+        ``pywt.wavedec``.
+    dtype: numpy.dtype
+        Optional, is float (float64) by default. The float type of the
+        workspaces and of the result; with numpy.float32 the signals are
+        denoised in float32 (see ``filtration.filtration``).
+
+    Examples
+    --------
+    >>> plan = DenoisePlan(1024, 'db8', 5, method='visu')
+    >>> out = np.empty(1024)
+    >>> for signal in signals:
+    ...     plan.execute(signal, out=out)
+
+    See also
+    --------
+    filtration.filtration: Filtration of the wavelet coefficients.
+    filtration.cusumFiltration: Filtration using CUSUM.
+    '''
+
+    def __init__(self, length, wavelet='db8', level=5, method='visu', p=3,
+                 mode='hard', dim_t=1024, search='grid', h=5, k=1/2,
+                 extension='symmetric', dtype=float):
+        from statsWaveletFilt.filtration import _cusumParameters
+        import numpy as np
+        import pywt
+
+        if method not in ('visu', 'sure', 'bayes', 'spc', 'cusumTrad',
+                          'cusumDecay', 'cusumAdap'):
+            raise Exception("Method '%s' not found" % method)
+
+        self.length = length
+        self.wavelet = pywt.Wavelet(wavelet) if isinstance(wavelet, str) \
+            else wavelet
+        self.level = level
+        self.method = method
+        self.p = p
+        self.mode = mode
+        self.dim_t = dim_t
+        self.search = search
+        self.extension = extension
+        self.dtype = np.dtype(dtype)
+        self.isCusum = method.startswith('cusum')
+
+        # Sizes of the coefficients, in the order of pywt.wavedec
+        sizes = []
+        n = length
+        for j in range(level):
+            n = pywt.dwt_coeff_len(n, self.wavelet.dec_len, extension)
+            sizes.append(n)
+        self.sizes = [sizes[-1]] + sizes[::-1]
+
+        bounds = np.cumsum([0] + self.sizes)
+        self.slices = [slice(bounds[j], bounds[j + 1])
+                       for j in range(len(self.sizes))]
+
+        self._flat = np.zeros(bounds[-1], dtype=self.dtype)
+        self.coefficients = [self._flat[s] for s in self.slices]
+        self.lambdas = np.zeros(level, dtype=self.dtype)
+
+        self._work = np.empty(max(self.sizes[1:]), dtype=self.dtype)
+        self._mask = np.empty(max(self.sizes[1:]), dtype=bool)
+
+        if self.isCusum:
+            self.k, self.h = _cusumParameters(level, h, k, method)
+
+    def execute(self, signal, out=None, tracer=None):
+        '''
+        Denoises a signal with the plan.
+
+        Parameters
+        ----------
+        signal: 1-D array-like
+            The noisy signal, of the size of the plan.
+        out: 1-D numpy.array
+            Optional, is None by default (a new array). Where the denoised
+            signal is written.
+        tracer: profiling.Tracer
+            Optional, is None by default (the tracer activated by "with", if
+            any). Records the stages 'decomposition', 'lambdas', 'threshold'
+            (or 'cusumAnalysis' and 'cusumThreshold') and 'reconstruction'.
+
+        Returns
+        -------
+        numpy.array:
+            out, with the denoised signal.
+        '''
+
+        from statsWaveletFilt.cusum import analysisCusum, thresholdCusum
+        from statsWaveletFilt.filtration import _lambdas
+        from statsWaveletFilt.profiling import _tracer, _stage
+        from statsWaveletFilt.threshold import _thresholdInto
+        import numpy as np
+        import pywt
+
+        tracer = _tracer(tracer)
+
+        signal = np.asarray(signal, dtype=self.dtype)
+        if signal.shape != (self.length,):
+            raise Exception("Signal size doesn't match with the plan")
+
+        with _stage(tracer, 'decomposition', None, self.length):
+            coefficients = pywt.wavedec(signal, self.wavelet,
+                                        mode=self.extension, level=self.level)
+
+        np.copyto(self.coefficients[0], coefficients[0])
+        details = coefficients[1:]
+
+        if not self.isCusum:
+            with _stage(tracer, 'lambdas', None, self._flat.size -
+                        self.sizes[0]):
+                self.lambdas[:] = _lambdas(details, self.method, self.p,
+                                           self.dim_t, self.search)
+
+        for j, Dj in enumerate(details):
+            out_j = self.coefficients[j + 1]
+            work = self._work[:Dj.size]
+            mask = self._mask[:Dj.size]
+
+            if not self.isCusum:
+                with _stage(tracer, 'threshold', j + 1, Dj.size):
+                    _thresholdInto(Dj, self.lambdas[j], self.mode, out=out_j,
+                                   work=work, mask=mask)
+            else:
+                with _stage(tracer, 'cusumAnalysis', j + 1, Dj.size):
+                    SjB, Sjs = analysisCusum(Dj, self.k[j])
+                with _stage(tracer, 'cusumThreshold', j + 1, Dj.size):
+                    thresholdCusum(Dj, SjB, Sjs, h=self.h[j], out=out_j)
+
+        with _stage(tracer, 'reconstruction', None, self._flat.size):
+            recovered = pywt.waverec(self.coefficients, self.wavelet,
+                                     mode=self.extension)
+
+        if out is None:
+            out = np.empty(self.length, dtype=self.dtype)
+        np.copyto(out, recovered[:self.length])
+
+        return out
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+'''
+**Wavelet Based in CUSUM control chart for filtering signals Project (module**
+``statsWaveletFilt.profiling`` **):** A tracer that records, for each stage
+of the filtering pipeline (decomposition, lambda estimation, thresholding,
+CUSUM accumulation and reconstruction) and each level, the wall time, the
+bytes allocated and the number of coefficients.
+'''
+
+import contextlib
+import contextvars
+
+# Tracer activated by "with" in this thread or asyncio task
+_active = contextvars.ContextVar('statsWaveletFilt.profiling.active',
+                                 default=None)
+
+_NULL = contextlib.nullcontext()
+
+
+class Tracer(object):
+    '''
+    Records the stages of ``filtration.filtration``,
+    ``filtration.cusumFiltration``, ``filtration.filtrationAll`` and
+    ``plan.DenoisePlan.execute``. The tracer is given to them by the
+    parameter tracer or activated with "with" (then the functions called
+    inside use it, in the same thread or asyncio task).
+
+    Each stage gives a record (a dict) with the keys 'stage', 'level' (the
+    index of the wavelet level in the order of ``pywt.wavedec`` or None when
+    the stage covers all levels), 'size' (number of coefficients), 'time'
+    (seconds) and 'bytes' (the peak of memory allocated in the stage, by
+    ``tracemalloc``, or None without memory). The stages are
+    'decomposition', 'lambdas', 'threshold', 'cusumAnalysis',
+    'cusumThreshold' and 'reconstruction'.
+
+    Without a tracer the functions only check that none was given, so the
+    overhead is negligible.
+
+    Parameters
+    ----------
+    callback: callable
+        Optional, is None by default. Called with each record when its stage
+        ends.
+    memory: bool
+        Optional, is False by default. If True the bytes allocated in each
+        stage are measured with ``tracemalloc`` (started if needed, what
+        makes numpy allocations slower).
+    keep: bool
+        Optional, is True by default. If False the records are only given to
+        callback.
+
+    Examples
+    --------
+    >>> with Tracer(memory=True) as tracer:
+    ...     filtration.filtration(coefficients, 'sure')
+    >>> tracer.summary()
+
+    See also
+    --------
+    filtration.filtration: Filtration of the wavelet coefficients.
+    '''
+
+    def __init__(self, callback=None, memory=False, keep=True):
+        self.callback = callback
+        self.memory = memory
+        self.keep = keep
+        self.records = []
+        self._startedMemory = False
+        self._tokens = []
+
+    def __enter__(self):
+        import tracemalloc
+
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._startedMemory = True
+        self._tokens.append(_active.set(self))
+        return self
+
+    def __exit__(self, *exc):
+        import tracemalloc
+
+        _active.reset(self._tokens.pop())
+        if self._startedMemory:
+            tracemalloc.stop()
+            self._startedMemory = False
+        return False
+
+    @contextlib.contextmanager
+    def stage(self, name, level=None, size=None):
+        '''
+        Context manager that records the code inside it as the stage name
+        of the level (with size coefficients).
+        '''
+
+        import time
+        import tracemalloc
+
+        memory = self.memory and tracemalloc.is_tracing()
+        if memory:
+            tracemalloc.reset_peak()
+            startBytes = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+
+            record = {'stage': name, 'level': level, 'size': size,
+                      'time': elapsed,
+                      'bytes': tracemalloc.get_traced_memory()[1] -
+                      startBytes if memory else None}
+
+            if self.keep:
+                self.records.append(record)
+            if self.callback is not None:
+                self.callback(record)
+
+    def summary(self):
+        '''
+        Totals of the records by stage.
+
+        Returns
+        -------
+        dict:
+            The stage as key and as value a dict with 'calls', 'time'
+            (seconds), 'bytes' (the biggest peak, or None) and 'size' (total
+            of coefficients).
+        '''
+
+        summary = {}
+        for record in self.records:
+            total = summary.setdefault(record['stage'],
+                                       {'calls': 0, 'time': 0., 'bytes': None,
+                                        'size': 0})
+            total['calls'] += 1
+            total['time'] += record['time']
+            if record['bytes'] is not None:
+                total['bytes'] = max(total['bytes'] or 0, record['bytes'])
+            if record['size'] is not None:
+                total['size'] += record['size']
+
+        return summary
+
+    def clear(self):
+        '''Removes the records.'''
+        self.records = []
+
+
+def _tracer(tracer=None):
+    '''
+    Internal function, the tracer given to a function of the pipeline or
+    the active one, or None.
+    '''
+
+    if tracer is not None:
+        return tracer
+    return _active.get()
+
+
+def _stage(tracer, name, level=None, size=None):
+    '''
+    Internal function, the context manager of the stage of tracer, or one
+    that does nothing when tracer is None.
+    '''
+
+    if tracer is None:
+        return _NULL
+    return tracer.stage(name, level, size)
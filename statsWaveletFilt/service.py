@@ -0,0 +1,474 @@
+# -*- coding: utf-8 -*-
+
+'''
+**Wavelet Based in CUSUM control chart for filtering signals Project (module**
+``statsWaveletFilt.service`` **):** A local denoising server (``asyncio``),
+over a Unix socket or localhost HTTP, that joins the requests arriving in a
+small time window in vectorized batches (``filtration.denoiseBatch``), so
+many processes share one warmed-up process.
+
+The requests are ``POST /denoise?method=visu&wavelet=db8&level=5`` with the
+signal (1-D) or the signals (2-D, one per row) in the body in the ``.npy``
+format (``numpy.save``), and the response has the denoised signals in the
+same format. ``GET /health`` answers "ok". Run it with
+``python -m statsWaveletFilt.service`` (see ``--help``).
+'''
+
+_METHODS = ['visu', 'sure', 'bayes', 'spc', 'cusumTrad', 'cusumDecay',
+            'cusumAdap']
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+            500: 'Internal Server Error'}
+
+
+class DenoiseServer(object):
+    '''
+    Server that denoises signals (decomposition, filtration and
+    recomposition) in batches. The signals with the same parameters and size
+    are queued; the queue is denoised when it reaches maxBatch signals or
+    maxLatency seconds after its first signal, in a single vectorized call,
+    in a worker thread (the event loop keeps receiving requests).
+
+    Each signal of a batch is filtered with its own lambdas (or CUSUM mean
+    and standard deviation), so the result doesn't depend on the other
+    signals of the batch.
+
+    Parameters
+    ----------
+    maxBatch: int
+        Optional, is 64 by default. The biggest number of signals of a batch.
+    maxLatency: float
+        Optional, is .005 by default. The most time (seconds) that a signal
+        waits for others.
+    wavelet: string
+        Optional, is 'db8' by default. The wavelet of the requests without
+        one.
+    level: int
+        Optional, is 5 by default. The level of the requests without one.
+    workers: int
+        Optional, is 1 by default. Number of threads that denoise the
+        batches.
+
+    Examples
+    --------
+    >>> server = DenoiseServer(maxBatch=128, maxLatency=.002)
+    >>> asyncio.run(server.serve(path='/tmp/denoise.sock'))
+
+    See also
+    --------
+    denoiseRemote: The client of the server.
+    filtration.denoiseBatch: Denoising of many signals at once.
+    '''
+
+    def __init__(self, maxBatch=64, maxLatency=.005, wavelet='db8', level=5,
+                 workers=1):
+        self.maxBatch = maxBatch
+        self.maxLatency = maxLatency
+        self.wavelet = wavelet
+        self.level = level
+        self.workers = workers
+
+        # Per key (parameters, size and dtype): the queued signals and
+        # futures, and the timer of the queue
+        self._pending = {}
+        self._timers = {}
+        self._executor = None
+        self._server = None
+
+    async def start(self, path=None, host='127.0.0.1', port=8765):
+        '''
+        Starts listening in the Unix socket path or, without path, in
+        host:port. Returns the ``asyncio`` server.
+        '''
+
+        from concurrent.futures import ThreadPoolExecutor
+        import asyncio
+
+        self._executor = ThreadPoolExecutor(self.workers)
+
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle,
+                                                           path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host,
+                                                      port)
+        return self._server
+
+    async def serve(self, path=None, host='127.0.0.1', port=8765):
+        '''Starts the server (see ``start``) and serves forever.'''
+
+        await self.start(path, host, port)
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            self._executor.shutdown()
+
+    async def denoise(self, signal, method='visu', wavelet=None, level=None,
+                      **params):
+        '''
+        Denoises one signal, in a batch with the other signals of the same
+        parameters and size received in the window.
+
+        Parameters
+        ----------
+        signal: 1-D array-like
+            The noisy signal.
+        method: string
+            Optional, is 'visu' by default. The methods of
+            ``filtration.filtration`` and ``filtration.cusumFiltration``.
+        wavelet, level:
+            Optional, the ones of the server by default.
+        params:
+            Optional. The parameters of the method (p, mode, dim_t, search,
+            h, k).
+
+        Returns
+        -------
+        numpy.array:
+            The denoised signal.
+        '''
+
+        from statsWaveletFilt.filtration import _cusumParameters
+        import asyncio
+        import numpy as np
+
+        if method not in _METHODS:
+            raise ValueError("Method '%s' not found" % method)
+
+        signal = np.asarray(signal)
+        if signal.ndim != 1:
+            raise ValueError("The signal must be 1-D")
+
+        wavelet = self.wavelet if wavelet is None else wavelet
+        level = self.level if level is None else level
+
+        # The CUSUM parameters are checked before the batch, so their errors
+        # are errors of this request
+        if method.startswith('cusum'):
+            cusumParams = {name: params[name] for name in ('h', 'k')
+                           if name in params}
+            try:
+                _cusumParameters(level, method=method, verbose=False,
+                                 **cusumParams)
+            except Exception as error:
+                raise ValueError(str(error))
+
+        key = (method, wavelet, level, signal.size, signal.dtype.str,
+               tuple(sorted((name, tuple(value) if isinstance(value, list)
+                             else value) for name, value in params.items())))
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        queue = self._pending.setdefault(key, [])
+        queue.append((signal, future))
+
+        if len(queue) >= self.maxBatch:
+            self._flush(key)
+        elif len(queue) == 1:
+            self._timers[key] = loop.call_later(self.maxLatency, self._flush,
+                                                key)
+
+        return await future
+
+    def _flush(self, key):
+        '''
+        Internal method, sends the queue of key to a worker thread.
+        '''
+
+        from statsWaveletFilt.filtration import denoiseBatch
+        import asyncio
+        import functools
+
+        queue = self._pending.pop(key, None)
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        if not queue:
+            return
+
+        method, wavelet, level = key[:3]
+        params = {name: list(value) if isinstance(value, tuple) else value
+                  for name, value in key[5]}
+
+        loop = asyncio.get_running_loop()
+        batch = loop.run_in_executor(
+            self._executor, functools.partial(
+                denoiseBatch, [signal for signal, future in queue], method,
+                wavelet, level, verbose=False, **params))
+
+        def done(batch):
+            error = batch.exception()
+            for i, (signal, future) in enumerate(queue):
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(batch.result()[i])
+
+        batch.add_done_callback(done)
+
+    async def _handle(self, reader, writer):
+        '''
+        Internal method, answers the HTTP requests of one connection.
+        '''
+
+        import asyncio
+
+        try:
+            while True:
+                try:
+                    request = await _readRequest(reader)
+                except ValueError as error:
+                    # The rest of the connection can't be read
+                    writer.write(_response(400, str(error).encode(), False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                verb, target, headers, body = request
+
+                status, payload = await self._answer(verb, target, body)
+
+                keepAlive = headers.get('connection', '').lower() != 'close'
+                writer.write(_response(status, payload, keepAlive))
+                await writer.drain()
+
+                if not keepAlive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _answer(self, verb, target, body):
+        '''
+        Internal method, the status and the body of the response of a
+        request.
+        '''
+
+        from urllib.parse import urlsplit, parse_qsl
+        import asyncio
+        import numpy as np
+
+        url = urlsplit(target)
+
+        if verb == 'GET' and url.path == '/health':
+            return 200, b'ok'
+        if verb != 'POST' or url.path != '/denoise':
+            return 404, b'Not found'
+
+        try:
+            query = dict(parse_qsl(url.query))
+            params = {name: _parseValue(value)
+                      for name, value in query.items()}
+            signals = _loadArray(body)
+            if signals.ndim not in (1, 2):
+                raise ValueError("The signals must be 1-D or 2-D")
+        except Exception as error:
+            return 400, str(error).encode()
+
+        try:
+            rows = [signals] if signals.ndim == 1 else list(signals)
+            denoised = await asyncio.gather(*[self.denoise(row, **params)
+                                              for row in rows])
+        except (ValueError, TypeError) as error:
+            return 400, str(error).encode()
+        except Exception as error:
+            return 500, str(error).encode()
+
+        return 200, _dumpArray(denoised[0] if signals.ndim == 1
+                               else np.stack(denoised))
+
+
+async def _readRequest(reader):
+    '''
+    Internal function, reads an HTTP request: the verb, the target, the
+    headers (lower case names) and the body. None at the end of the
+    connection, ValueError if the request is malformed.
+    '''
+
+    line = await reader.readline()
+    if not line.strip():
+        return None
+
+    try:
+        verb, target, version = line.decode('latin-1').split()
+    except ValueError:
+        raise ValueError("Malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise ValueError("Invalid Content-Length")
+
+    body = await reader.readexactly(length)
+
+    return verb, target, headers, body
+
+
+def _response(status, payload, keepAlive=True):
+    '''
+    Internal function, the bytes of an HTTP response.
+    '''
+
+    contentType = 'application/x-npy' if status == 200 and \
+        payload[:6] == b'\x93NUMPY' else 'text/plain'
+
+    head = ('HTTP/1.1 %d %s\r\n' % (status, _REASONS[status]) +
+            'Content-Type: %s\r\n' % contentType +
+            'Content-Length: %d\r\n' % len(payload) +
+            'Connection: %s\r\n\r\n' % ('keep-alive' if keepAlive
+                                        else 'close'))
+
+    return head.encode('latin-1') + payload
+
+
+def _parseValue(value):
+    '''
+    Internal function, the value of a query parameter: an int, a float, a
+    list of them (separated by commas) or the string.
+    '''
+
+    if ',' in value:
+        return [_parseValue(item) for item in value.split(',')]
+    for kind in (int, float):
+        try:
+            return kind(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _loadArray(payload):
+    '''Internal function, the array of a ``.npy`` payload.'''
+
+    import io
+    import numpy as np
+
+    return np.load(io.BytesIO(payload), allow_pickle=False)
+
+
+def _dumpArray(array):
+    '''Internal function, the ``.npy`` payload of an array.'''
+
+    import io
+    import numpy as np
+
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def denoiseRemote(signals, path=None, host='127.0.0.1', port=8765,
+                  timeout=60, **params):
+    '''
+    Denoises signals in a ``DenoiseServer``.
+
+    Parameters
+    ----------
+    signals: 1-D or 2-D array-like
+        A signal or many signals of the same size (one per row).
+    path: string
+        Optional, is None by default. The Unix socket of the server, or
+        None for host:port.
+    host, port:
+        Optional, '127.0.0.1' and 8765 by default.
+    timeout: float
+        Optional, is 60 by default. Timeout (seconds) of the connection.
+    params:
+        Optional. method, wavelet, level and the parameters of the method
+        (see ``DenoiseServer.denoise``).
+
+    Returns
+    -------
+    numpy.array:
+        The denoised signals, with the shape of signals.
+    '''
+
+    from urllib.parse import urlencode
+    import numpy as np
+    import socket
+
+    query = urlencode({name: ','.join(str(item) for item in value)
+                       if isinstance(value, (list, tuple, np.ndarray))
+                       else value for name, value in params.items()})
+    payload = _dumpArray(np.asarray(signals))
+
+    request = ('POST /denoise?%s HTTP/1.1\r\n' % query +
+               'Host: localhost\r\n' +
+               'Content-Type: application/x-npy\r\n' +
+               'Content-Length: %d\r\n' % len(payload) +
+               'Connection: close\r\n\r\n').encode('latin-1') + payload
+
+    if path is not None:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.settimeout(timeout)
+        connection.connect(path)
+    else:
+        connection = socket.create_connection((host, port), timeout)
+
+    with connection:
+        connection.sendall(request)
+        chunks = []
+        while True:
+            chunk = connection.recv(1 << 16)
+            if not chunk:
+                break
+            chunks.append(chunk)
+
+    head, _, body = b''.join(chunks).partition(b'\r\n\r\n')
+    status = int(head.split(None, 2)[1])
+
+    if status != 200:
+        raise Exception("Server error %d: %s" %
+                        (status, body.decode(errors='replace')))
+
+    return _loadArray(body)
+
+
+def _main(argv=None):
+    '''
+    Internal function, the command line of the module.
+    '''
+
+    import argparse
+    import asyncio
+
+    parser = argparse.ArgumentParser(
+        prog='python -m statsWaveletFilt.service',
+        description='Local denoising server of statsWaveletFilt.')
+    parser.add_argument('--unix', default=None,
+                        help='Unix socket path (instead of host:port)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-latency', type=float, default=.005,
+                        help='seconds (0.005)')
+    parser.add_argument('--wavelet', default='db8')
+    parser.add_argument('--level', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    server = DenoiseServer(args.max_batch, args.max_latency, args.wavelet,
+                           args.level, args.workers)
+    try:
+        asyncio.run(server.serve(args.unix, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    _main()
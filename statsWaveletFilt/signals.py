@@ -8,6 +8,8 @@ process using the module ``statisticFilter`` or any kind of filtration.
 *Created by Tiarles Guterres, 2018*
 '''
 
+from functools import lru_cache
+
 
 def for_dB_scale(x):
     '''
@@ -208,7 +210,166 @@ def differential_snr_dB(initialSignal, finalSignal, method='square_mean_error',
 
     return ret
 
-def dopplerFunction(dim=1024, normalize=True, fq=0):
+
+def differential_snr_dB_coefficients(initialCoeff, finalCoeff,
+                                     method='square_mean_error',
+                                     idealCoeff=None):
+    '''
+    Calculate the same value of ``differential_snr_dB`` from the wavelet
+    coefficients of the signals, without recomposing them. By Parseval the
+    sum of squares of a signal is the one of its coefficients when the
+    transform is orthonormal: an orthogonal wavelet (like 'db8', see
+    ``pywt.Wavelet(...).orthogonal``) with the 'periodization' mode and a
+    signal size multiple of 2**level. The mean of a signal comes from the
+    scale coefficients (their sum times 2**(level/2), divided by the size).
+    The values differ from the ones of the recomposed signals only by
+    rounding.
+
+    Parameters
+    ---------
+    initialCoeff: list of 1-D array-like
+        Coefficients of the initial signal, of ``pywt.wavedec``.
+    finalCoeff: list of 1-D array-like
+        Coefficients of the final signal.
+    method: string, optional
+        Is 'square_mean_error' by default. The methods of
+        ``differential_snr_dB``.
+    idealCoeff: list of 1-D array-like, optional
+        Is None by default, is necessary in all methods except in
+        'square_mean_error' method.
+
+    Returns
+    -------
+    float:
+        The SNR differential value in dB.
+
+    See also
+    --------
+    differential_snr_dB: The same value from the signals.
+    '''
+
+    import numpy as np
+
+    level = len(initialCoeff) - 1
+    size = sum(np.size(c) for c in initialCoeff)
+
+    def moments(a, b):
+        # Mean and mean of squares of the signal of the coefficients a - b
+        differences = [np.asarray(a_j) - b_j for a_j, b_j in zip(a, b)]
+        mean = 2**(level/2) * np.sum(differences[0]) / size
+        meanSquare = sum(np.dot(d, d) for d in differences) / size
+        return mean, meanSquare
+
+    if method == 'square_mean_error':
+        return for_dB_scale(moments(initialCoeff, finalCoeff)[1])
+
+    if idealCoeff is None or method not in ('mean_StandardNoise',
+                                            'amplitude_standardNoise',
+                                            'variances'):
+        raise Exception('Not found method or idealCoeff isn\'t inserted!')
+
+    noiseMean, noiseSquare = moments(initialCoeff, idealCoeff)
+    residuoMean, residuoSquare = moments(finalCoeff, idealCoeff)
+
+    ratio = (noiseSquare - noiseMean**2)/(residuoSquare - residuoMean**2)
+
+    if method == 'variances':
+        return for_dB_scale(ratio)
+    return for_dB_scale(np.sqrt(ratio))
+
+
+def figuresOfMerit(initialSignals, finalSignals, idealSignals=None):
+    '''
+    Calculate all figures of merit of many signals at once: each row (the
+    last axis) of the arrays is a signal. The residual and the noise of each
+    row, their means and their variances are computed once and shared by
+    the metrics, so scoring many filtered signals doesn't need a call per
+    signal and per metric.
+
+    Parameters
+    ----------
+    initialSignals: N-D array-like
+        Initial Signals, before the filtering process, one per row.
+    finalSignals: N-D array-like
+        Final Signals, after the filtering process, one per row.
+    idealSignals: N-D array-like
+        Optional, is None by default. The ideal signals, one per row or a
+        1-D signal common to all rows (broadcast). Without it only
+        'differential_square_mean_error' is calculated.
+
+    Returns
+    -------
+    dict:
+        The metric as key and an array with one value per row (the shape of
+        the arrays without the last axis) as value. The metrics of the final
+        signals are 'snr_square_mean_error' (the MSE),
+        'snr_mean_standardNoise', 'snr_variances' and
+        'cnr_amplitude_standardNoise', like the functions of the same names
+        with the residual (finalSignals - idealSignals) as noise. The
+        differentials in dB are 'differential_' plus the methods of
+        ``differential_snr_dB`` ('square_mean_error', 'mean_StandardNoise',
+        'variances' and 'amplitude_standardNoise').
+
+    .. note::
+        'cnr_amplitude_standardNoise' is the amplitude of idealSignals over
+        the deviation of the residual, as the CNR is defined. The function
+        ``cnr_amplitude_standardNoise`` takes the amplitude of its
+        noiseSignal instead (its idealSignal isn't used), so its values
+        differ from this metric.
+
+    See also
+    --------
+    differential_snr_dB: The SNR or CNR difference of one signal.
+    '''
+
+    import numpy as np
+
+    initialSignals = np.asarray(initialSignals)
+    finalSignals = np.asarray(finalSignals)
+
+    def meanSquare(x):
+        return np.einsum('...i,...i->...', x, x) / x.shape[-1]
+
+    metrics = {'differential_square_mean_error':
+               for_dB_scale(meanSquare(initialSignals - finalSignals))}
+
+    if idealSignals is None:
+        return metrics
+
+    idealSignals = np.asarray(idealSignals)
+
+    noise = initialSignals - idealSignals
+    residual = finalSignals - idealSignals
+
+    residualMean = residual.mean(axis=-1)
+    residualVar = meanSquare(residual - residualMean[..., None])
+    residualStd = np.sqrt(residualVar)
+
+    noiseVar = meanSquare(noise - noise.mean(axis=-1)[..., None])
+
+    # With a common ideal signal its statistics are computed once
+    idealMean = idealSignals.mean(axis=-1)
+    idealVar = meanSquare(idealSignals - idealMean[..., None])
+    amplitude = np.maximum(np.abs(idealSignals.max(axis=-1)),
+                           np.abs(idealSignals.min(axis=-1)))
+
+    metrics['snr_square_mean_error'] = meanSquare(residual)
+    metrics['snr_mean_standardNoise'] = idealMean / residualStd
+    metrics['snr_variances'] = idealVar / residualVar
+    metrics['cnr_amplitude_standardNoise'] = amplitude / residualStd
+
+    differential = for_dB_scale(np.sqrt(noiseVar) / residualStd)
+    metrics['differential_mean_StandardNoise'] = differential
+    metrics['differential_amplitude_standardNoise'] = differential
+    metrics['differential_variances'] = for_dB_scale(noiseVar / residualVar)
+
+    shape = np.broadcast_shapes(initialSignals.shape, finalSignals.shape,
+                                idealSignals.shape)[:-1]
+    return {name: np.array(np.broadcast_to(value, shape))
+            for name, value in metrics.items()}
+
+
+def dopplerFunction(dim=1024, normalize=True, fq=0, cache=True):
     '''
     Generate the Doppler function in a range of 0 to 1, with dim points.
 
@@ -226,6 +387,11 @@ def dopplerFunction(dim=1024, normalize=True, fq=0):
         It is 0 by default. With this default value the original doppler, 
         shown by Donoho [1] will be used.
 
+    cache: bool, optional
+        It is True by default. The signal is computed once and kept in a
+        cache (see ``clearSignalCache``), copies of it are returned. With
+        False the signal is computed again.
+
     Returns
     -------
     tuple:
@@ -238,6 +404,10 @@ def dopplerFunction(dim=1024, normalize=True, fq=0):
            wavelet shrinkage. Biometrika, v. 81, p. 425–455, 1994.
     '''
 
+    if cache:
+        x, y = _cachedSignal('doppler', dim, normalize, fq)
+        return (x.copy(), y.copy())
+
     import numpy as np
     import statsWaveletFilt.miscellaneous as misc
 
@@ -260,7 +430,7 @@ def dopplerFunction(dim=1024, normalize=True, fq=0):
         y_nor = y
     return (x, y_nor)
 
-def heavsineFunction(dim=1024, normalize=True, heavs = 0):
+def heavsineFunction(dim=1024, normalize=True, heavs = 0, cache=True):
     '''
     Generate the Heavsine function in a range of 0 to 1, with dim points.
 
@@ -279,6 +449,11 @@ def heavsineFunction(dim=1024, normalize=True, heavs = 0):
         discontinuities in the heavens characteristic signal shown by 
         Donoho [1] with 0 the signal will be the original, used in [1].
 
+    cache: bool, optional
+        It is True by default. The signal is computed once and kept in a
+        cache (see ``clearSignalCache``), copies of it are returned. The
+        signals with random discontinuities (heavs > 0) are never cached.
+
     Returns
     -------
     tuple:
@@ -291,6 +466,10 @@ def heavsineFunction(dim=1024, normalize=True, heavs = 0):
            wavelet shrinkage. Biometrika, v. 81, p. 425–455, 1994.
     '''
 
+    if cache and heavs == 0:
+        x, y = _cachedSignal('heavsine', dim, normalize, heavs)
+        return (x.copy(), y.copy())
+
     import numpy as np
     import statsWaveletFilt.miscellaneous as misc
 
@@ -317,7 +496,7 @@ def heavsineFunction(dim=1024, normalize=True, heavs = 0):
     return (x, y_nor)
 
 
-def blockFunction(dim=1024, normalize=True, ht = 0):
+def blockFunction(dim=1024, normalize=True, ht = 0, cache=True):
     '''
     Generate the Block function in a range of 0 to 1, with dim points.
 
@@ -336,6 +515,11 @@ def blockFunction(dim=1024, normalize=True, ht = 0):
         characteristic of block signal. The default parameter will generate 
         the signal shown in [1].
 
+    cache: bool, optional
+        It is True by default. The signal is computed once and kept in a
+        cache (see ``clearSignalCache``), copies of it are returned. The
+        signals with random commutations (ht > 0) are never cached.
+
     Returns
     -------
     tuple:
@@ -347,6 +531,10 @@ def blockFunction(dim=1024, normalize=True, ht = 0):
     .. [1] DONOHO, D. L.; JOHNSTONE, I. M. Ideal spatial adaptation via
            wavelet shrinkage. Biometrika, v. 81, p. 425–455, 1994.
     '''
+    if cache and ht == 0:
+        x, y = _cachedSignal('block', dim, normalize, ht)
+        return (x.copy(), y.copy())
+
     import numpy as np
     import statsWaveletFilt.miscellaneous as misc
 
@@ -366,9 +554,13 @@ def blockFunction(dim=1024, normalize=True, ht = 0):
     x = linspace(0, 1, dim)
 
     K = lambda t: (1 + sign(t))/2
-    y = array([sum([h[j]*K(xi - t[j])
-                    for j in range(len(h))])
-               for xi in x])
+
+    # All jumps of all points at once (dim x jumps), summed in order along
+    # the jumps like the sum of Python (the same values, bit a bit)
+    h = array(h)
+    terms = h*K(x[:, None] - t[:len(h)])
+    y = np.add.accumulate(terms, axis=1)[:, -1] if len(h) else \
+        np.zeros(dim)
 
     if normalize:
         y_nor = misc.normalizeData(y)
@@ -377,7 +569,7 @@ def blockFunction(dim=1024, normalize=True, ht = 0):
     return (x, y_nor)
 
 
-def bumpFunction(dim=1024, normalize=True, wht=0):
+def bumpFunction(dim=1024, normalize=True, wht=0, cache=True):
     '''
     Generate the Bump function in a range of 0 to 1, with dim points. Take care
     to the representation limits of this function is blows infinity in Y axis.
@@ -398,6 +590,11 @@ def bumpFunction(dim=1024, normalize=True, wht=0):
         characteristic of bump signal. The default parameter will generate 
         the signal shown in [1].
 
+    cache: bool, optional
+        It is True by default. The signal is computed once and kept in a
+        cache (see ``clearSignalCache``), copies of it are returned. The
+        signals with random peaks (wht > 0) are never cached.
+
     Returns
     -------
     tuple:
@@ -410,6 +607,10 @@ def bumpFunction(dim=1024, normalize=True, wht=0):
            wavelet shrinkage. Biometrika, v. 81, p. 425–455, 1994.
     '''
 
+    if cache and wht == 0:
+        x, y = _cachedSignal('bump', dim, normalize, wht)
+        return (x.copy(), y.copy())
+
     import numpy as np
     import statsWaveletFilt.miscellaneous as misc
 
@@ -436,12 +637,73 @@ def bumpFunction(dim=1024, normalize=True, wht=0):
     x = linspace(0, 1, dim)
 
     K = lambda t: (1 + abs(t))**(-4)
-    y = array([sum([h[j]*K((xi - t[j])/w[j])
-                    for j in range(len(h))])
-               for xi in x])
+
+    # All peaks of all points at once (dim x peaks), each row summed like
+    # the numpy.sum of the list of peaks
+    h, w = array(h), array(w)
+    terms = h*K((x[:, None] - t[:len(h)])/w)
+    y = sum(terms, axis=1)
     
     if normalize:
         y_nor = misc.normalizeData(y)
     else:
         y_nor = y
-    return (x, y_nor)
\ No newline at end of file
+    return (x, y_nor)
+
+
+@lru_cache(maxsize=32)
+def _cachedSignal(name, dim, normalize, param):
+    '''
+    Internal function, computes (once for each name, dim, normalize and
+    parameter, keeping the 32 last used) the signal of ``dopplerFunction``,
+    ``heavsineFunction``, ``blockFunction`` or ``bumpFunction``, with
+    read-only arrays shared by all callers (the functions return copies).
+    '''
+
+    functions_dic = {'doppler': dopplerFunction,
+                     'heavsine': heavsineFunction,
+                     'block': blockFunction,
+                     'bump': bumpFunction}
+
+    x, y = functions_dic[name](dim, normalize, param, cache=False)
+    x.flags.writeable = False
+    y.flags.writeable = False
+
+    return (x, y)
+
+
+def cachedSignal(name, dim=1024, normalize=True, param=0):
+    '''
+    Returns the signal kept in the cache of ``dopplerFunction``,
+    ``heavsineFunction``, ``blockFunction`` or ``bumpFunction`` without
+    copying it. The arrays are read-only and shared by all callers.
+
+    Parameters
+    ----------
+    name: string
+        Can be 'doppler', 'heavsine', 'block' and 'bump'.
+    dim: int
+        Optional, is 1024 by default. Dimension of the signal.
+    normalize: bool
+        Optional, is True by default.
+    param: int or float
+        Optional, is 0 by default. The parameter of the function (fq, heavs,
+        ht or wht).
+
+    Returns
+    -------
+    tuple:
+        [0] 1-D read-only array, coordinates in X axis and [1] 1-D read-only
+        array, coordinates in Y axis
+    '''
+
+    return _cachedSignal(name, dim, normalize, param)
+
+
+def clearSignalCache():
+    '''
+    Removes all signals kept in the cache of ``dopplerFunction``,
+    ``heavsineFunction``, ``blockFunction`` and ``bumpFunction``.
+    '''
+
+    _cachedSignal.cache_clear()
@@ -9,14 +9,19 @@ values for wavelet coefficients based in some referenced works.
 '''
 
 
-def lambdasVisuShrink(wavCoeff):
+def lambdasVisuShrink(wavCoeff, stats=None):
     '''
     Computes the threshold value (lambda) by VisuShrink [1] method.
 
     Parameters
     ---------
     wavCoeff: list of lists or array-like
-        Wavelet coefficients
+        Wavelet coefficients, of ``pywt.wavedec`` or, one lambda per
+        subband, of ``pywt.wavedec2`` and ``pywt.wavedecn`` (see
+        ``_subbands``).
+    stats: DecompositionStats
+        Optional, None by default. Statistics of wavCoeff already computed
+        (or to be shared with other methods).
 
     Returns
     -------
@@ -41,16 +46,20 @@ def lambdasVisuShrink(wavCoeff):
 
     import numpy as np
 
-    # Coefficients Vector from the bigger resolution
-    d_m1 = list(wavCoeff[-1])  # Make a copy
-    d_m1 = np.array(d_m1)       # Turns a numpy.array
+    wavCoeff, nest = _subbands(wavCoeff)
 
-    estDeviation = np.median(np.abs(d_m1))/.6745
+    if stats is None:
+        stats = DecompositionStats(wavCoeff)
+
+    # Coefficients Vector from the bigger resolution (a view, not a copy)
+    d_m1 = stats.wavCoeff[-1]
+
+    estDeviation = stats.sigma(-1)
 
     lambdaValues = [estDeviation * np.sqrt(2*np.log10(d_m1.size))] * \
         len(wavCoeff)
 
-    return lambdaValues
+    return nest(_asFloatType(lambdaValues, stats.wavCoeff))
 
 
 def _sure(vector, ti):
@@ -90,7 +99,7 @@ def _sure(vector, ti):
 
     import numpy as np
 
-    vector2 = np.array(list(vector))
+    vector2 = np.asarray(vector)
 
     soma1 = np.sum(vector2 <= ti)
 
@@ -101,7 +110,56 @@ def _sure(vector, ti):
     return vector2.size - 2 * soma1 + soma2
 
 
-def lambdasSureShrink(wavCoeff, dim_t=1024):
+def _sureExact(sortedCoeff, tmax):
+    '''
+    Internal function, finds the exact minimizer of the risk of ``_sure`` in
+    the interval [0, tmax], for lambdasSureShrink method.
+
+    Between two consecutive coefficients the risk only grows with t, so the
+    minimum is in t = 0 or in one of the coefficients inside the interval.
+    With the coefficients sorted, the risk in all of them is computed with
+    cumulative sums.
+
+    Parameters
+    ---------
+    sortedCoeff: 2-D numpy.array
+        Coefficients sorted in each row, one vector of coefficients per row.
+    tmax: 1-D numpy.array
+        The end of the interval of each row.
+
+    Returns
+    -------
+    numpy.array:
+        The threshold value of each row.
+    '''
+
+    import numpy as np
+
+    n = sortedCoeff.shape[-1]
+
+    sumSquares = np.zeros((sortedCoeff.shape[0], n + 1))
+    np.cumsum(np.power(sortedCoeff, 2), axis=-1, out=sumSquares[:, 1:])
+
+    # Candidates: t = 0 (first column) and t = sortedCoeff[k], with k + 1
+    # coefficients <= t (the last of repeated values gives the right count)
+    t = np.zeros((sortedCoeff.shape[0], n + 1))
+    t[:, 1:] = sortedCoeff
+    below = np.empty(t.shape, dtype=int)
+    below[:, 0] = (sortedCoeff <= 0).sum(axis=-1)
+    below[:, 1:] = np.arange(1, n + 1)
+
+    res_sure = (n - 2 * below +
+                np.take_along_axis(sumSquares, below, axis=-1) +
+                (n - below) * np.power(t, 2))
+
+    inside = (t >= 0) & (t <= np.asarray(tmax)[:, None])
+    res_sure[~inside] = np.inf
+
+    return np.take_along_axis(
+        t, np.argmin(res_sure, axis=-1)[:, None], axis=-1)[:, 0]
+
+
+def lambdasSureShrink(wavCoeff, dim_t=1024, search='grid', stats=None):
     '''
     Computes the threshold value (lambda) by SureShrink [1] method. It's showed
     also in [2].
@@ -113,9 +171,20 @@ def lambdasSureShrink(wavCoeff, dim_t=1024):
     Parameters
     ---------
     wavCoeff: list of lists or array-like
-        Wavelet coefficients
+        Wavelet coefficients, of ``pywt.wavedec`` or, one lambda per
+        subband, of ``pywt.wavedec2`` and ``pywt.wavedecn`` (see
+        ``_subbands``).
     dim_t: optional, 1024 by default. t-dimension. Input vector from
         internal function _sure(vector, dim_t).
+    search: string
+        Optional, 'grid' by default. With 'grid' the risk of ``_sure`` is
+        evaluated in dim_t points between 0 and the VisuShrink value, like in
+        [2]. With 'exact' the coefficients are sorted once and the exact
+        minimizer of the same risk in the same interval is found, in
+        O(N log N) (dim_t isn't used).
+    stats: DecompositionStats
+        Optional, None by default. Statistics of wavCoeff already computed
+        (or to be shared with other methods).
 
     Returns
     -------
@@ -143,25 +212,63 @@ def lambdasSureShrink(wavCoeff, dim_t=1024):
 
     import numpy as np
 
-    wavCoeff2 = [np.array(list(wavCoeff_i)) for wavCoeff_i in wavCoeff]
+    wavCoeff, nest = _subbands(wavCoeff)
+
+    if stats is None:
+        stats = DecompositionStats(wavCoeff)
 
     lambdaValues = []
 
-    for coeff in wavCoeff2:
+    for j, coeff in enumerate(stats.wavCoeff):
 
-        estDeviation = np.median(np.abs(coeff))/.6745
+        estDeviation = stats.sigma(j)
 
         tmax = estDeviation*np.sqrt(2*np.log10(coeff.size))
 
+        if search == 'exact':
+            lambdaValues.append(
+                _sureExact(stats.sorted(j)[None, :], [tmax])[0])
+            continue
+
         t = np.linspace(0, tmax, dim_t)
 
-        res_sure = [_sure(coeff, ti) for ti in t]
+        lambdaValues.append(t[_sureGrid(coeff, stats.sorted(j), t)])
+    return nest(_asFloatType(lambdaValues, stats.wavCoeff))
+
+
+def _sureGrid(coeff, sortedCoeff, t):
+    '''
+    Internal function, the index of the grid point t with the minimum risk
+    of ``_sure``, for lambdasSureShrink method (the same index of
+    ``np.argmin([_sure(coeff, ti) for ti in t])``).
+
+    The risks of all grid points are computed with the sorted coefficients
+    (cumulative sums and a binary search), and only the points whose risk is
+    in the bound of rounding of the minimum are evaluated again by
+    ``_sure``.
+    '''
+
+    import numpy as np
+
+    n = sortedCoeff.size
+
+    sumSquares = np.zeros(n + 1)
+    np.cumsum(np.power(sortedCoeff, 2), out=sumSquares[1:])
+
+    below = np.searchsorted(sortedCoeff, t, 'right')
+
+    res_sure = (n - 2 * below + sumSquares[below] +
+                (n - below) * np.power(t, 2))
 
-        lambdaValues.append(t[np.argmin(res_sure)])
-    return lambdaValues
+    tol = 1e-9 * (n + sumSquares[-1] + n * np.power(t[-1], 2))
+    candidates = np.flatnonzero(res_sure <= res_sure.min() + tol)
 
+    if candidates.size == 1:
+        return candidates[0]
+    return candidates[np.argmin([_sure(coeff, t[i]) for i in candidates])]
 
-def lambdasBayesShrink(wavCoeff):
+
+def lambdasBayesShrink(wavCoeff, stats=None):
     '''
     Computes the threshold value (lambda) by BayesShrink [1] method. It's
     showed also in [2].
@@ -169,7 +276,12 @@ def lambdasBayesShrink(wavCoeff):
     Parameters
     ---------
     wavCoeff: list of lists or array-like
-        Wavelet coefficients
+        Wavelet coefficients, of ``pywt.wavedec`` or, one lambda per
+        subband, of ``pywt.wavedec2`` and ``pywt.wavedecn`` (see
+        ``_subbands``).
+    stats: DecompositionStats
+        Optional, None by default. Statistics of wavCoeff already computed
+        (or to be shared with other methods).
 
     Returns
     -------
@@ -198,25 +310,28 @@ def lambdasBayesShrink(wavCoeff):
 
     import numpy as np
 
-    wavCoeff2 = [np.array(list(wavCoeff_i)) for wavCoeff_i in wavCoeff]
+    wavCoeff, nest = _subbands(wavCoeff)
+
+    if stats is None:
+        stats = DecompositionStats(wavCoeff)
 
-    d_m1 = wavCoeff2[-1]
-    deviation_square = np.power(np.median(np.abs(d_m1))/0.6745, 2)
+    deviation_square = np.power(stats.sigma(-1), 2)
 
     lambdaValues = []
 
-    for wavCoeff_i in wavCoeff2:
-        deviation2_wavCoeff_i = np.sum(np.power(wavCoeff_i, 2))/wavCoeff_i.size
+    for j, wavCoeff_i in enumerate(stats.wavCoeff):
+        deviation2_wavCoeff_i = stats.sumSquares(j)/wavCoeff_i.size
 
         deviation_Xj = np.sqrt(
             np.maximum(deviation2_wavCoeff_i - deviation_square, 0))
 
         lambdaValues.append(deviation_square/deviation_Xj)
 
-    return lambdaValues
+    return nest(_asFloatType(lambdaValues, stats.wavCoeff))
 
 
-def lambdasSPC_Threshold(wavCoeff, p=3):
+def lambdasSPC_Threshold(wavCoeff, p=3, algorithm='mask',
+                         returnIterations=False, stats=None):
     '''
     Computes the threshold value (lambda) by SPC-Threshold [1], [2] method
 
@@ -227,16 +342,37 @@ def lambdasSPC_Threshold(wavCoeff, p=3):
     Parameters
     ---------
     wavCoeff: list of lists or array-like
-        Wavelet coefficients
+        Wavelet coefficients, of ``pywt.wavedec`` or, one lambda per
+        subband, of ``pywt.wavedec2`` and ``pywt.wavedecn`` (see
+        ``_subbands``).
     p: int or float
         Optional, 3 by default. Parameter for the algorithm [1],
         generally is used 2 or 3.
+    algorithm: string
+        Optional, 'mask' by default. With 'mask' the coefficients with
+        abs(d) >= p*Sj are removed and Sj is computed again until none
+        remains, a new pass over the level each time. With 'sort' the
+        coefficients are sorted once and trimmed with binary searches and
+        running sums (O(N log N)); Sj is computed again like in 'mask' at
+        the end and when a decision is too close to the rounding of the
+        running sums, so the lambdas are the same. 'sort' costs about a sort
+        and three passes over the level: in levels of 1M coefficients it was
+        up to 6 times faster when 'mask' needs many passes (small p, heavy
+        tails), but up to 3 times slower when it needs one or two.
+    returnIterations: bool
+        Optional, False by default. If True the number of trimming passes
+        of each level is also returned.
+    stats: DecompositionStats
+        Optional, None by default. Statistics of wavCoeff already computed
+        (or to be shared with other methods): the mean and the first Sj,
+        and with 'sort' the sorted coefficients.
 
     Returns
     -------
     list of float:
         The threshold values for each wavelet coefficients
-        vector.
+        vector. With returnIterations, a tuple with the threshold values and
+        a list of int (the passes of each level).
 
     See also
     --------
@@ -261,18 +397,895 @@ def lambdasSPC_Threshold(wavCoeff, p=3):
 
     import numpy as np
 
-    wavCoeff2 = [np.array(list(wavCoeff_i)) for wavCoeff_i in wavCoeff]
+    wavCoeff, nest = _subbands(wavCoeff)
+
+    if stats is None:
+        stats = DecompositionStats(wavCoeff)
+
+    lambdaValues = []
+    iterations = []
+
+    for j, wavCoeff_i in enumerate(stats.wavCoeff):
+        if algorithm == 'sort':
+            Sj, n_iter = _spcSorted(wavCoeff_i, p, stats.sorted(j),
+                                    stats.deviation(j))
+        elif algorithm == 'mask':
+            n_iter = 0
+            Sj = stats.deviation(j)
+
+            while (np.abs(wavCoeff_i) >= p*Sj).any():
+                wavCoeff_i = wavCoeff_i[np.abs(wavCoeff_i) < p*Sj]
+                Sj = _spcDeviation(wavCoeff_i)
+                n_iter += 1
+        else:
+            raise Exception("Algorithm '%s' not found" % algorithm)
+
+        lambdaValues.append(p*Sj)
+        iterations.append(n_iter)
+
+    lambdaValues = _asFloatType(lambdaValues, stats.wavCoeff)
+
+    if returnIterations:
+        return nest(lambdaValues), nest(iterations)
+    return nest(lambdaValues)
+
+
+def _spcDeviation(d, mean=None):
+    '''
+    Internal function, the deviation Sj of SPC-Threshold (ddof=1) of the
+    coefficients d, with their mean if it is known.
+    '''
+
+    import numpy as np
+
+    if mean is None:
+        mean = d.mean()
+    return np.sqrt(1./(d.size - 1) * np.sum(np.power(d - mean, 2)))
+
+
+def _spcSorted(coeff, p, sortedCoeff=None, deviation=None):
+    '''
+    Internal function, the deviation Sj of the kept coefficients of
+    SPC-Threshold ('sort' algorithm of lambdasSPC_Threshold) and the number
+    of trimming passes. deviation is the Sj of all coefficients, if it is
+    known.
+
+    The kept coefficients are always the ones with abs(d) below the last
+    threshold, so the coefficients are sorted once (or sortedCoeff, the
+    sorted coefficients, is used) and split in the negative and the other
+    ones, both in increasing abs(d). Each pass needs a binary search in each
+    part and their running sums to get the new Sj. The running Sj differs
+    from the one of the 'mask' algorithm by rounding, so when a binary
+    search falls in the error bound, and at the end, Sj is computed again
+    from the kept coefficients in the original order, like 'mask' does.
+    '''
+
+    import numpy as np
+
+    n = coeff.size
+    absCoeff = np.abs(coeff)
+    # Rounding of the exact Sj, computed in the float type of coeff
+    eps = np.finfo(np.result_type(coeff, 0.)).eps
+
+    def exactDeviation(threshold):
+        return _spcDeviation(coeff[absCoeff < threshold])
+
+    Sj = _spcDeviation(coeff) if deviation is None else deviation
+    if n == 0:
+        return Sj, 0
+
+    if sortedCoeff is None:
+        sortedCoeff = np.sort(coeff)
+    negatives = np.searchsorted(sortedCoeff, 0, 'left')
+    parts = (sortedCoeff[negatives:], -sortedCoeff[:negatives][::-1])
+
+    # Running sums of abs(d) and of d**2 of each part
+    sums = []
+    sumSquares = []
+    for part in parts:
+        sums.append(np.concatenate(([0.], np.cumsum(part, dtype=float))))
+        sumSquares.append(np.concatenate(
+            ([0.], np.cumsum(np.power(part, 2), dtype=float))))
+
+    # Kept coefficients of each part, and the threshold that kept them
+    kept = [part.size for part in parts]
+    cut = None
+    approximate = False
+    n_iter = 0
+
+    def count(threshold):
+        return [np.searchsorted(part[:size], threshold, 'left')
+                for part, size in zip(parts, kept)]
+
+    while True:
+        kept_new = count(p*Sj)
+
+        if kept_new == kept:
+            if not approximate:
+                return Sj, n_iter
+            # Converged with the running sums, confirms with the exact Sj
+            Sj = exactDeviation(cut)
+            approximate = False
+            continue
+
+        kept = kept_new
+        cut = p*Sj
+        n_iter += 1
+        m = kept[0] + kept[1]
+
+        if m < 2:
+            Sj = exactDeviation(cut)
+            approximate = False
+            continue
+
+        sumAbs_m = sums[0][kept[0]] + sums[1][kept[1]]
+        sum_m = sums[0][kept[0]] - sums[1][kept[1]]
+        sumSquares_m = sumSquares[0][kept[0]] + sumSquares[1][kept[1]]
+        centered = sumSquares_m - sum_m**2/m
+        Sj = np.sqrt(max(centered, 0.)/(m - 1))
+        approximate = True
+
+        # Bound of the rounding of the running sums, relative to Sj
+        tol = 4*m*eps*(sumSquares_m + sumAbs_m**2/m)/max(centered, 1e-300)
+        if count(p*Sj*(1 - tol)) != count(p*Sj*(1 + tol)) or tol > 1e-3:
+            Sj = exactDeviation(cut)
+            approximate = False
+
+
+def lambdasVisuShrinkBatch(wavCoeff):
+    '''
+    Computes the threshold values (lambda) by VisuShrink [1] method for many
+    signals at once. Each row gives the same value of ``lambdasVisuShrink``
+    for the corresponding signal.
+
+    Parameters
+    ---------
+    wavCoeff: list of 2-D array-like
+        Wavelet coefficients of each level, with one signal per row (like
+        ``pywt.wavedec(signals, wavelet, axis=-1)[1:]``), or the subbands of
+        ``pywt.wavedec2``/``pywt.wavedecn`` of many images, one image per
+        index of the first axis (then the columns are the subbands, see
+        ``_subbands``).
+
+    Returns
+    -------
+    numpy.array:
+        A matrix (signals x levels) with the threshold values.
+
+    See also
+    --------
+    lambdasVisuShrink: The same method for one signal.
+    filtration.filtrationBatch: Function that use this function to filter
+        many signals via wavelet coefficients
+
+    References
+    ----------
+    .. [1] DONOHO, D. L.; JOHNSTONE, I. M. Ideal spatial adaptation via
+           wavelet shrinkage. Biometrika, v. 81, p. 425–455, 1994.
+    '''
+
+    import numpy as np
+
+    wavCoeff = _batchSubbands(wavCoeff)
+
+    d_m1 = wavCoeff[-1]
+
+    estDeviation = np.median(np.abs(d_m1), axis=-1)/.6745
+
+    lambdaValues = estDeviation * np.sqrt(2*np.log10(d_m1.shape[-1]))
+
+    return np.repeat(lambdaValues[:, None], len(wavCoeff),
+                     axis=1).astype(_floatType(wavCoeff), copy=False)
+
+
+def lambdasSureShrinkBatch(wavCoeff, dim_t=1024, search='grid'):
+    '''
+    Computes the threshold values (lambda) by SureShrink [1] method for many
+    signals at once, in the same grid of ``lambdasSureShrink`` (or with the
+    exact search, see ``lambdasSureShrink``).
+
+    The risk of ``_sure`` is evaluated in all grid points of all signals
+    together: the coefficients are sorted once and the number of them below
+    each grid point is found by merging the grid in the sorted coefficients.
+    The risks are the same of ``_sure`` up to floating point rounding.
+
+    Parameters
+    ---------
+    wavCoeff: list of 2-D array-like
+        Wavelet coefficients of each level, with one signal per row (or
+        subbands of images, see ``lambdasVisuShrinkBatch``).
+    dim_t: optional, 1024 by default. t-dimension. Number of grid points.
+    search: string
+        Optional, 'grid' by default. Can be 'grid' or 'exact'.
+
+    Returns
+    -------
+    numpy.array:
+        A matrix (signals x levels) with the threshold values.
+
+    See also
+    --------
+    lambdasSureShrink: The same method for one signal.
+    filtration.filtrationBatch: Function that use this function to filter
+        many signals via wavelet coefficients
+
+    References
+    ----------
+    .. [1] DONOHO, D. L.; JOHNSTONE, I. M. Ideal spatial adaptation via
+           wavelet shrinkage. Biometrika, v. 81, p. 425–455, 1994.
+    '''
+
+    import numpy as np
 
     lambdaValues = []
 
-    for wavCoeff_i in wavCoeff2:
-        Sj = np.sqrt(1./(wavCoeff_i.size - 1) *
-                     np.sum(np.power(wavCoeff_i - wavCoeff_i.mean(), 2)))
+    wavCoeff = _batchSubbands(wavCoeff)
+
+    for coeff in wavCoeff:
+        n = coeff.shape[-1]
+
+        estDeviation = np.median(np.abs(coeff), axis=-1)/.6745
+
+        tmax = estDeviation*np.sqrt(2*np.log10(n))
+
+        sortedCoeff = np.sort(coeff, axis=-1)
+
+        if search == 'exact':
+            lambdaValues.append(_sureExact(sortedCoeff, tmax))
+            continue
+
+        t = np.linspace(0, tmax, dim_t, axis=-1)
+
+        # Number of coefficients <= t: position of t among the sorted
+        # coefficients (a stable sort keeps the coefficients before ties)
+        merged = np.concatenate((sortedCoeff, t), axis=-1)
+        order = np.argsort(merged, axis=-1, kind='stable')
+        position = np.empty_like(order)
+        np.put_along_axis(position, order, np.arange(n + dim_t), axis=-1)
+        below = position[:, n:] - np.arange(dim_t)
 
-        while (np.abs(wavCoeff_i) >= p*Sj).any():
-            wavCoeff_i = wavCoeff_i[np.abs(wavCoeff_i) < p*Sj]
-            Sj = np.sqrt(1./(wavCoeff_i.size - 1) *
-                         np.sum(np.power(wavCoeff_i - wavCoeff_i.mean(), 2)))
+        sumSquares = np.zeros((coeff.shape[0], n + 1))
+        np.cumsum(np.power(sortedCoeff, 2), axis=-1, out=sumSquares[:, 1:])
+
+        res_sure = (n - 2 * below +
+                    np.take_along_axis(sumSquares, below, axis=-1) +
+                    (n - below) * np.power(t, 2))
+
+        lambdaValues.append(np.take_along_axis(
+            t, np.argmin(res_sure, axis=-1)[:, None], axis=-1)[:, 0])
+
+    return np.stack(lambdaValues, axis=1).astype(_floatType(wavCoeff),
+                                                 copy=False)
+
+
+def lambdasBayesShrinkBatch(wavCoeff):
+    '''
+    Computes the threshold values (lambda) by BayesShrink [1] method for many
+    signals at once. Each row gives the same value of ``lambdasBayesShrink``
+    for the corresponding signal.
+
+    Parameters
+    ---------
+    wavCoeff: list of 2-D array-like
+        Wavelet coefficients of each level, with one signal per row (or
+        subbands of images, see ``lambdasVisuShrinkBatch``).
+
+    Returns
+    -------
+    numpy.array:
+        A matrix (signals x levels) with the threshold values.
+
+    See also
+    --------
+    lambdasBayesShrink: The same method for one signal.
+    filtration.filtrationBatch: Function that use this function to filter
+        many signals via wavelet coefficients
+
+    References
+    ----------
+    .. [1] CHANG, S. G.; YU, B.; VETTERLI, M. Adaptive wavelet thresholding
+           for image denoising and compression. IEEE Transactions on Image
+           Processing, v. 9, p. 1532–1546, 2000.
+    '''
+
+    import numpy as np
+
+    wavCoeff = _batchSubbands(wavCoeff)
+
+    d_m1 = wavCoeff[-1]
+    deviation_square = np.power(np.median(np.abs(d_m1), axis=-1)/0.6745, 2)
+
+    lambdaValues = []
+
+    for wavCoeff_i in wavCoeff:
+        deviation2_wavCoeff_i = np.sum(np.power(wavCoeff_i, 2), axis=-1) / \
+            wavCoeff_i.shape[-1]
+
+        deviation_Xj = np.sqrt(
+            np.maximum(deviation2_wavCoeff_i - deviation_square, 0))
+
+        lambdaValues.append(deviation_square/deviation_Xj)
+
+    return np.stack(lambdaValues, axis=1).astype(_floatType(wavCoeff),
+                                                 copy=False)
+
+
+def lambdasSPC_ThresholdBatch(wavCoeff, p=3):
+    '''
+    Computes the threshold values (lambda) by SPC-Threshold [1] method for
+    many signals at once. The coefficients of all signals are trimmed
+    together, with a mask per signal, until no signal has a coefficient
+    bigger than its limit. The values are the same of
+    ``lambdasSPC_Threshold`` up to floating point rounding.
+
+    Parameters
+    ---------
+    wavCoeff: list of 2-D array-like
+        Wavelet coefficients of each level, with one signal per row (or
+        subbands of images, see ``lambdasVisuShrinkBatch``).
+    p: int or float
+        Optional, 3 by default. Parameter for the algorithm [1],
+        generally is used 2 or 3.
+
+    Returns
+    -------
+    numpy.array:
+        A matrix (signals x levels) with the threshold values.
+
+    See also
+    --------
+    lambdasSPC_Threshold: The same method for one signal.
+    filtration.filtrationBatch: Function that use this function to filter
+        many signals via wavelet coefficients
+
+    References
+    ----------
+    .. [1] BAYER, F. M.; KOZAKEVICIUS, A. J. SPC-threshold:  uma proposta de
+           limiarização para filtragem adaptativa de sinais. Tendências em
+           Matemática Aplicada e Computacional, v. 11, n. 2, p. 121–132, 2010.
+           In portuguese.
+    '''
+
+    import numpy as np
+
+    def deviation(coeff, kept):
+        # In the float type of coeff (an int count would give float64)
+        n_kept = kept.sum(axis=-1).astype(np.result_type(coeff, 0.))
+        mean = np.sum(coeff, axis=-1, where=kept) / n_kept
+        return np.sqrt(1./(n_kept - 1) *
+                       np.sum(np.power(coeff - mean[:, None], 2), axis=-1,
+                              where=kept))
+
+    lambdaValues = []
+
+    wavCoeff = _batchSubbands(wavCoeff)
+
+    for wavCoeff_i in wavCoeff:
+        absCoeff = np.abs(wavCoeff_i)
+
+        kept = np.ones(wavCoeff_i.shape, dtype=bool)
+        Sj = deviation(wavCoeff_i, kept)
+
+        outside = kept & (absCoeff >= p*Sj[:, None])
+        while outside.any():
+            kept &= ~outside
+            Sj = deviation(wavCoeff_i, kept)
+            outside = kept & (absCoeff >= p*Sj[:, None])
 
         lambdaValues.append(p*Sj)
-    return lambdaValues
+
+    return np.stack(lambdaValues, axis=1).astype(_floatType(wavCoeff),
+                                                 copy=False)
+
+
+def _threshold(data, value, mode='hard'):
+    '''
+    Internal function, thresholds data like ``pywt.threshold``, but keeps
+    the float type of data (``pywt.threshold`` gives float64 in the 'soft'
+    and 'garrote' modes).
+    '''
+
+    import numpy as np
+    import pywt
+
+    data = np.asarray(data)
+
+    if data.dtype.kind == 'f' and data.dtype != np.float64:
+        value = np.asarray(value, dtype=data.dtype)
+        # value can have more dimensions (many lambdas for the same data)
+        data = np.broadcast_to(data, np.broadcast_shapes(data.shape,
+                                                         value.shape))
+        return _thresholdInto(data, value, mode)
+    return pywt.threshold(data, value, mode)
+
+
+def _thresholdInto(data, value, mode='hard', out=None, work=None, mask=None):
+    '''
+    Internal function, thresholds data like ``pywt.threshold`` (the same
+    values) writing the result in out, without allocating memory when the
+    workspaces are given. out can be data itself, for thresholding in place.
+
+    Parameters
+    ----------
+    data: numpy.array
+        The coefficients.
+    value: float or numpy.array
+        The threshold value (lambda), or values broadcastable to data.
+    mode: string
+        Optional, is 'hard' by default. Can be 'hard', 'soft', 'garrote',
+        'greater' or 'less'.
+    out: numpy.array
+        Optional, is None by default (a new array). Where the result is
+        written.
+    work: numpy.array
+        Optional, is None by default. A float workspace of the shape of data.
+    mask: numpy.array
+        Optional, is None by default. A bool workspace of the shape of data.
+
+    Returns
+    -------
+    numpy.array:
+        out, with the thresholded coefficients.
+    '''
+
+    import numpy as np
+
+    if out is None:
+        out = np.empty_like(data)
+    if work is None:
+        work = np.empty(data.shape, dtype=np.result_type(data, 0.))
+    if mask is None:
+        mask = np.empty(data.shape, dtype=bool)
+
+    if mode in ('hard', 'greater', 'less'):
+        if mode == 'hard':
+            np.absolute(data, out=work)
+            np.less(work, value, out=mask)
+        elif mode == 'greater':
+            np.less(data, value, out=mask)
+        else:
+            np.greater(data, value, out=mask)
+
+        if out is not data:
+            np.copyto(out, data)
+        np.copyto(out, 0, where=mask)
+
+    elif mode in ('soft', 'garrote'):
+        np.absolute(data, out=work)
+
+        with np.errstate(divide='ignore'):
+            if mode == 'soft':
+                np.divide(value, work, out=work)
+            else:
+                np.power(work, 2, out=work)
+                np.divide(np.power(value, 2), work, out=work)
+
+        np.subtract(1, work, out=work)
+        np.clip(work, 0, None, out=work)
+        np.multiply(data, work, out=out)
+
+    else:
+        raise ValueError("Mode '%s' not found" % mode)
+
+    return out
+
+
+class DecompositionStats(object):
+    '''
+    Statistics of the wavelet coefficients of one decomposition, computed
+    once per level when first needed and shared by the lambda functions
+    (``lambdasVisuShrink``, ``lambdasSureShrink``, ``lambdasBayesShrink`` and
+    ``lambdasSPC_Threshold``) and by ``filtration.cusumFiltration`` (mean and
+    standard deviation of CUSUM). The values are the same the functions
+    compute without it.
+
+    The levels are indexed like wavCoeff (-1 is the finest), or, for
+    ``pywt.wavedec2`` and ``pywt.wavedecn``, the subbands like ``_subbands``.
+    The arrays aren't copied (when contiguous), so the coefficients can't be
+    modified while the object is used.
+
+    Parameters
+    ----------
+    wavCoeff: list of array-like
+        Wavelet coefficients (without the scale coefficients).
+
+    Examples
+    --------
+    >>> stats = DecompositionStats(coefficients[1:])
+    >>> for method in ['visu', 'sure', 'bayes', 'spc']:
+    ...     filtration.filtration(coefficients, method, stats=stats)
+
+    See also
+    --------
+    filtration.filtration: Filtration of the wavelet coefficients.
+    '''
+
+    def __init__(self, wavCoeff):
+        import numpy as np
+
+        self.wavCoeff = [np.ravel(wavCoeff_i)
+                         for wavCoeff_i in _subbands(wavCoeff)[0]]
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.wavCoeff)
+
+    def _cached(self, name, j, compute):
+        key = (name, j % len(self.wavCoeff))
+        if key not in self._cache:
+            self._cache[key] = compute(self.wavCoeff[key[1]])
+        return self._cache[key]
+
+    def computed(self, name, j):
+        '''
+        Gives the statistic name (like 'absOrder') of the level j if it was
+        already computed, or None.
+        '''
+        return self._cache.get((name, j % len(self.wavCoeff)))
+
+    def size(self, j):
+        '''Number of coefficients of the level j.'''
+        return self.wavCoeff[j].size
+
+    def sigma(self, j):
+        '''
+        Estimation of the noise deviation by the level j,
+        ``np.median(np.abs(d))/.6745``, found with ``np.partition`` (or the
+        sorted abs(d), if they were already computed).
+        '''
+
+        import numpy as np
+
+        def compute(d):
+            if self.computed('absSorted', j) is not None:
+                return _median(self.absSorted(j), isSorted=True)/.6745
+            return _median(np.abs(d))/.6745
+
+        return self._cached('sigma', j, compute)
+
+    def absOrder(self, j):
+        '''Indexes that sort abs(d) of the level j (stable).'''
+        import numpy as np
+        return self._cached('absOrder', j,
+                            lambda d: np.argsort(np.abs(d), kind='stable'))
+
+    def absSorted(self, j):
+        '''abs(d) of the level j, sorted.'''
+        import numpy as np
+        return self._cached('absSorted', j,
+                            lambda d: np.abs(d)[self.absOrder(j)])
+
+    def sorted(self, j):
+        '''The coefficients of the level j, sorted.'''
+        import numpy as np
+        return self._cached('sorted', j, np.sort)
+
+    def sum(self, j):
+        '''Sum of the coefficients of the level j.'''
+        import numpy as np
+        return self._cached('sum', j, np.sum)
+
+    def sumSquares(self, j):
+        '''Sum of the squares of the coefficients of the level j.'''
+        import numpy as np
+        return self._cached('sumSquares', j,
+                            lambda d: np.sum(np.power(d, 2)))
+
+    def mean(self, j):
+        '''Mean of the coefficients of the level j.'''
+        return self._cached('mean', j, lambda d: d.mean())
+
+    def std(self, j):
+        '''Standard deviation (ddof=0) of the coefficients of the level j.'''
+        return self._cached('std', j, lambda d: d.std())
+
+    def deviation(self, j):
+        '''
+        Deviation (ddof=1) of the coefficients of the level j, the first Sj
+        of ``lambdasSPC_Threshold``.
+        '''
+        return self._cached('deviation', j,
+                            lambda d: _spcDeviation(d, self.mean(j)))
+
+
+class ThresholdPath(object):
+    '''
+    The thresholding of the wavelet coefficients for many lambdas at once (a
+    path of thresholds), for risk curves or the choice of lambda by
+    cross-validation. The abs(d) of each level are sorted once (shared with
+    a ``DecompositionStats``) and, for a vector of lambdas, the statistics
+    of the thresholded coefficients come from cumulative sums and a binary
+    search, without thresholding them, and the thresholded coefficients are
+    computed in chunks of lambdas of bounded memory.
+
+    Parameters
+    ----------
+    wavCoeff: list of array-like
+        Wavelet coefficients (without the scale coefficients), of
+        ``pywt.wavedec`` or, one lambda per subband, of ``pywt.wavedec2``
+        and ``pywt.wavedecn`` (see ``_subbands``).
+    stats: DecompositionStats
+        Optional, None by default. Statistics of wavCoeff already computed
+        (or to be shared with the lambda functions).
+
+    Examples
+    --------
+    >>> path = ThresholdPath(coefficients[1:])
+    >>> lambdas = np.linspace(0, .5, 200)
+    >>> risk = path.statistics(lambdas, 'soft')['sure']
+    >>> for part, wavCoeff in path.coefficients(lambdas, maxBytes=2**26):
+    ...     signals = pywt.waverec([scale[None]] + wavCoeff, 'db8', axis=-1)
+
+    See also
+    --------
+    lambdasSureShrink: The lambda with the minimum risk of ``_sure``.
+    '''
+
+    def __init__(self, wavCoeff, stats=None):
+        import numpy as np
+
+        wavCoeff, self._nest = _subbands(wavCoeff)
+
+        self.shapes = [np.shape(d) for d in wavCoeff]
+        self.stats = DecompositionStats(wavCoeff) if stats is None else \
+            stats
+        self._sums = {}
+
+    def __len__(self):
+        return len(self.stats)
+
+    def _lambdas(self, lambdas):
+        '''
+        Internal function, lambdas as a (lambdas x levels) matrix.
+        '''
+
+        import numpy as np
+
+        lambdas = np.asarray(lambdas)
+        if lambdas.ndim == 1:
+            lambdas = np.repeat(lambdas[:, None], len(self), axis=1)
+
+        if lambdas.ndim != 2 or lambdas.shape[1] != len(self):
+            raise Exception("Size of 'lambdas' doesn't match with the size "
+                            "of wavelet coefficients")
+        return lambdas
+
+    def _suffixSums(self, j):
+        '''
+        Internal function, the sums of abs(d), abs(d)**2 and abs(d)**-2 (the
+        zeros excluded) of the level j from each position of the sorted
+        abs(d) to the end (the largest values are summed first).
+        '''
+
+        import numpy as np
+
+        key = j % len(self)
+        if key not in self._sums:
+            a = self.stats.absSorted(key).astype(float)
+
+            with np.errstate(divide='ignore'):
+                inverse = np.where(a > 0, 1 / np.power(a, 2), 0)
+
+            sums = np.zeros((3, a.size + 1))
+            for row, values in zip(sums, [a, np.power(a, 2), inverse]):
+                np.cumsum(values[::-1], out=row[-2::-1])
+
+            self._sums[key] = sums
+        return self._sums[key]
+
+    def statistics(self, lambdas, mode='hard'):
+        '''
+        Statistics of the coefficients thresholded by each lambda, without
+        thresholding them: O(log N) per lambda and level after the sort.
+
+        Parameters
+        ----------
+        lambdas: 1-D or 2-D array-like
+            The lambdas, the same for all levels, or a matrix with one
+            column per level (subband).
+        mode: string
+            Optional, is 'hard' by default. Can be 'hard', 'soft' or
+            'garrote'.
+
+        Returns
+        -------
+        dict:
+            Matrices (lambdas x levels) with 'nonzero' (number of
+            coefficients not zeroed), 'energy' (sum of the squares of the
+            thresholded coefficients) and 'sure' (the risk of ``_sure``, the
+            one minimized by ``lambdasSureShrink``, that depends only on
+            lambda). The sums are in float64.
+        '''
+
+        import numpy as np
+
+        if mode not in ('hard', 'soft', 'garrote'):
+            raise Exception("Mode '%s' not found" % mode)
+
+        lambdas = self._lambdas(lambdas)
+
+        nonzero = np.empty(lambdas.shape, dtype=int)
+        energy = np.empty(lambdas.shape)
+        sure = np.empty(lambdas.shape)
+
+        for j in range(len(self)):
+            t = lambdas[:, j].astype(float)
+            a = self.stats.absSorted(j)
+            n = a.size
+            S1, S2, Sinv2 = self._suffixSums(j)
+
+            if mode == 'hard':
+                # Kept where abs(d) >= t, the zeros are zero anyway
+                first = np.maximum(np.searchsorted(a, t, 'left'),
+                                   np.searchsorted(a, 0, 'right'))
+                energy[:, j] = S2[first]
+            else:
+                first = np.searchsorted(a, np.maximum(t, 0), 'right')
+                m = n - first
+                if mode == 'soft':
+                    energy[:, j] = (S2[first] - 2 * t * S1[first] +
+                                    m * np.power(t, 2))
+                else:
+                    energy[:, j] = (S2[first] - 2 * m * np.power(t, 2) +
+                                    np.power(t, 4) * Sinv2[first])
+            nonzero[:, j] = n - first
+
+            # The risk of _sure uses the coefficients, not abs(d)
+            sortedCoeff = self.stats.sorted(j)
+            sumSquares = self._sums.get(('sure', j % len(self)))
+            if sumSquares is None:
+                sumSquares = np.zeros(n + 1)
+                np.cumsum(np.power(sortedCoeff, 2), out=sumSquares[1:])
+                self._sums[('sure', j % len(self))] = sumSquares
+            below = np.searchsorted(sortedCoeff, t, 'right')
+            sure[:, j] = (n - 2 * below + sumSquares[below] +
+                          (n - below) * np.power(t, 2))
+
+        return {'nonzero': nonzero, 'energy': energy, 'sure': sure}
+
+    def coefficients(self, lambdas, mode='hard', maxBytes=None):
+        '''
+        The coefficients thresholded by each lambda, like
+        ``pywt.threshold`` (in the float type of the coefficients), in
+        chunks of lambdas.
+
+        Parameters
+        ----------
+        lambdas: 1-D or 2-D array-like
+            The lambdas, the same for all levels, or a matrix with one
+            column per level (subband).
+        mode: string
+            Optional, is 'hard' by default. The modes of ``pywt.threshold``.
+        maxBytes: int
+            Optional, is None by default (all lambdas in one chunk). The
+            most bytes of the thresholded coefficients of a chunk (at least
+            one lambda per chunk).
+
+        Returns
+        -------
+        generator:
+            Tuples with [0] the slice of lambdas of the chunk and [1] the
+            wavelet coefficients (nested like wavCoeff), each with a first
+            axis of one row per lambda of the chunk.
+        '''
+
+        import numpy as np
+
+        lambdas = self._lambdas(lambdas)
+        n_lambdas = lambdas.shape[0]
+
+        floatType = np.result_type(*self.stats.wavCoeff, 0.)
+        rowBytes = floatType.itemsize * sum(d.size
+                                            for d in self.stats.wavCoeff)
+
+        chunk = n_lambdas if maxBytes is None else \
+            max(1, maxBytes // max(rowBytes, 1))
+
+        for start in range(0, n_lambdas, max(chunk, 1)):
+            part = slice(start, min(start + chunk, n_lambdas))
+            values = lambdas[part]
+
+            wavCoeff = [_threshold(d[None, :], values[:, j, None],
+                                   mode).reshape((-1,) + shape)
+                        for j, (d, shape) in enumerate(
+                            zip(self.stats.wavCoeff, self.shapes))]
+
+            yield part, self._nest(wavCoeff)
+
+
+def _median(data, isSorted=False):
+    '''
+    Internal function, the median of a 1-D array with the same value of
+    ``np.median``, using ``np.partition`` (or the array itself when it is
+    already sorted).
+    '''
+
+    import numpy as np
+
+    n = data.size
+    half = n // 2
+
+    if n == 0:
+        return np.median(data)
+
+    if isSorted:
+        part = data
+    else:
+        part = np.partition(data, [half - 1, half, n - 1] if n > 1 else [0])
+
+    if np.isnan(part[-1]):
+        return np.nan
+    if n % 2:
+        return part[half]
+    return np.mean(part[half - 1:half + 1])
+
+
+def _subbands(wavCoeff):
+    '''
+    Internal function, the wavelet coefficients of each subband as a flat
+    list of arrays and a function that nests a list with one value per
+    subband like wavCoeff.
+
+    For ``pywt.wavedec`` the subbands are the levels. For ``pywt.wavedec2``
+    (a tuple of details per level) and ``pywt.wavedecn`` (a dict per level)
+    each detail is a subband, in the order of the levels (the finest is the
+    last) and, in each level, of the tuple or of the sorted keys, so the
+    last subband is the finest diagonal one (HH1).
+    '''
+
+    if not any(isinstance(level, (tuple, dict)) for level in wavCoeff):
+        return list(wavCoeff), list
+
+    subbands = []
+    for level in wavCoeff:
+        if isinstance(level, dict):
+            subbands.extend(level[key] for key in sorted(level))
+        else:
+            subbands.extend(level)
+
+    def nest(values):
+        values = iter(values)
+        nested = []
+        for level in wavCoeff:
+            if isinstance(level, dict):
+                nested.append({key: next(values) for key in sorted(level)})
+            else:
+                nested.append(tuple(next(values) for detail in level))
+        return nested
+
+    return subbands, nest
+
+
+def _batchSubbands(wavCoeff):
+    '''
+    Internal function, the subbands of wavCoeff (see ``_subbands``) of many
+    signals or images as 2-D arrays, one signal or image per row.
+    '''
+
+    import numpy as np
+
+    return [np.reshape(d, (np.shape(d)[0], -1))
+            for d in _subbands(wavCoeff)[0]]
+
+
+def _floatType(wavCoeff):
+    '''
+    Internal function, the float type of the lambdas of wavCoeff: the one of
+    the coefficients (float32 stays float32), or float64 for integers.
+    '''
+
+    import numpy as np
+
+    return np.result_type(*[np.asarray(d).dtype
+                            for d in _subbands(wavCoeff)[0]], 0.)
+
+
+def _asFloatType(lambdaValues, wavCoeff):
+    '''
+    Internal function, the lambda values (a list) in the float type of
+    wavCoeff (see ``_floatType``).
+    '''
+
+    floatType = _floatType(wavCoeff).type
+
+    return [floatType(value) for value in lambdaValues]
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+
+'''
+**Wavelet Based in CUSUM control chart for filtering signals Project (module**
+``statsWaveletFilt.tuning`` **):** Choice of the parameters of the filtrations
+(the "h" and "k" of each level of 'cusumAdap' and the "p" of 'spc') that give
+the best figure of merit of ``signals.figuresOfMerit`` for signals with a
+known ideal signal.
+'''
+
+# The metrics where smaller is better, the others are maximized
+_MINIMIZED = ['snr_square_mean_error']
+
+# 'differential_square_mean_error' isn't one: it compares the final signals
+# with the noisy ones, not with the ideal one, and it only grows as more
+# coefficients are removed
+_METRICS = ['snr_square_mean_error', 'snr_mean_standardNoise',
+            'snr_variances', 'cnr_amplitude_standardNoise',
+            'differential_mean_StandardNoise', 'differential_variances',
+            'differential_amplitude_standardNoise']
+
+
+def tuneCusum(noisySignals, idealSignal, wavelet='db8', level=5, hs=None,
+              ks=[1/4, 1/2, 3/4, 1], metric='differential_variances',
+              extension='symmetric', sweeps=10, workers=None):
+    '''
+    Chooses the "h" and "k" of each wavelet level for the 'cusumAdap' method
+    of ``filtration.cusumFiltration``, the ones that give the best metric
+    (the mean of the noisy signals) among the combinations of hs and ks.
+
+    The signals are decomposed once and the CUSUM limits of each level are
+    computed once for each "k". Then all values of hs are compared with the
+    limits at once, and the coefficients kept by each (h, k) of a level are
+    recomposed together with one ``pywt.waverec(..., axis=-1)``, with the
+    other levels zeroed. The recomposition is linear, so any choice of
+    parameters is the sum of the recomposed levels. The levels are computed
+    in parallel threads.
+
+    The levels are not independent in the metric, so they are chosen by
+    coordinate descent: starting from the (h, k) of each level that best
+    fits the coefficients of the ideal signal, each level is changed to its
+    best (h, k) with the others fixed, until a sweep over the levels changes
+    none (or after sweeps sweeps).
+
+    Parameters
+    ----------
+    noisySignals: 1-D or 2-D array-like
+        A noisy signal, or many (one per row) of the same ideal signal.
+    idealSignal: 1-D array-like
+        The ideal signal.
+    wavelet: string
+        Optional, is 'db8' by default.
+    level: int
+        Optional, is 5 by default.
+    hs: list of float
+        Optional, is None by default (from 0 to 10 in steps of .5). The
+        values of "h" tried in each level.
+    ks: list of float
+        Optional, is [1/4, 1/2, 3/4, 1] by default. The values of "k" tried
+        in each level.
+    metric: string
+        Optional, is 'differential_variances' by default. A metric of
+        ``signals.figuresOfMerit`` (of the final signals or differential).
+        'snr_square_mean_error' (the MSE) is minimized, the others are
+        maximized. 'differential_square_mean_error' is not accepted, its
+        best is removing all the coefficients.
+    extension: string
+        Optional, is 'symmetric' by default. The signal extension mode of
+        ``pywt.wavedec`` and ``pywt.waverec``.
+    sweeps: int
+        Optional, is 10 by default. The maximum of sweeps over the levels.
+        With 0 the starting (h, k) are returned.
+    workers: int
+        Optional, is None by default (one per level, up to the number of
+        processors). The threads that compute the levels.
+
+    .. note::
+        The recomposed signals of all (h, k) of all levels are kept: levels
+        x len(hs) * len(ks) x noisy signals x signal size values.
+
+    Returns
+    -------
+    tuple:
+        [0] a dict with "h" and "k" (lists with one value per level, in the
+        order of ``pywt.wavedec``), the parameters of
+        ``filtration.cusumFiltration(..., method='cusumAdap', **params)``
+        (or of methodParams['cusumAdap']) and [1] the metric of them.
+
+    See also
+    --------
+    tuneSPC: The choice of "p" of the 'spc' method.
+    filtration.cusumFiltration: The CUSUM filtration.
+    '''
+
+    from concurrent.futures import ThreadPoolExecutor
+    from statsWaveletFilt.cusum import analysisCusum
+    import numpy as np
+    import os
+    import pywt
+
+    if metric not in _METRICS:
+        raise Exception("Metric '%s' not found" % metric)
+
+    if hs is None:
+        hs = np.arange(0, 10.5, .5)
+    hs = np.asarray(hs, dtype=float)
+
+    rows, idealSignal, coefficients = _decompose(noisySignals, idealSignal,
+                                                 wavelet, level, extension)
+    idealCoeff = pywt.wavedec(idealSignal, wavelet, mode=extension,
+                              level=level)
+    n = rows.shape[-1]
+    n_levels = len(coefficients) - 1
+
+    def recompose(j, kept):
+        zeros = [np.zeros(kept.shape[:-1] + c.shape[-1:], dtype=kept.dtype)
+                 for c in coefficients]
+        zeros[j] = kept
+        return pywt.waverec(zeros, wavelet, mode=extension, axis=-1)[..., :n]
+
+    def levelCandidates(j):
+        Dj = coefficients[j + 1]
+        H = hs[:, None, None] * Dj.std(axis=-1)[:, None]
+
+        kept = []
+        for k in ks:
+            SjB, Sjs = analysisCusum(Dj, k, axis=-1)
+            kept.append(np.where((SjB > H) | (Sjs > H), Dj, 0))
+        # Candidate c is (k, h) = (ks[c // len(hs)], hs[c % len(hs)])
+        kept = np.concatenate(kept)
+
+        error = np.mean(np.power(kept - idealCoeff[j + 1], 2), axis=(1, 2))
+
+        return recompose(j + 1, kept), int(np.argmin(error))
+
+    if workers is None:
+        workers = max(1, min(n_levels, os.cpu_count() or 1))
+
+    if workers == 1:
+        candidates = [levelCandidates(j) for j in range(n_levels)]
+    else:
+        with ThreadPoolExecutor(workers) as executor:
+            candidates = list(executor.map(levelCandidates, range(n_levels)))
+
+    recomposed = [c[0] for c in candidates]
+    chosen = [c[1] for c in candidates]
+
+    approximation = recompose(0, coefficients[0])
+
+    signals = approximation + sum(recomposed[j][chosen[j]]
+                                  for j in range(n_levels))
+    score = _score(rows, signals[None], idealSignal, metric)[0]
+
+    for sweep in range(sweeps):
+        changed = False
+
+        for j in range(n_levels):
+            others = approximation + sum(recomposed[i][chosen[i]]
+                                         for i in range(n_levels) if i != j)
+            scores = _score(rows, others + recomposed[j], idealSignal,
+                            metric)
+
+            best = _best(scores, metric)
+            if best != chosen[j]:
+                chosen[j] = best
+                changed = True
+            score = scores[best]
+
+        if not changed:
+            break
+
+    params = {'h': [float(hs[c % hs.size]) for c in chosen],
+              'k': [float(ks[c // hs.size]) for c in chosen]}
+
+    return params, float(score)
+
+
+def tuneSPC(noisySignals, idealSignal, wavelet='db8', level=5, ps=None,
+            mode='hard', metric='differential_variances',
+            extension='symmetric'):
+    '''
+    Chooses the "p" of the 'spc' method of ``filtration.filtration``, the
+    one that gives the best metric (the mean of the noisy signals) among ps.
+
+    The signals are decomposed once, the lambdas of each "p" are computed
+    for all signals at once (``threshold.lambdasSPC_ThresholdBatch``) and
+    the filtered coefficients of all values of ps are recomposed together
+    with one ``pywt.waverec(..., axis=-1)``.
+
+    Parameters
+    ----------
+    noisySignals: 1-D or 2-D array-like
+        A noisy signal, or many (one per row) of the same ideal signal.
+    idealSignal: 1-D array-like
+        The ideal signal.
+    wavelet: string
+        Optional, is 'db8' by default.
+    level: int
+        Optional, is 5 by default.
+    ps: list of float
+        Optional, is None by default (from 1.5 to 5 in steps of .25). The
+        values of "p" tried. A "p" so small that a level has no coefficient
+        left gives a nan metric and isn't chosen.
+    mode: string
+        Optional, is 'hard' by default. The threshold mode.
+    metric: string
+        Optional, is 'differential_variances' by default. See
+        ``tuneCusum``.
+    extension: string
+        Optional, is 'symmetric' by default. The signal extension mode of
+        ``pywt.wavedec`` and ``pywt.waverec``.
+
+    Returns
+    -------
+    tuple:
+        [0] a dict with "p", the parameter of
+        ``filtration.filtration(..., method='spc', **params)`` (or of
+        methodParams['spc']) and [1] the metric of it.
+
+    See also
+    --------
+    tuneCusum: The choice of "h" and "k" of the 'cusumAdap' method.
+    threshold.lambdasSPC_Threshold: The lambdas of SPC-Threshold.
+    '''
+
+    from statsWaveletFilt.threshold import lambdasSPC_ThresholdBatch, \
+        _threshold
+    import numpy as np
+    import pywt
+
+    if metric not in _METRICS:
+        raise Exception("Metric '%s' not found" % metric)
+
+    if ps is None:
+        ps = np.arange(1.5, 5.25, .25)
+    ps = np.asarray(ps, dtype=float)
+
+    rows, idealSignal, coefficients = _decompose(noisySignals, idealSignal,
+                                                 wavelet, level, extension)
+    wavCoeff = coefficients[1:]
+
+    # Lambdas of all signals, one (signals x levels) matrix per p
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lambdaValues = np.stack([lambdasSPC_ThresholdBatch(wavCoeff, p)
+                                 for p in ps])
+
+    filtered = [np.broadcast_to(coefficients[0],
+                                ps.shape + coefficients[0].shape)]
+    for j, Dj in enumerate(wavCoeff):
+        filtered.append(_threshold(Dj, lambdaValues[:, :, j, None], mode))
+
+    signals = pywt.waverec(filtered, wavelet, mode=extension,
+                           axis=-1)[..., :rows.shape[-1]]
+
+    scores = _score(rows, signals, idealSignal, metric)
+    best = _best(scores, metric)
+
+    return {'p': float(ps[best])}, float(scores[best])
+
+
+def _decompose(noisySignals, idealSignal, wavelet, level, extension):
+    '''
+    Internal function, the noisy signals as a 2-D array (one per row), the
+    ideal signal and the coefficients of the noisy signals.
+    '''
+
+    import numpy as np
+    import pywt
+
+    rows = np.atleast_2d(np.asarray(noisySignals))
+    idealSignal = np.asarray(idealSignal)
+
+    if rows.ndim != 2 or idealSignal.shape != rows.shape[-1:]:
+        raise Exception("The noisy signals don't match with the size of "
+                        "the ideal signal")
+
+    coefficients = pywt.wavedec(rows, wavelet, mode=extension, level=level,
+                                axis=-1)
+
+    return rows, idealSignal, coefficients
+
+
+def _score(rows, candidates, idealSignal, metric):
+    '''
+    Internal function, the metric of each candidate (the first axis of
+    candidates, with one filtered signal per noisy signal), the mean of the
+    noisy signals.
+    '''
+
+    from statsWaveletFilt.signals import figuresOfMerit
+
+    return figuresOfMerit(rows, candidates, idealSignal)[metric].mean(axis=-1)
+
+
+def _best(scores, metric):
+    '''Internal function, the index of the best of scores.'''
+
+    import numpy as np
+
+    if metric in _MINIMIZED:
+        return int(np.nanargmin(scores))
+    return int(np.nanargmax(scores))
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import json
+
+import pytest
+
+from statsWaveletFilt.benchmark import BENCHMARKS, runBenchmark, \
+    saveBenchmark, scalingSummary, _main
+
+
+_KEYS = ['benchmark', 'size', 'level', 'number', 'repeat', 'best', 'median',
+         'perSample']
+
+
+def test_run_benchmark_schema(capsys):
+    results = runBenchmark([2**8, 2**9], [2, 3], BENCHMARKS, repeat=2,
+                           minTime=1e-3)
+
+    # The filtrations print nothing
+    assert capsys.readouterr().out == ''
+    # 7 filtrations per level and 8 other benchmarks, for each size
+    assert len(results) == 2 * (7 * 2 + 8)
+
+    for result in results:
+        assert list(result) == _KEYS
+        assert result['repeat'] == 2
+        assert result['number'] >= 1
+        assert 0 < result['best'] <= result['median']
+        assert result['perSample'] == result['best'] / result['size']
+
+        if result['benchmark'].partition('.')[0] in ('filtration',
+                                                     'cusumFiltration'):
+            assert result['level'] in (2, 3)
+        else:
+            assert result['level'] is None
+
+
+def test_run_benchmark_skips_big_levels_and_unknown_benchmarks():
+    results = runBenchmark([2**6], [1, 8], ['filtration.visu'], repeat=1,
+                           minTime=0)
+    assert [result['level'] for result in results] == [1]
+
+    with pytest.raises(Exception):
+        runBenchmark([2**6], [1], ['filtration.unknown'])
+
+
+def test_scaling_summary_exponent():
+    results = [{'benchmark': 'a', 'size': size, 'level': None,
+                'best': 1e-6 * size**1.5} for size in (2**10, 2**12, 2**14)]
+    results.append({'benchmark': 'b', 'size': 2**10, 'level': 3,
+                    'best': 1.})
+
+    summary = {line['benchmark']: line for line in scalingSummary(results)}
+
+    assert summary['a']['exponent'] == pytest.approx(1.5)
+    assert summary['a']['sizes'] == 3
+    assert (summary['a']['minSize'], summary['a']['maxSize']) == \
+        (2**10, 2**14)
+    assert summary['a']['maxTime'] == pytest.approx(1e-6 * 2**21)
+    assert summary['b']['exponent'] is None
+
+
+def test_save_benchmark_round_trip(tmp_path):
+    results = runBenchmark([2**8], [2], ['filtration.visu', 'analysisCusum'],
+                           repeat=1, minTime=0)
+
+    saveBenchmark(results, str(tmp_path / 'results.json'))
+    with open(tmp_path / 'results.json') as file:
+        assert json.load(file) == results
+
+    saveBenchmark(results, str(tmp_path / 'results.CSV'))
+    with open(tmp_path / 'results.CSV', newline='') as file:
+        rows = list(csv.DictReader(file))
+    assert rows == [{key: '' if value is None else str(value)
+                     for key, value in result.items()} for result in results]
+
+    with pytest.raises(Exception):
+        saveBenchmark(results, str(tmp_path / 'results.txt'), 'txt')
+
+
+def test_main(tmp_path, capsys):
+    output = tmp_path / 'results.csv'
+    summary = tmp_path / 'summary.json'
+
+    _main(['--min-exp', '7', '--max-exp', '8', '--levels', '2',
+           '--benchmarks', 'filtration.bayes', 'thresholdCusum',
+           '--repeat', '1', '--min-time', '0', '--output', str(output),
+           '--summary', str(summary)])
+
+    with open(output, newline='') as file:
+        assert len(list(csv.DictReader(file))) == 4
+    with open(summary) as file:
+        lines = json.load(file)
+    assert sorted(line['benchmark'] for line in lines) == \
+        ['filtration.bayes', 'thresholdCusum']
+    assert all(line['sizes'] == 2 for line in lines)
+
+    out = capsys.readouterr().out
+    assert 'filtration.bayes' in out and 'ADVICE' not in out
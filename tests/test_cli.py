@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import io
+import json
+import os
+
+import numpy as np
+import pytest
+import pywt
+
+from statsWaveletFilt.cli import denoiseFiles, main
+from statsWaveletFilt.filtration import filtration
+from statsWaveletFilt.miscellaneous import generateData
+
+
+def _visu(signal):
+    '''The signal denoised alone.'''
+
+    coefficients = pywt.wavedec(signal, 'db8', level=5)
+    filtered = filtration(coefficients, 'visu')[0]
+    return pywt.waverec(filtered, 'db8')[:signal.size]
+
+
+def _signals(shape, seed=0):
+    return np.random.default_rng(seed).normal(0, 1, shape) + \
+        np.sin(np.linspace(0, 20, shape[-1]))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_npy_files(tmp_path, workers):
+    signals = _signals((2, 3, 512))
+    np.save(tmp_path / 'signals.npy', signals)
+    np.savez(tmp_path / 'archive.npz', first=signals[0], second=signals[1, 0])
+
+    outputs = denoiseFiles([str(tmp_path / 'signals.npy'),
+                            str(tmp_path / 'archive.npz')],
+                           str(tmp_path / 'out'), workers=workers,
+                           blockSize=1024)
+
+    assert outputs == [str(tmp_path / 'out' / 'signals.npy'),
+                       str(tmp_path / 'out' / 'archive.npz')]
+
+    result = np.load(outputs[0])
+    assert result.shape == signals.shape
+    for index in np.ndindex(signals.shape[:-1]):
+        np.testing.assert_allclose(result[index], _visu(signals[index]),
+                                   atol=1e-12)
+
+    with np.load(outputs[1]) as archive:
+        for row, expected in zip(archive['first'], signals[0]):
+            np.testing.assert_allclose(row, _visu(expected), atol=1e-12)
+        np.testing.assert_allclose(archive['second'], _visu(signals[1, 0]),
+                                   atol=1e-12)
+
+
+def test_raw_files_and_long_signals(tmp_path):
+    from statsWaveletFilt.filtration import streamFiltration
+
+    signals = _signals((3, 512)).astype('float32')
+    signals.tofile(tmp_path / 'signals.bin')
+    longSignal = _signals((5000,))
+    longSignal.tofile(tmp_path / 'long.raw')
+
+    denoiseFiles([str(tmp_path / 'signals.bin')], str(tmp_path / 'out'),
+                 workers=1, rawDtype='float32', rawLength=512)
+    denoiseFiles([str(tmp_path / 'long.raw')], str(tmp_path / 'out'),
+                 workers=1, blockSize=1024)
+
+    # float32 signals stay float32
+    result = np.fromfile(tmp_path / 'out' / 'signals.bin', 'float32')
+    for row, signal in zip(result.reshape(3, 512), signals):
+        np.testing.assert_allclose(row, _visu(signal), atol=1e-5)
+
+    # A signal longer than blockSize is denoised in windows
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = np.concatenate(list(streamFiltration(
+            [longSignal], 'db8', 5, 'visu', 1024)))
+    np.testing.assert_allclose(
+        np.fromfile(tmp_path / 'out' / 'long.raw', 'float64'), expected,
+        atol=1e-12)
+
+
+def test_stacked_folder(tmp_path):
+    cwd = os.getcwd()
+    os.chdir(tmp_path)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            generateData(['doppler', 'bump'], [0.001, 0.01], 512, 3,
+                         'data', 'stacked')
+            main(['data', '-o', 'out', '--workers', '1', '-q'])
+    finally:
+        os.chdir(cwd)
+
+    with open(tmp_path / 'data' / 'manifest.json') as file:
+        manifest = json.load(file)
+
+    # Only the noisy signals are denoised
+    signals = np.load(tmp_path / 'data' / manifest['data'])
+    result = np.load(tmp_path / 'out' / 'data' / manifest['data'])
+    for index in np.ndindex(signals.shape[:-1]):
+        np.testing.assert_allclose(result[index], _visu(signals[index]),
+                                   atol=1e-12)
+
+    for name in ('manifest.json', manifest['ideal']):
+        with open(tmp_path / 'data' / name, 'rb') as source, \
+                open(tmp_path / 'out' / 'data' / name, 'rb') as copy:
+            assert source.read() == copy.read()
+
+
+def test_unknown_method(tmp_path):
+    with pytest.raises(Exception):
+        denoiseFiles([], str(tmp_path), method='other')
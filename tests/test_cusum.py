@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+from statsWaveletFilt.cusum import analysisCusum, _compiledCusumKernel
+
+
+def _data(kind, size=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    if kind == 'normal':
+        return rng.normal(size=size)
+    if kind == 'shifted':
+        return rng.normal(size=size) + np.repeat([0, 3, -2, 0], size // 4)
+    return np.round(rng.standard_t(2, size), 1)
+
+
+_ENGINES = ['numpy', pytest.param('compiled', marks=pytest.mark.skipif(
+    _compiledCusumKernel() is None, reason='numba is not installed'))]
+
+
+@pytest.mark.parametrize('engine', _ENGINES)
+@pytest.mark.parametrize('kind', ['normal', 'shifted', 'ties'])
+@pytest.mark.parametrize('dtype', ['float64', 'float32'])
+def test_engines_match_loop(engine, kind, dtype):
+    data = _data(kind).astype(dtype)
+
+    expected = analysisCusum(data, engine='python')
+    result = analysisCusum(data, engine=engine)
+
+    for limits, expectedLimits in zip(result, expected):
+        assert limits.dtype == expectedLimits.dtype
+        np.testing.assert_array_equal(limits, expectedLimits)
+
+
+@pytest.mark.parametrize('engine', _ENGINES)
+def test_engines_match_loop_with_starts(engine):
+    data = _data('shifted')
+
+    expected = analysisCusum(data, 1/4, 0, 1, 2.5, 1., engine='python')
+    result = analysisCusum(data, 1/4, 0, 1, 2.5, 1., engine=engine)
+
+    np.testing.assert_array_equal(result[0], expected[0])
+    np.testing.assert_array_equal(result[1], expected[1])
+
+
+@pytest.mark.parametrize('engine', _ENGINES)
+def test_engines_match_loop_along_axis(engine):
+    data = np.stack([_data('normal', seed=i) for i in range(3)])
+
+    SjB, Sjs = analysisCusum(data.T, engine=engine, axis=0)
+
+    for i, row in enumerate(data):
+        expected = analysisCusum(row, engine='python')
+        np.testing.assert_array_equal(SjB[:, i], expected[0])
+        np.testing.assert_array_equal(Sjs[:, i], expected[1])
+
+
+def test_unknown_engine():
+    with pytest.raises(Exception):
+        analysisCusum(_data('normal'), engine='fortran')
+
+
+def _chunks(data, sizes):
+    bounds = np.cumsum([0] + sizes)
+    return [data[start:stop] for start, stop in zip(bounds, bounds[1:])]
+
+
+@pytest.mark.parametrize('engine', ['python'] + _ENGINES)
+def test_streaming_matches_analysis_with_fixed_stats(engine):
+    from statsWaveletFilt.cusum import StreamingCusum, thresholdCusum
+
+    data = _data('shifted')
+    SjB, Sjs = analysisCusum(data, 1/4, 0., 1., engine='python')
+    expected = thresholdCusum(data, SjB, Sjs, 1., 3)
+
+    stream = StreamingCusum(k=1/4, h=3, mean=0., std=1., engine=engine)
+    result = np.concatenate([stream.process(chunk) for chunk in
+                             _chunks(data, [1, 999, 0, 2500, 1500])])
+
+    np.testing.assert_array_equal(result, expected)
+    assert stream.SjB == SjB[-1] and stream.Sjs == Sjs[-1]
+
+
+def test_streaming_running_stats():
+    from statsWaveletFilt.cusum import StreamingCusum, thresholdCusum
+
+    data = _data('normal') * 3 + 10
+    stream = StreamingCusum()
+
+    # The first chunk uses the stats of itself, like analysisCusum
+    first = data[:1000]
+    SjB, Sjs = analysisCusum(first)
+    np.testing.assert_array_equal(stream.process(first),
+                                  thresholdCusum(first, SjB, Sjs, h=5))
+
+    for chunk in _chunks(data[1000:], [7, 993, 3000]):
+        stream.process(chunk)
+
+    assert stream.count == data.size
+    np.testing.assert_allclose(stream.mean, data.mean(), rtol=1e-12)
+    np.testing.assert_allclose(stream.std, data.std(), rtol=1e-12)
+
+    stream.reset()
+    assert stream.count == 0 and stream.SjB == 0 and stream.Sjs == 0
+
+
+def test_threshold_out_matches_a_new_array():
+    from statsWaveletFilt.cusum import thresholdCusum
+
+    data = _data('normal', 2000)
+    SjB, Sjs = analysisCusum(data, 1/2, 0, 1)
+    expected = thresholdCusum(data, SjB, Sjs, 1, 2)
+    copy = data.copy()
+
+    out = np.empty_like(data)
+    assert thresholdCusum(data, SjB, Sjs, 1, 2, out=out) is out
+    np.testing.assert_array_equal(out, expected)
+    np.testing.assert_array_equal(data, copy)
+
+    # out=data truncates in place
+    assert thresholdCusum(data, SjB, Sjs, 1, 2, out=data) is data
+    np.testing.assert_array_equal(data, expected)
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import io
+import os
+
+import numpy as np
+import pytest
+
+from statsWaveletFilt.dataset import SignalDataset
+from statsWaveletFilt.miscellaneous import generateData
+
+
+_FUNCTIONS = ['doppler', 'bump']
+_VARNOISES = [0.001, 0.002, 0.003]
+
+
+@pytest.fixture(scope='module', params=['stacked', 'files'])
+def dataset(request, tmp_path_factory):
+    # generateData writes the 'files' layout in a folder relative to the
+    # working directory
+    root = tmp_path_factory.mktemp(request.param)
+    cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            generateData(_FUNCTIONS, _VARNOISES, 64, 7, 'data',
+                         request.param)
+    finally:
+        os.chdir(cwd)
+    return SignalDataset(str(root / 'data'))
+
+
+def test_shape(dataset):
+    assert sorted(dataset.functions) == sorted(_FUNCTIONS)
+    np.testing.assert_allclose(dataset.varNoises, _VARNOISES)
+    assert dataset.n_samples == 7 and dataset.dim_signals == 64
+    assert len(dataset) == len(_FUNCTIONS) * len(_VARNOISES) * 7
+
+
+def test_flat_indexes_follow_the_cells(dataset):
+    for i in range(len(dataset)):
+        cell, sample = divmod(i, dataset.n_samples)
+        i_f, i_n = divmod(cell, len(dataset.varNoises))
+        expected = dataset[dataset.functions[i_f], dataset.varNoises[i_n]]
+
+        np.testing.assert_array_equal(dataset[i], expected[sample])
+        np.testing.assert_array_equal(dataset[i - len(dataset)],
+                                      expected[sample])
+
+    for i in (len(dataset), -len(dataset) - 1):
+        with pytest.raises(IndexError):
+            dataset[i]
+
+
+@pytest.mark.parametrize('key', [
+    slice(None), slice(3, 30, 4), slice(None, None, -1), slice(40, 2, -3),
+    slice(5, 6), slice(-10, None, 2), slice(0, 0)])
+def test_flat_slices(dataset, key):
+    signals = np.stack([dataset[i] for i in range(len(dataset))])
+
+    np.testing.assert_array_equal(dataset[key], signals[key])
+
+
+def test_samples_of_a_cell(dataset):
+    signals = dataset['bump', 0.002]
+    assert signals.shape == (7, 64)
+
+    for i in range(-7, 7):
+        np.testing.assert_array_equal(dataset['bump', 0.002, i], signals[i])
+    np.testing.assert_array_equal(dataset['bump', 0.002, ::-2],
+                                  signals[::-2])
+
+    for i in (7, -8):
+        with pytest.raises(IndexError):
+            dataset['bump', 0.002, i]
+    with pytest.raises(KeyError):
+        dataset['block', 0.002]
+
+
+def test_batches(dataset):
+    batches = list(dataset.batches(3, function='doppler'))
+
+    assert [len(batch) for name, varNoise, batch in batches] == \
+        [3, 3, 1] * len(_VARNOISES)
+    for name, varNoise, batch in batches:
+        assert name == 'doppler'
+
+    signals = np.concatenate([batch for name, varNoise, batch in batches])
+    expected = np.concatenate([dataset['doppler', varNoise]
+                               for varNoise in dataset.varNoises])
+    np.testing.assert_array_equal(signals, expected)
@@ -0,0 +1,451 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+import pywt
+
+from statsWaveletFilt.filtration import filtration, filtrationBatch
+from statsWaveletFilt.signals import dopplerFunction
+
+
+def _noisySignals(n_signals=4, dim=1024, seed=0):
+    rng = np.random.default_rng(seed)
+    x, idealSignal = dopplerFunction(dim)
+    return idealSignal + rng.normal(0, .1, (n_signals, dim))
+
+
+@pytest.mark.parametrize('method, params', [
+    ('visu', {}), ('bayes', {}), ('spc', {'p': 2.5}),
+    ('sure', {'dim_t': 256}), ('sure', {'search': 'exact'})])
+@pytest.mark.parametrize('mode', ['hard', 'soft'])
+def test_batch_matches_filtration(method, params, mode):
+    signals = _noisySignals()
+
+    coefficients, lambdaValues = filtrationBatch(
+        signals, method, mode=mode, wavelet='db8', level=5, **params)
+
+    for i, signal in enumerate(signals):
+        expected, expectedLambdas = filtration(
+            pywt.wavedec(signal, 'db8', level=5), method, mode=mode,
+            **params)
+
+        np.testing.assert_allclose(lambdaValues[i], expectedLambdas,
+                                   rtol=1e-12)
+        for coeff, expectedCoeff in zip(coefficients, expected):
+            np.testing.assert_allclose(coeff[i], expectedCoeff, rtol=1e-12)
+
+
+def test_batch_of_decomposed_signals():
+    signals = _noisySignals()
+    decomposed = pywt.wavedec(signals, 'db8', level=5, axis=-1)
+
+    coefficients, lambdaValues = filtrationBatch(decomposed, 'visu')
+    expected, expectedLambdas = filtrationBatch(signals, 'visu',
+                                                wavelet='db8', level=5)
+
+    np.testing.assert_array_equal(lambdaValues, expectedLambdas)
+    for coeff, expectedCoeff in zip(coefficients, expected):
+        np.testing.assert_array_equal(coeff, expectedCoeff)
+
+
+def _blocks(signal, seed=0):
+    rng = np.random.default_rng(seed)
+    bounds = np.unique(np.concatenate(
+        [[0], rng.integers(0, signal.size, 12), [signal.size]]))
+    return [signal[start:stop] for start, stop in zip(bounds, bounds[1:])]
+
+
+def _longSignal(dim=20000, seed=1):
+    rng = np.random.default_rng(seed)
+    x, idealSignal = dopplerFunction(dim)
+    return idealSignal + rng.normal(0, .1, dim)
+
+
+@pytest.mark.parametrize('mode', ['hard', 'soft'])
+def test_stream_matches_whole_signal_with_fixed_lambdas(mode):
+    from statsWaveletFilt.filtration import streamFiltration
+    from statsWaveletFilt.threshold import _threshold
+
+    signal = _longSignal()
+    lambdas = [.05, .1, .15, .2, .25]
+
+    result = np.concatenate(list(streamFiltration(
+        _blocks(signal), 'db8', 5, blockSize=4096, lambdas=lambdas,
+        mode=mode)))
+
+    coefficients = pywt.wavedec(signal, 'db8', level=5)
+    coefficients[1:] = [_threshold(coeff, value, mode) for coeff, value in
+                        zip(coefficients[1:], lambdas)]
+    expected = pywt.waverec(coefficients, 'db8')[:signal.size]
+
+    assert result.shape == signal.shape
+    np.testing.assert_allclose(result, expected, atol=1e-10)
+
+
+def test_stream_matches_whole_signal_with_fixed_cusum_stats():
+    from statsWaveletFilt.cusum import analysisCusum, thresholdCusum
+    from statsWaveletFilt.filtration import streamFiltration
+
+    signal = _longSignal()
+    coefficients = pywt.wavedec(signal, 'db8', level=5)
+    mean = [coeff.mean() for coeff in coefficients[1:]]
+    std = [coeff.std() for coeff in coefficients[1:]]
+
+    result = np.concatenate(list(streamFiltration(
+        _blocks(signal), 'db8', 5, 'cusumTrad', blockSize=4096, mean=mean,
+        std=std)))
+
+    for j, coeff in enumerate(coefficients[1:]):
+        SjB, Sjs = analysisCusum(coeff, 1/2, mean[j], std[j])
+        coefficients[j + 1] = thresholdCusum(coeff, SjB, Sjs, std[j], 5)
+    expected = pywt.waverec(coefficients, 'db8')[:signal.size]
+
+    np.testing.assert_allclose(result, expected, atol=1e-10)
+
+
+def test_stream_blocks_have_the_block_size():
+    from statsWaveletFilt.filtration import streamFiltration
+
+    signal = _longSignal()
+
+    sizes = [block.size for block in streamFiltration(
+        _blocks(signal), 'db8', 5, 'visu', blockSize=4001)]
+
+    # Rounded up to a multiple of 2**5
+    assert sizes[:-1] == [4032] * (len(sizes) - 1)
+    assert sum(sizes) == signal.size
+
+
+@pytest.mark.parametrize('method', ['visu', 'cusumTrad'])
+def test_stream_does_not_depend_on_the_incoming_blocks(method):
+    from statsWaveletFilt.filtration import streamFiltration
+
+    signal = _longSignal()
+
+    def run(blocks):
+        return np.concatenate(list(streamFiltration(
+            blocks, 'db8', 5, method, blockSize=1024, verbose=False)))
+
+    expected = run(_blocks(signal))
+    # A single block emits many windows, small blocks emit at most one
+    np.testing.assert_array_equal(run([signal]), expected)
+    np.testing.assert_array_equal(
+        run([signal[i:i + 100] for i in range(0, signal.size, 100)]),
+        expected)
+
+
+@pytest.mark.parametrize('method, params', [
+    ('visu', {}), ('sure', {'search': 'exact', 'mode': 'soft'}),
+    ('cusumDecay', {}), ('cusumAdap', {'h': [4, 4, 3, 3, 2],
+                                       'k': [1/2] * 5})])
+def test_denoise_batch_matches_each_signal(method, params, capsys):
+    from statsWaveletFilt.filtration import cusumFiltration, denoiseBatch
+
+    signals = _noisySignals(dim=1000)
+
+    result = denoiseBatch(signals, method, 'db8', 5, verbose=False,
+                          **params)
+    assert capsys.readouterr().out == ''
+
+    for signal, denoised in zip(signals, result):
+        coefficients = pywt.wavedec(signal, 'db8', level=5)
+        if method.startswith('cusum'):
+            filtered = cusumFiltration(coefficients, method=method,
+                                       verbose=False, **params)[0]
+        else:
+            filtered = filtration(coefficients, method, verbose=False,
+                                  **params)[0]
+        np.testing.assert_allclose(
+            denoised, pywt.waverec(filtered, 'db8')[:signal.size],
+            atol=1e-12)
+
+
+def _run(method, coefficients, **params):
+    from statsWaveletFilt.filtration import cusumFiltration
+
+    if method.startswith('cusum'):
+        return cusumFiltration(coefficients, method=method, verbose=False,
+                               **params)[0]
+    return filtration(coefficients, method, mode='soft', verbose=False,
+                      **params)[0]
+
+
+@pytest.mark.parametrize('method', ['visu', 'sure', 'bayes', 'spc',
+                                    'cusumTrad', 'cusumDecay'])
+def test_out_and_inplace_match_the_default(method):
+    coefficients = pywt.wavedec(_noisySignals(1)[0], 'db8', level=5)
+    copies = [coeff.copy() for coeff in coefficients]
+
+    expected = _run(method, coefficients)
+    for coeff, copy in zip(coefficients, copies):
+        np.testing.assert_array_equal(coeff, copy)
+
+    out = [np.empty_like(coeff) for coeff in coefficients]
+    result = _run(method, coefficients, out=out)
+    assert all(array is outArray for array, outArray in zip(result, out))
+    for array, expectedArray in zip(result, expected):
+        np.testing.assert_array_equal(array, expectedArray)
+    for coeff, copy in zip(coefficients, copies):
+        np.testing.assert_array_equal(coeff, copy)
+
+    result = _run(method, coefficients, inplace=True)
+    assert all(array is coeff for array, coeff in zip(result, coefficients))
+    for array, expectedArray in zip(result, expected):
+        np.testing.assert_array_equal(array, expectedArray)
+
+
+def test_shared_stats_give_the_same_lambdas():
+    from statsWaveletFilt.filtration import cusumFiltration
+    from statsWaveletFilt.threshold import DecompositionStats, \
+        lambdasSPC_Threshold
+
+    coefficients = pywt.wavedec(_noisySignals(1)[0], 'db8', level=5)
+    stats = DecompositionStats(coefficients[1:])
+
+    for method in ['visu', 'sure', 'bayes', 'spc']:
+        assert filtration(coefficients, method, stats=stats,
+                          verbose=False)[1] == \
+            filtration(coefficients, method, verbose=False)[1]
+    for algorithm in ['mask', 'sort']:
+        assert lambdasSPC_Threshold(coefficients[1:], 2, algorithm, True,
+                                    stats) == \
+            lambdasSPC_Threshold(coefficients[1:], 2, algorithm, True)
+
+    for method in ['cusumTrad', 'cusumDecay']:
+        result = cusumFiltration(coefficients, method=method, stats=stats,
+                                 verbose=False)[0]
+        expected = cusumFiltration(coefficients, method=method,
+                                   verbose=False)[0]
+        for array, expectedArray in zip(result, expected):
+            np.testing.assert_array_equal(array, expectedArray)
+    for j, coeff in enumerate(coefficients[1:]):
+        assert stats.mean(j) == coeff.mean()
+        assert stats.std(j) == coeff.std()
+
+
+_ALL_METHODS = ['visu', 'sure', 'bayes', 'spc', 'cusumTrad', 'cusumDecay',
+                'cusumAdap']
+
+_METHOD_PARAMS = {'spc': {'p': 2}, 'sure': {'search': 'exact'},
+                  'cusumAdap': {'h': [4, 4, 3, 3, 2], 'k': [1/2] * 5}}
+
+
+@pytest.mark.parametrize('method', _ALL_METHODS)
+@pytest.mark.parametrize('mode', ['hard', 'soft'])
+def test_filtration_all_matches_each_method(method, mode):
+    from statsWaveletFilt.filtration import cusumFiltration, filtrationAll
+
+    signal = _noisySignals(1)[0]
+    coefficients = pywt.wavedec(signal, 'db8', level=5)
+
+    results, signals = filtrationAll(coefficients, _ALL_METHODS, mode,
+                                     _METHOD_PARAMS, 'db8', verbose=False)
+
+    params = _METHOD_PARAMS.get(method, {})
+    if method.startswith('cusum'):
+        expected = cusumFiltration(coefficients, method=method,
+                                   verbose=False, **params)
+    else:
+        expected = filtration(coefficients, method, mode=mode,
+                              verbose=False, **params)
+
+    for array, expectedArray in zip(results[method][0], expected[0]):
+        np.testing.assert_array_equal(array, expectedArray)
+    for values, expectedValues in zip(results[method][1:], expected[1:]):
+        np.testing.assert_array_equal(values, expectedValues)
+
+    # The stacked recomposition, one row per method
+    np.testing.assert_allclose(signals[method],
+                               pywt.waverec(expected[0], 'db8'), atol=1e-12)
+
+
+def _images(n_images=3, shape=(64, 48), seed=0):
+    rng = np.random.default_rng(seed)
+    x, y = np.meshgrid(np.linspace(0, 1, shape[1]), np.linspace(0, 1, shape[0]))
+    image = np.sin(8 * x) * np.cos(5 * y) + (x > .5)
+    return image + rng.normal(0, .1, (n_images,) + shape)
+
+
+@pytest.mark.parametrize('decomposition', ['wavedec2', 'wavedecn'])
+@pytest.mark.parametrize('method', ['visu', 'sure', 'bayes', 'spc'])
+def test_filtration_of_images_round_trips(decomposition, method):
+    from statsWaveletFilt.filtration import _lambdas
+    from statsWaveletFilt.threshold import _subbands, _threshold
+
+    image = _images(1)[0]
+    coefficients = getattr(pywt, decomposition)(image, 'db2', level=3)
+    recompose = getattr(pywt, decomposition.replace('dec', 'rec'))
+
+    result, lambdaValues = filtration(coefficients, method, mode='soft',
+                                      verbose=False)
+
+    # Nested like the input, one lambda per subband
+    assert _lambdas(coefficients[1:], method, dim_t=1024) == lambdaValues
+    subbands, nest = _subbands(coefficients[1:])
+    flatLambdas = _subbands(lambdaValues)[0]
+    assert len(flatLambdas) == len(subbands) == 9
+
+    expected = [coefficients[0]] + nest(
+        _threshold(subband, value, 'soft')
+        for subband, value in zip(subbands, flatLambdas))
+    np.testing.assert_array_equal(recompose(result, 'db2'),
+                                  recompose(expected, 'db2'))
+    assert recompose(result, 'db2').shape == image.shape
+
+
+@pytest.mark.parametrize('axes', [(1, 2), (-2, -1), (0, 1, 2)])
+@pytest.mark.parametrize('method', ['visu', 'sure', 'bayes', 'spc'])
+def test_batch_lambdas_of_images_match_each_image(axes, method):
+    from statsWaveletFilt.filtration import _lambdas
+    from statsWaveletFilt.threshold import _subbands
+
+    images = _images()
+    if len(axes) == 3:
+        # A batch of one volume, decomposed by pywt.wavedecn
+        images = _images(16)[None]
+        axes = (1, 2, 3)
+
+    coefficients, lambdaValues = filtrationBatch(
+        images, method, wavelet='db2', level=2, axes=axes, verbose=False)
+
+    assert lambdaValues.shape[0] == images.shape[0]
+    for i, image in enumerate(images):
+        decompose = pywt.wavedec2 if len(axes) == 2 else pywt.wavedecn
+        imageCoeff = decompose(image, 'db2', level=2)
+        expected = _subbands(_lambdas(imageCoeff[1:], method))[0]
+        np.testing.assert_allclose(lambdaValues[i], expected, rtol=1e-12)
+
+
+def test_cusum_rejects_subbands():
+    from statsWaveletFilt.filtration import cusumFiltration
+
+    image = _images(1)[0]
+    for decompose in [pywt.wavedec2, pywt.wavedecn]:
+        with pytest.raises(TypeError):
+            cusumFiltration(decompose(image, 'db2', level=2), verbose=False)
+
+
+def _channels(axis):
+    '''Noisy signals of 2 x 3 channels with the time in axis.'''
+    signals = _noisySignals(6, seed=2).reshape(2, 3, -1)
+    return np.moveaxis(signals, -1, axis)
+
+
+@pytest.mark.parametrize('axis', [0, 1, -1])
+@pytest.mark.parametrize('method', ['visu', 'sure', 'bayes', 'spc'])
+def test_filtration_along_axis_matches_each_channel(axis, method):
+    signals = _channels(axis)
+    coefficients = pywt.wavedec(signals, 'db8', level=5, axis=axis)
+
+    result, lambdaValues = filtration(coefficients, method, mode='soft',
+                                      axis=axis, verbose=False)
+
+    assert lambdaValues.shape == (2, 3, 5)
+    for channel in np.ndindex(2, 3):
+        signal = np.moveaxis(signals, axis, -1)[channel]
+        expected, expectedLambdas = filtration(
+            pywt.wavedec(signal, 'db8', level=5), method, mode='soft',
+            verbose=False)
+
+        np.testing.assert_allclose(lambdaValues[channel], expectedLambdas,
+                                   rtol=1e-12)
+        for array, expectedArray in zip(result, expected):
+            np.testing.assert_allclose(
+                np.moveaxis(array, axis, -1)[channel], expectedArray,
+                rtol=1e-12, atol=1e-15)
+
+
+@pytest.mark.parametrize('axis', [0, -1])
+@pytest.mark.parametrize('method', ['cusumTrad', 'cusumDecay'])
+def test_cusum_along_axis_matches_each_channel(axis, method):
+    from statsWaveletFilt.filtration import cusumFiltration
+
+    signals = _channels(axis)
+    coefficients = pywt.wavedec(signals, 'db8', level=5, axis=axis)
+
+    result = cusumFiltration(coefficients, method=method, axis=axis,
+                             verbose=False)[0]
+
+    for channel in np.ndindex(2, 3):
+        signal = np.moveaxis(signals, axis, -1)[channel]
+        expected = cusumFiltration(pywt.wavedec(signal, 'db8', level=5),
+                                   method=method, verbose=False)[0]
+
+        for array, expectedArray in zip(result, expected):
+            np.testing.assert_allclose(
+                np.moveaxis(array, axis, -1)[channel], expectedArray,
+                rtol=1e-12, atol=1e-15)
+
+
+def _assertFloat32Close(result, expected, lambdaTolerance=1e-5):
+    '''
+    float32 lambdas and filtered coefficients within the documented
+    tolerances of the float64 ones.
+    '''
+
+    for array, expectedArray in zip(result[0], expected[0]):
+        assert array.dtype == np.float32
+    if len(result) == 2:
+        lambdas = np.asarray(result[1])
+        assert lambdas.dtype == np.float32
+        np.testing.assert_allclose(lambdas, np.asarray(expected[1]),
+                                   rtol=lambdaTolerance)
+
+    signal = pywt.waverec(result[0], 'db8')
+    expectedSignal = pywt.waverec(expected[0], 'db8')
+    assert signal.dtype == np.float32
+    np.testing.assert_allclose(signal, expectedSignal,
+                               atol=1e-5 * np.ptp(expectedSignal))
+
+
+@pytest.mark.parametrize('method, mode', [
+    (method, mode) for method in ['visu', 'sure', 'bayes', 'spc']
+    for mode in ['hard', 'soft', 'garrote']] + [
+    (method, None) for method in ['cusumTrad', 'cusumDecay', 'cusumAdap']])
+def test_float32_is_kept(method, mode):
+    from statsWaveletFilt.filtration import cusumFiltration
+
+    signal = _noisySignals(1, 4096)[0]
+    params = _METHOD_PARAMS.get(method, {})
+
+    def run(signal):
+        coefficients = pywt.wavedec(signal, 'db8', level=5)
+        if method.startswith('cusum'):
+            return cusumFiltration(coefficients, method=method,
+                                   verbose=False, **params)[:1]
+        return filtration(coefficients, method, mode=mode, verbose=False,
+                          **params)
+
+    _assertFloat32Close(run(signal.astype(np.float32)), run(signal),
+                        1e-3 if method == 'bayes' else 1e-5)
+
+
+@pytest.mark.parametrize('method', ['visu', 'sure', 'bayes', 'spc'])
+def test_float32_batch_is_kept(method):
+    signals = _noisySignals(4, 4096)
+
+    result = filtrationBatch(signals.astype(np.float32), method,
+                             wavelet='db8', level=5, verbose=False)
+    expected = filtrationBatch(signals, method, wavelet='db8', level=5,
+                               verbose=False)
+
+    _assertFloat32Close(result, expected,
+                        1e-3 if method == 'bayes' else 1e-5)
+
+
+@pytest.mark.parametrize('method', ['visu', 'cusumTrad'])
+def test_float32_stream_is_kept(method):
+    from statsWaveletFilt.filtration import streamFiltration
+
+    signal = _longSignal()
+
+    def run(signal):
+        return np.concatenate(list(streamFiltration(
+            _blocks(signal), 'db8', 5, method, blockSize=4096,
+            verbose=False)))
+
+    result = run(signal.astype(np.float32))
+    expected = run(signal)
+
+    assert result.dtype == np.float32
+    np.testing.assert_allclose(result, expected, atol=1e-5 * np.ptp(expected))
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import io
+
+import numpy as np
+import pytest
+import pywt
+
+from statsWaveletFilt.filtration import cusumFiltration, filtration
+from statsWaveletFilt.plan import DenoisePlan
+from statsWaveletFilt.signals import heavsineFunction
+
+
+def _signals(dim, n_signals=3, seed=0):
+    rng = np.random.default_rng(seed)
+    x, idealSignal = heavsineFunction(dim)
+    return idealSignal + rng.normal(0, .1, (n_signals, dim))
+
+
+def _denoise(signal, method, **params):
+    '''The signal denoised without a plan.'''
+
+    coefficients = pywt.wavedec(signal, 'db8', level=5)
+    with contextlib.redirect_stdout(io.StringIO()):
+        if method.startswith('cusum'):
+            filtered = cusumFiltration(coefficients, method=method,
+                                       **params)[0]
+        else:
+            filtered = filtration(coefficients, method, **params)[0]
+    return pywt.waverec(filtered, 'db8')[:signal.size]
+
+
+@pytest.mark.parametrize('method, params', [
+    ('visu', {}), ('sure', {'dim_t': 256}), ('bayes', {}),
+    ('spc', {'p': 2.5, 'mode': 'soft'}), ('cusumTrad', {'h': 3}),
+    ('cusumDecay', {}), ('cusumAdap', {'h': [4, 4, 3, 3, 2],
+                                       'k': [1/2] * 5})])
+@pytest.mark.parametrize('dim', [1024, 1000])
+def test_plan_matches_filtration(method, params, dim):
+    with contextlib.redirect_stdout(io.StringIO()):
+        plan = DenoisePlan(dim, 'db8', 5, method, **params)
+    out = np.empty(dim)
+
+    for signal in _signals(dim):
+        result = plan.execute(signal, out=out)
+
+        assert result is out
+        np.testing.assert_allclose(result, _denoise(signal, method,
+                                                    **params), atol=1e-12)
+
+
+@pytest.mark.parametrize('method', ['visu', 'sure', 'bayes', 'spc',
+                                    'cusumTrad', 'cusumDecay'])
+def test_plan_in_float32(method):
+    plan = DenoisePlan(1024, 'db8', 5, method, dtype=np.float32)
+
+    for signal in _signals(1024):
+        result = plan.execute(signal)
+        expected = _denoise(signal, method)
+
+        assert result.dtype == np.float32
+        assert plan.lambdas.dtype == np.float32
+        np.testing.assert_allclose(result, expected,
+                                   atol=1e-5 * np.ptp(expected))
+
+
+def test_plan_checks_the_size():
+    plan = DenoisePlan(1024)
+
+    with pytest.raises(Exception):
+        plan.execute(np.zeros(1000))
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+import numpy as np
+import pywt
+
+from statsWaveletFilt.filtration import filtration, cusumFiltration
+from statsWaveletFilt.profiling import Tracer, _tracer
+from statsWaveletFilt.signals import dopplerFunction
+
+
+def _coefficients(dim=1024, level=5, seed=0):
+    rng = np.random.default_rng(seed)
+    x, idealSignal = dopplerFunction(dim)
+    return pywt.wavedec(idealSignal + rng.normal(0, .1, dim), 'db8',
+                        level=level)
+
+
+def test_filtration_stages():
+    coefficients = _coefficients()
+    sizes = [coeff.size for coeff in coefficients[1:]]
+
+    tracer = Tracer()
+    filtration(coefficients, 'visu', tracer=tracer)
+
+    assert [(record['stage'], record['level'], record['size'])
+            for record in tracer.records] == \
+        [('lambdas', None, sum(sizes))] + \
+        [('threshold', j, size) for j, size in enumerate(sizes, 1)]
+    assert all(record['time'] >= 0 and record['bytes'] is None
+               for record in tracer.records)
+
+
+def test_active_tracer_and_summary():
+    coefficients = _coefficients()
+    sizes = [coeff.size for coeff in coefficients[1:]]
+
+    assert _tracer() is None
+    with Tracer(memory=True) as tracer:
+        assert _tracer() is tracer
+        filtration(coefficients, 'bayes')
+        cusumFiltration(coefficients, verbose=False)
+    assert _tracer() is None
+
+    summary = tracer.summary()
+    assert sorted(summary) == ['cusumAnalysis', 'cusumThreshold', 'lambdas',
+                               'threshold']
+    assert summary['lambdas']['calls'] == 1
+    for stage in ['threshold', 'cusumAnalysis', 'cusumThreshold']:
+        assert summary[stage]['calls'] == 5
+        assert summary[stage]['size'] == sum(sizes)
+    assert summary['threshold']['time'] == sum(
+        record['time'] for record in tracer.records
+        if record['stage'] == 'threshold')
+    assert all(total['bytes'] >= 0 for total in summary.values())
+
+    tracer.clear()
+    assert tracer.records == [] and tracer.summary() == {}
+
+
+def test_callback_without_records():
+    received = []
+    tracer = Tracer(callback=received.append, keep=False)
+
+    filtration(_coefficients(), 'sure', search='exact', tracer=tracer)
+
+    assert tracer.records == []
+    assert [record['stage'] for record in received] == \
+        ['lambdas'] + ['threshold'] * 5
+
+
+def test_nested_tracers():
+    with Tracer() as outer:
+        with Tracer() as inner:
+            assert _tracer() is inner
+            # The same tracer activated again
+            with inner:
+                assert _tracer() is inner
+            assert _tracer() is inner
+        assert _tracer() is outer
+    assert _tracer() is None
+
+
+def test_active_tracer_is_not_shared_between_threads():
+    seen = []
+
+    with Tracer() as tracer:
+        thread = threading.Thread(target=lambda: seen.append(_tracer()))
+        thread.start()
+        thread.join()
+        assert _tracer() is tracer
+
+    assert seen == [None]
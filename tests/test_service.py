@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import contextlib
+import io
+import socket
+import threading
+
+import numpy as np
+import pytest
+import pywt
+
+from statsWaveletFilt.filtration import cusumFiltration, filtration
+from statsWaveletFilt.service import DenoiseServer, denoiseRemote
+
+
+@pytest.fixture(scope='module')
+def server(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('service') / 'denoise.sock')
+    loop = asyncio.new_event_loop()
+    denoiseServer = DenoiseServer(maxBatch=8, maxLatency=.01)
+
+    loop.run_until_complete(denoiseServer.start(path=path))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    yield path
+
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    denoiseServer._server.close()
+    denoiseServer._executor.shutdown()
+
+
+def _request(path, data):
+    '''The status and the body of the response of raw request bytes.'''
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(10)
+        connection.connect(path)
+        connection.sendall(data)
+        chunks = []
+        while True:
+            chunk = connection.recv(1 << 16)
+            if not chunk:
+                break
+            chunks.append(chunk)
+
+    head, _, body = b''.join(chunks).partition(b'\r\n\r\n')
+    return int(head.split(None, 2)[1]), body
+
+
+def _signals(n_signals=5, dim=1024, seed=0):
+    return np.random.default_rng(seed).normal(0, 1, (n_signals, dim)) + \
+        np.sin(np.linspace(0, 20, dim))
+
+
+@pytest.mark.parametrize('method, params', [
+    ('visu', {}), ('spc', {'p': 2.5}), ('cusumTrad', {'h': 3}),
+    ('cusumAdap', {'h': [4, 4, 3, 3, 2], 'k': [1/2] * 5})])
+def test_remote_matches_filtration(server, method, params):
+    signals = _signals()
+
+    result = denoiseRemote(signals, path=server, method=method, **params)
+
+    for signal, denoised in zip(signals, result):
+        coefficients = pywt.wavedec(signal, 'db8', level=5)
+        with contextlib.redirect_stdout(io.StringIO()):
+            if method.startswith('cusum'):
+                filtered = cusumFiltration(coefficients, method=method,
+                                           **params)[0]
+            else:
+                filtered = filtration(coefficients, method, **params)[0]
+        np.testing.assert_allclose(
+            denoised, pywt.waverec(filtered, 'db8')[:signal.size],
+            atol=1e-12)
+
+
+def test_remote_one_signal(server):
+    signal = _signals(1)[0]
+
+    result = denoiseRemote(signal, path=server)
+
+    assert result.shape == signal.shape
+    np.testing.assert_allclose(result, denoiseRemote(signal[None],
+                                                     path=server)[0])
+
+
+def test_health(server):
+    assert _request(server, b'GET /health HTTP/1.1\r\n'
+                            b'Connection: close\r\n\r\n') == (200, b'ok')
+    assert _request(server, b'GET /other HTTP/1.1\r\n'
+                            b'Connection: close\r\n\r\n')[0] == 404
+
+
+@pytest.mark.parametrize('data', [
+    b'GARBAGE\r\n\r\n',
+    b'POST /denoise HTTP/1.1\r\nContent-Length: abc\r\n\r\n',
+    b'POST /denoise HTTP/1.1\r\nContent-Length: -1\r\n\r\n',
+    b'POST /denoise HTTP/1.1\r\nContent-Length: 3\r\n'
+    b'Connection: close\r\n\r\nabc'])
+def test_malformed_requests(server, data):
+    assert _request(server, data)[0] == 400
+
+
+@pytest.mark.parametrize('params', [
+    {'method': 'other'}, {'method': 'cusumAdap', 'h': 5, 'k': .5},
+    {'method': 'cusumAdap', 'h': [5] * 4, 'k': [.5] * 4}])
+def test_bad_parameters(server, params):
+    with pytest.raises(Exception, match='Server error 400'):
+        denoiseRemote(_signals(2), path=server, **params)
+
+
+def test_server_prints_nothing(server, capfd):
+    denoiseRemote(_signals(2), path=server, method='cusumDecay')
+    denoiseRemote(_signals(2), path=server, method='spc')
+
+    assert capfd.readouterr().out == ''
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+import pywt
+
+from statsWaveletFilt import signals
+
+
+def _rows(seed=0, shape=(2, 3), dim=512):
+    rng = np.random.default_rng(seed)
+    x, idealSignal = signals.blockFunction(dim)
+    initialSignals = idealSignal + rng.normal(0, .1, shape + (dim,))
+    finalSignals = idealSignal + rng.normal(0, .03, shape + (dim,))
+    return initialSignals, finalSignals, idealSignal
+
+
+_DIFFERENTIALS = ['square_mean_error', 'mean_StandardNoise', 'variances',
+                  'amplitude_standardNoise']
+
+
+def test_figures_of_merit_match_the_functions():
+    initialSignals, finalSignals, idealSignal = _rows()
+
+    metrics = signals.figuresOfMerit(initialSignals, finalSignals,
+                                     idealSignal)
+
+    for index in np.ndindex(initialSignals.shape[:-1]):
+        initial, final = initialSignals[index], finalSignals[index]
+        residual = final - idealSignal
+        expected = {
+            'snr_square_mean_error': signals.snr_square_mean_error(
+                final, idealSignal),
+            'snr_mean_standardNoise': signals.snr_mean_standardNoise(
+                idealSignal, residual),
+            'snr_variances': signals.snr_variances(idealSignal, residual),
+            'cnr_amplitude_standardNoise':
+                np.abs(idealSignal).max() / residual.std()}
+        for method in _DIFFERENTIALS:
+            expected['differential_' + method] = signals.differential_snr_dB(
+                initial, final, method, idealSignal)
+
+        assert sorted(metrics) == sorted(expected)
+        for name, value in expected.items():
+            assert metrics[name].shape == initialSignals.shape[:-1]
+            np.testing.assert_allclose(metrics[name][index], value,
+                                       rtol=1e-12, err_msg=name)
+
+
+def test_figures_of_merit_without_ideal_signal():
+    initialSignals, finalSignals, idealSignal = _rows()
+
+    metrics = signals.figuresOfMerit(initialSignals, finalSignals)
+
+    assert list(metrics) == ['differential_square_mean_error']
+    for index in np.ndindex(initialSignals.shape[:-1]):
+        np.testing.assert_allclose(
+            metrics['differential_square_mean_error'][index],
+            signals.differential_snr_dB(initialSignals[index],
+                                        finalSignals[index]), rtol=1e-12)
+
+
+def test_cnr_amplitudes():
+    idealSignal = np.array([0., 4., -1., 2.])
+    noiseSignal = np.array([1., -3., 1., -1.])
+
+    # The function takes the amplitude of the noise, figuresOfMerit the one
+    # of the ideal signal
+    assert signals.cnr_amplitude_standardNoise(idealSignal, noiseSignal) == \
+        3. / noiseSignal.std()
+    assert signals.figuresOfMerit(
+        idealSignal + 2 * noiseSignal, idealSignal + noiseSignal,
+        idealSignal)['cnr_amplitude_standardNoise'] == 4. / noiseSignal.std()
+
+
+@pytest.mark.parametrize('function', [signals.dopplerFunction,
+                                      signals.heavsineFunction,
+                                      signals.blockFunction,
+                                      signals.bumpFunction])
+def test_cached_generators(function):
+    x, y = function(1000)
+    expectedX, expectedY = function(1000, cache=False)
+
+    np.testing.assert_array_equal(x, expectedX)
+    np.testing.assert_array_equal(y, expectedY)
+
+    # Writable copies: changing them doesn't change the cache
+    y[:] = 0
+    np.testing.assert_array_equal(function(1000)[1], expectedY)
+
+
+@pytest.mark.parametrize('method', _DIFFERENTIALS)
+@pytest.mark.parametrize('dim', [1024, 4096])
+def test_coefficients_match_the_signals(method, dim):
+    initialSignals, finalSignals, idealSignal = _rows(dim=dim, shape=(3,))
+
+    def decompose(signal):
+        return pywt.wavedec(signal, 'db8', mode='periodization', level=5)
+
+    for initial, final in zip(initialSignals, finalSignals):
+        np.testing.assert_allclose(
+            signals.differential_snr_dB_coefficients(
+                decompose(initial), decompose(final), method,
+                decompose(idealSignal)),
+            signals.differential_snr_dB(initial, final, method, idealSignal),
+            rtol=1e-10)
+
+
+def test_experiment_evaluations_match():
+    from statsWaveletFilt.experiments import runExperiment
+
+    def experiment(evaluation):
+        return runExperiment(['doppler', 'bump'], [0.001, 0.005],
+                             ['visu', 'sure', 'cusumTrad'], 3, 1024,
+                             n_workers=1, extension='periodization',
+                             evaluation=evaluation)[0]
+
+    bySignal = experiment('signal')
+    byCoefficients = experiment('coefficients')
+
+    assert experiment('auto') == byCoefficients
+    for result, expected in zip(byCoefficients, bySignal):
+        np.testing.assert_allclose(result['differential_snr_dB'],
+                                   expected['differential_snr_dB'],
+                                   rtol=1e-10)
+
+
+def test_coefficients_evaluation_needs_parseval():
+    from statsWaveletFilt.experiments import runExperiment
+
+    with pytest.raises(Exception):
+        runExperiment(['doppler'], [0.001], ['visu'], 1, 1024,
+                      n_workers=1, evaluation='coefficients')
+
+
+def test_experiment_does_not_depend_on_the_workers():
+    from statsWaveletFilt.experiments import runExperiment
+
+    def experiment(n_workers, wavelet='db8'):
+        return runExperiment(['doppler', 'block'], [0.001, 0.005],
+                             ['visu', 'spc', 'cusumDecay'], 2, 1024, wavelet,
+                             n_workers=n_workers,
+                             extension='periodization')[0]
+
+    expected = experiment(1)
+
+    assert experiment(2) == expected
+    # A pywt.Wavelet is accepted like its name, also by the 'auto' evaluation
+    assert experiment(2, pywt.Wavelet('db8')) == expected
+
+
+def test_cached_signal_is_shared_and_read_only():
+    x, y = signals.cachedSignal('bump', 1000)
+
+    assert signals.cachedSignal('bump', 1000)[1] is y
+    assert not y.flags.writeable
+    np.testing.assert_array_equal(y, signals.bumpFunction(1000)[1])
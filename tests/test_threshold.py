@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+import warnings
+import pywt
+
+from statsWaveletFilt.signals import bumpFunction
+from statsWaveletFilt.threshold import lambdasSureShrink, _sure
+
+
+def _coefficients(seed=0, dim=1024, sigma=.05):
+    rng = np.random.default_rng(seed)
+    x, idealSignal = bumpFunction(dim)
+    noisySignal = idealSignal + rng.normal(0, sigma, dim)
+    return pywt.wavedec(noisySignal, 'db8', level=5)[1:]
+
+
+def _gridRisks(coeff, dim_t):
+    '''The grid and the risks of the original loop of lambdasSureShrink.'''
+
+    estDeviation = np.median(np.abs(coeff))/.6745
+    tmax = estDeviation*np.sqrt(2*np.log10(coeff.size))
+    t = np.linspace(0, tmax, dim_t)
+    return t, np.array([_sure(coeff, ti) for ti in t])
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('dim_t', [64, 512])
+def test_sure_grid_matches_loop(seed, dim_t):
+    wavCoeff = _coefficients(seed)
+
+    lambdaValues = lambdasSureShrink(wavCoeff, dim_t)
+
+    for coeff, lambdaValue in zip(wavCoeff, lambdaValues):
+        t, risks = _gridRisks(coeff, dim_t)
+        assert lambdaValue == t[np.argmin(risks)]
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_sure_exact_is_the_minimum(seed):
+    wavCoeff = _coefficients(seed)
+
+    lambdaValues = lambdasSureShrink(wavCoeff, search='exact')
+
+    for coeff, lambdaValue in zip(wavCoeff, lambdaValues):
+        t, risks = _gridRisks(coeff, 256)
+        assert 0 <= lambdaValue <= t[-1]
+
+        # The risk only grows between coefficients: the minimum is at 0 or
+        # at a coefficient of the interval
+        candidates = np.concatenate([[0], coeff[(coeff >= 0) &
+                                                (coeff <= t[-1])]])
+        best = min(_sure(coeff, ti) for ti in candidates)
+        risk = _sure(coeff, lambdaValue)
+
+        assert risk <= best + 1e-9 * abs(best)
+        assert risk <= risks.min() + 1e-9 * abs(risks.min())
+
+
+def _levels(kind, seed=0):
+    rng = np.random.default_rng(seed)
+    sizes = [33, 64, 500, 4096]
+    if kind == 'normal':
+        return [rng.normal(size=n) for n in sizes]
+    if kind == 'cauchy':
+        return [rng.standard_cauchy(n) for n in sizes]
+    if kind == 'sparse':
+        return [np.where(rng.random(n) < .05, rng.normal(0, 20, n),
+                         rng.normal(size=n)) for n in sizes]
+    return [np.round(rng.standard_t(2, n), 1) + 3 for n in sizes]
+
+
+@pytest.mark.parametrize('kind', ['normal', 'cauchy', 'sparse', 'ties'])
+@pytest.mark.parametrize('p', [1.5, 2, 3])
+@pytest.mark.parametrize('dtype', ['float64', 'float32'])
+def test_spc_sort_matches_mask(kind, p, dtype):
+    from statsWaveletFilt.threshold import lambdasSPC_Threshold, \
+        DecompositionStats
+
+    wavCoeff = [level.astype(dtype) for level in _levels(kind)]
+
+    expected = lambdasSPC_Threshold(wavCoeff, p, 'mask', True)
+    assert lambdasSPC_Threshold(wavCoeff, p, 'sort', True) == expected
+
+    # With the sorted coefficients of the shared statistics
+    stats = DecompositionStats(wavCoeff)
+    assert lambdasSPC_Threshold(wavCoeff, p, 'sort', stats=stats) == \
+        expected[0]
+    assert stats.computed('sorted', 0) is not None
+
+
+@pytest.mark.parametrize('size', [0, 2, 3])
+def test_spc_sort_matches_mask_in_tiny_levels(size):
+    from statsWaveletFilt.threshold import lambdasSPC_Threshold
+
+    wavCoeff = [np.arange(1., size + 1), np.linspace(-1, 1, 100)]
+
+    with np.errstate(all='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        expected = lambdasSPC_Threshold(wavCoeff, 3, 'mask', True)
+        result = lambdasSPC_Threshold(wavCoeff, 3, 'sort', True)
+
+    np.testing.assert_array_equal(result[0], expected[0])
+    assert result[1] == expected[1]
+
+
+@pytest.mark.parametrize('mode', ['hard', 'soft', 'garrote'])
+def test_path_statistics_match_pywt(mode):
+    from statsWaveletFilt.threshold import ThresholdPath
+
+    wavCoeff = _coefficients()
+    lambdas = np.concatenate([[0], np.linspace(0, .3, 50),
+                              np.abs(wavCoeff[2][:5])])
+
+    statistics = ThresholdPath(wavCoeff).statistics(lambdas, mode)
+
+    for i, t in enumerate(lambdas):
+        for j, coeff in enumerate(wavCoeff):
+            thresholded = pywt.threshold(coeff, t, mode)
+            assert statistics['nonzero'][i, j] == \
+                np.count_nonzero(thresholded)
+            np.testing.assert_allclose(statistics['energy'][i, j],
+                                       np.sum(np.power(thresholded, 2)),
+                                       rtol=1e-12, atol=1e-15)
+            np.testing.assert_allclose(statistics['sure'][i, j],
+                                       _sure(coeff, t), rtol=1e-12)
+
+
+def test_path_sure_minimum_is_the_sure_lambda():
+    from statsWaveletFilt.threshold import ThresholdPath
+
+    wavCoeff = _coefficients()
+    grids = [_gridRisks(coeff, 256)[0] for coeff in wavCoeff]
+
+    sure = ThresholdPath(wavCoeff).statistics(np.stack(grids, axis=1))[
+        'sure']
+
+    np.testing.assert_array_equal(
+        [grid[np.argmin(sure[:, j])] for j, grid in enumerate(grids)],
+        lambdasSureShrink(wavCoeff, 256))
+
+
+@pytest.mark.parametrize('maxBytes', [None, 1, 50000])
+def test_path_coefficients_match_pywt(maxBytes):
+    from statsWaveletFilt.threshold import ThresholdPath
+
+    wavCoeff = _coefficients()
+    lambdas = np.linspace(0, .3, 20)
+
+    parts = []
+    for part, thresholded in ThresholdPath(wavCoeff).coefficients(
+            lambdas, 'soft', maxBytes):
+        parts.append(part)
+        for j, coeff in enumerate(wavCoeff):
+            for row, t in zip(thresholded[j], lambdas[part]):
+                np.testing.assert_array_equal(
+                    row, pywt.threshold(coeff, t, 'soft'))
+
+    assert parts[0].start == 0 and parts[-1].stop == lambdas.size
+    if maxBytes == 1:
+        assert len(parts) == lambdas.size
+
+
+@pytest.mark.parametrize('function, params', [
+    ('lambdasVisuShrink', {}), ('lambdasSureShrink', {}),
+    ('lambdasSureShrink', {'search': 'exact'}), ('lambdasBayesShrink', {}),
+    ('lambdasSPC_Threshold', {}),
+    ('lambdasSPC_Threshold', {'algorithm': 'sort'})])
+def test_lambdas_do_not_change_the_coefficients(function, params):
+    import statsWaveletFilt.threshold as threshold
+
+    wavCoeff = _coefficients()
+    copies = [coeff.copy() for coeff in wavCoeff]
+
+    getattr(threshold, function)(wavCoeff, **params)
+
+    for coeff, copy in zip(wavCoeff, copies):
+        np.testing.assert_array_equal(coeff, copy)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import io
+
+import numpy as np
+import pytest
+import pywt
+
+from statsWaveletFilt.filtration import cusumFiltration, filtration
+from statsWaveletFilt.signals import dopplerFunction, figuresOfMerit
+from statsWaveletFilt.tuning import tuneCusum, tuneSPC
+
+
+def _signals(n_signals=4, dim=1024, seed=0):
+    rng = np.random.default_rng(seed)
+    x, idealSignal = dopplerFunction(dim)
+    return idealSignal + rng.normal(0, .05, (n_signals, dim)), idealSignal
+
+
+def _metric(noisySignals, idealSignal, filterCoefficients, metric):
+    '''The metric of the full pipeline, signal by signal.'''
+
+    finalSignals = []
+    for signal in noisySignals:
+        coefficients = pywt.wavedec(signal, 'db8', level=5)
+        with contextlib.redirect_stdout(io.StringIO()):
+            filtered = filterCoefficients(coefficients)
+        finalSignals.append(pywt.waverec(filtered, 'db8')[:signal.size])
+
+    return figuresOfMerit(noisySignals, np.array(finalSignals),
+                          idealSignal)[metric].mean()
+
+
+@pytest.mark.parametrize('metric', ['differential_variances',
+                                    'snr_square_mean_error'])
+def test_spc_is_the_best_of_the_pipeline(metric):
+    noisySignals, idealSignal = _signals()
+    ps = [1.5, 2, 2.5, 3, 4]
+
+    params, score = tuneSPC(noisySignals, idealSignal, ps=ps, metric=metric)
+
+    scores = [_metric(noisySignals, idealSignal,
+                      lambda c, p=p: filtration(c, 'spc', p=p)[0], metric)
+              for p in ps]
+    best = np.argmin(scores) if metric == 'snr_square_mean_error' else \
+        np.argmax(scores)
+
+    assert params == {'p': ps[best]}
+    np.testing.assert_allclose(score, scores[best], rtol=1e-10)
+
+
+@pytest.mark.parametrize('sweeps', [0, 1, 10])
+def test_cusum_score_is_the_one_of_the_pipeline(sweeps):
+    noisySignals, idealSignal = _signals()
+
+    params, score = tuneCusum(noisySignals, idealSignal, hs=[1, 2, 4, 8],
+                              ks=[1/4, 1/2], sweeps=sweeps)
+
+    assert len(params['h']) == len(params['k']) == 5
+    np.testing.assert_allclose(
+        score, _metric(noisySignals, idealSignal,
+                       lambda c: cusumFiltration(c, method='cusumAdap',
+                                                 **params)[0],
+                       'differential_variances'), rtol=1e-10)
+
+
+def test_cusum_sweeps_improve_the_score():
+    noisySignals, idealSignal = _signals()
+
+    start = tuneCusum(noisySignals, idealSignal, sweeps=0)[1]
+    tuned = tuneCusum(noisySignals, idealSignal, workers=1)[1]
+
+    assert tuned >= start
+
+
+def test_unknown_metric():
+    noisySignals, idealSignal = _signals()
+
+    for tune in (tuneCusum, tuneSPC):
+        with pytest.raises(Exception):
+            tune(noisySignals, idealSignal,
+                 metric='differential_square_mean_error')